@@ -8,14 +8,14 @@ import streamlit as st
 from dotenv import load_dotenv
 
 from utils.session_utils import init_user_session, get_user_and_session
-from tools.scrap_and_filter import crawl_website
+from tools.scrap_and_filter import crawl_website, CRAWL_CONCURRENCY, CRAWL_DISCOVER
 from vector_database import build_or_update_vector_db
-from rag_pipeline import get_rag_response
+from rag_pipeline import stream_rag_response
 from agents.deployment_agent import DeploymentAgent
 from utils.load_env import load_env_file
-
-from PyPDF2 import PdfReader
-import docx
+from tools.page_store import default_pages_path
+from utils.doc_extract import extract_uploads, SUPPORTED_TYPES
+from utils.document_sources import iter_documents, format_source
 
 # --- Setup ---
 load_dotenv()
@@ -37,7 +37,9 @@ os.makedirs(VECTORSTORE_DIR, exist_ok=True)
 
 web_txt_path = os.path.join(TXT_DIR, "webscraper.txt")
 file_txt_path = os.path.join(TXT_DIR, "filedata.txt")
-merged_txt_path = os.path.join(TXT_DIR, "merged.txt")
+# Page-level JSONL streams written next to the text files; these feed the vector DB.
+web_pages_path = default_pages_path(web_txt_path)
+file_pages_path = default_pages_path(file_txt_path)
 
 # Session state
 if "qa_chain_ready" not in st.session_state:
@@ -52,15 +54,14 @@ if "redirected_after_deploy" in st.session_state:
 
 # --- Inputs ---
 url = st.text_input("🔗 Enter Website URL")
+discover = st.checkbox("🗺️ Also find pages listed in robots.txt and sitemaps", value=CRAWL_DISCOVER)
 
 if st.button("🌐 Start Web Scraping"):
     if not url:
         st.warning("Please enter a website URL to scrape.")
         st.stop()
     with st.spinner("Scraping website..."):
-        scraped_txt_path = crawl_website(url)
-        if os.path.abspath(scraped_txt_path) != os.path.abspath(web_txt_path):
-             shutil.copy(scraped_txt_path, web_txt_path)
+        crawl_website(url, output_path=web_txt_path, concurrency=CRAWL_CONCURRENCY, discover=discover)
         st.session_state.webscraped = True
         st.success(f"✅ Web scraping completed and saved to `{web_txt_path}`")
 
@@ -73,53 +74,42 @@ if st.session_state.webscraped:
 
     uploaded_files = st.file_uploader(
         "Upload multiple files (PDF, TXT, DOCX)", 
-        type=["pdf", "txt", "docx"], 
+        type=[ext.lstrip(".") for ext in SUPPORTED_TYPES],
         accept_multiple_files=True
     )
 
-    def extract_text(uploaded_file):
-        try:
-            if uploaded_file.name.endswith(".pdf"):
-                reader = PdfReader(uploaded_file)
-                return "\n".join([p.extract_text() or "" for p in reader.pages])
-            elif uploaded_file.name.endswith(".txt"):
-                return uploaded_file.read().decode("utf-8")
-            elif uploaded_file.name.endswith(".docx"):
-                doc = docx.Document(uploaded_file)
-                return "\n".join([para.text for para in doc.paragraphs])
-        except Exception as e:
-            st.error(f"Error reading {uploaded_file.name}: {e}")
-            return ""
-
     if uploaded_files and st.button("📤 Extract & Save Uploaded Text"):
-        combined_text = ""
-        for file in uploaded_files:
-            text = extract_text(file)
-            combined_text += f"\n\n--- Extracted from: {file.name} ---\n\n{text}"
-        with open(file_txt_path, "w", encoding="utf-8") as f:
-            f.write(combined_text)
+        progress_bar = st.progress(0.0)
+        progress_text = st.empty()
+
+        def show_progress(done, total, name, page, pages):
+            progress_bar.progress(done / total)
+            progress_text.text(f"{done}/{total} files done · {name}: page {page} of {pages}")
+
+        # Files are extracted in worker processes and streamed to disk page by page.
+        report = extract_uploads(
+            ((file.name, file.getvalue()) for file in uploaded_files),
+            output_path=file_txt_path,
+            on_progress=show_progress,
+        )
+        progress_text.text(report.summary())
+        if report.cache and report.cache.hits:
+            st.info(f"♻️ {report.cache.hits} of {len(report.files)} files reused from the extraction cache "
+                    f"({report.cache.hit_ratio:.0%} hit ratio).")
+        for result in report.failed:
+            st.error(f"Error reading {result.name}: {result.error}")
         st.session_state.files_uploaded = True
         st.success(f"✅ Extracted file text saved to `{file_txt_path}`")
 
-# Merge only after both are available
-if st.session_state.webscraped and st.session_state.files_uploaded:
-    st.markdown("---")
-    st.subheader("📚 Merge Web + File Data")
-
-    if st.button("🧩 Merge Text Files"):
-        try:
-            with open(web_txt_path, "r", encoding="utf-8") as w, open(file_txt_path, "r", encoding="utf-8") as f:
-                merged_text = f"\n--- Webscraped Content ---\n{w.read()}\n\n--- Uploaded File Content ---\n{f.read()}"
-            with open(merged_txt_path, "w", encoding="utf-8") as m:
-                m.write(merged_text)
-            st.success(f"✅ Files merged and saved as `{merged_txt_path}`")
-        except Exception as e:
-            st.error(f"❌ Merge error: {e}")
-
 # Vector DB and chatbot
-if os.path.exists(merged_txt_path) and st.button("🚀 Build Vector DB"):
+if st.session_state.webscraped and st.button("🚀 Build Vector DB"):
     with st.spinner("Creating vector database..."):
-        if build_or_update_vector_db(merged_txt_path):
+        # Pages go straight from the crawl and upload streams into chunking, each
+        # keeping its source URL or file name and page number.
+        sources = [web_pages_path]
+        if st.session_state.files_uploaded:
+            sources.append(file_pages_path)
+        if build_or_update_vector_db(documents=iter_documents(*sources)):
             st.session_state.qa_chain_ready = True
             st.success("✅ Vector DB ready!")
         else:
@@ -131,16 +121,17 @@ if st.session_state.qa_chain_ready:
     st.subheader("💬 Chat with Your Bot")
     user_query = st.text_input("Ask a question:")
     if user_query:
-        with st.spinner("🤖 Thinking..."):
-            try:
-                answer, docs = get_rag_response(user_query, session_id, user_id)
-                st.markdown(f"**🤖 Answer:**  {answer}")
-                with st.expander("📄 Source Docs"):
-                    for i, doc in enumerate(docs, 1):
-                        st.markdown(f"**Doc {i}:**")
-                        st.code(doc.page_content[:500], language="text")
-            except Exception as e:
-                st.error(f"Error: {e}")
+        try:
+            with st.spinner("🤖 Thinking..."):
+                answer_stream, docs = stream_rag_response(user_query, session_id, user_id)
+            st.markdown("**🤖 Answer:**")
+            st.write_stream(answer_stream)
+            with st.expander("📄 Source Docs"):
+                for i, doc in enumerate(docs, 1):
+                    st.markdown(f"**Doc {i}:** {format_source(doc.metadata)}")
+                    st.code(doc.page_content[:500], language="text")
+        except Exception as e:
+            st.error(f"Error: {e}")
 
     st.subheader("🚀 Deploy Chatbot")
     if st.button("💻 Deploy to Render"):
@@ -0,0 +1,111 @@
+# benchmarks/bench_cleaning.py
+"""
+Compare the local rule-based cleaner with the AI cleaning path.
+
+The local cleaner runs over the whole corpus; the synthetic menu lines are passed
+as the link texts a crawl records for them. The AI path runs over the first
+`--ai-chunks` 2,000-character chunks and is extrapolated to the full corpus. By
+default it uses a fake chat function that sleeps `--ai-latency` seconds per call
+and echoes the chunk back; pass `--real` to call Cohere (needs COHERE_API_KEY).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cleaning --mb 50
+    python -m benchmarks.bench_cleaning --input txt/webscraper.txt --real
+"""
+
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+
+from tools.ai_cleaner import CleaningExecutor, CLEAN_PROMPT
+from tools.local_cleaner import clean_file_locally
+
+MENU = ["Home", "About us", "Services", "Pricing", "Blog", "Contact"]
+WORDS = ["data", "chatbot", "customer", "service", "platform", "informa-", "tion", "quality",
+         "support", "team", "product", "pricing", "  ", "integration", "deployment"]
+
+
+def write_synthetic_corpus(path, megabytes, seed=0):
+    """Write noisy scraped-looking text: menus, duplicate lines, broken hyphenation."""
+    rng = random.Random(seed)
+    target = megabytes * 1024 * 1024
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            block = "\n".join(MENU) + "\n"
+            for _ in range(rng.randint(3, 8)):
+                block += " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 30))) + ".\n"
+            block += "© 2024 Example Inc. All rights reserved.\n\n\n"
+            f.write(block)
+            written += len(block)
+
+
+def iter_chunks(path, chunk_size=2000):
+    """Yield ~2,000-character chunks of a file without reading it all."""
+    buf = ""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            buf += line
+            if len(buf) >= chunk_size:
+                yield buf
+                buf = ""
+    if buf:
+        yield buf
+
+
+def fake_chat(latency):
+    def chat(model, message):
+        time.sleep(latency)
+        return message[len(CLEAN_PROMPT):]
+    return chat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="Text file to clean (default: synthetic corpus)")
+    parser.add_argument("--mb", type=int, default=50, help="Size of the synthetic corpus")
+    parser.add_argument("--ai-chunks", type=int, default=20)
+    parser.add_argument("--ai-latency", type=float, default=2.0, help="Fake seconds per chat call")
+    parser.add_argument("--ai-workers", type=int, default=4)
+    parser.add_argument("--real", action="store_true", help="Call Cohere instead of the fake chat")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = args.input
+        if not input_path:
+            input_path = os.path.join(tmp, "corpus.txt")
+            write_synthetic_corpus(input_path, args.mb)
+
+        start = time.perf_counter()
+        chars_in, chars_out = clean_file_locally(input_path, os.path.join(tmp, "local.txt"), link_texts=MENU)
+        local_seconds = time.perf_counter() - start
+        mb_in = chars_in / 1024 / 1024
+        print(f"[BENCH] local: {mb_in:.1f} MB in {local_seconds:.2f}s "
+              f"({mb_in / local_seconds * 60:.0f} MB/min), output {chars_out / max(chars_in, 1):.0%} of input")
+
+        if args.real:
+            from tools.scrap_and_filter import cohere_chat  # needs COHERE_API_KEY
+            chat_fn = cohere_chat
+        else:
+            chat_fn = fake_chat(args.ai_latency)
+        executor = CleaningExecutor(chat_fn, max_workers=args.ai_workers, cache_path=None)
+        sample = list(itertools.islice(iter_chunks(input_path), args.ai_chunks))
+        sample_chars = sum(len(c) for c in sample)
+        start = time.perf_counter()
+        cleaned = executor.clean(sample)
+        ai_seconds = time.perf_counter() - start
+        ai_out = sum(len(c) for c in cleaned)
+        full_seconds = ai_seconds * chars_in / max(sample_chars, 1)
+        print(f"[BENCH] ai:    {len(sample)} chunks in {ai_seconds:.2f}s "
+              f"({sample_chars / 1024 / 1024 / ai_seconds * 60:.2f} MB/min), output {ai_out / max(sample_chars, 1):.0%} of input")
+        print(f"[BENCH] ai (extrapolated to {mb_in:.1f} MB): ~{full_seconds / 60:.0f} min, "
+              f"{executor.stats.summary()}")
+        print(f"[BENCH] local speedup: ~{full_seconds / local_seconds:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_crawler.py
+"""
+Compare the serial crawl loop with the concurrent asyncio engine.
+
+With `--parse-workers N` a third run parses HTML in a pool of N processes; use a
+parse-heavy site (large `--paragraphs`, low `--latency`) to see it scale with
+cores. Every run's pages are checked against the serial output.
+
+With `--discover` the site also serves robots.txt and a gzipped sitemap listing
+`--orphans` extra pages that no page links to; a further serial run seeds its
+frontier from the sitemap and should find them.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_crawler --pages 200 --latency 0.05 --concurrency 16
+    python -m benchmarks.bench_crawler --pages 300 --latency 0 --paragraphs 2000 --parse-workers 4
+    python -m benchmarks.bench_crawler --pages 200 --discover --orphans 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic_site import SyntheticSite
+from tools.page_store import iter_pages, default_pages_path
+from tools.scrap_and_filter import crawl_website
+
+
+def run(label, start_url, output_path, **kwargs):
+    start = time.perf_counter()
+    crawl_website(start_url, output_path=output_path, **kwargs)
+    elapsed = time.perf_counter() - start
+    with open(output_path, encoding="utf-8") as f:
+        pages = f.read().count("\n--- Page: ")
+    print(f"[BENCH] {label:<12} {pages:>5} pages in {elapsed:7.2f}s  ({pages / elapsed:7.1f} pages/s)")
+    return elapsed
+
+
+def page_texts(output_path):
+    return {page["url"]: page["text"] for page in iter_pages(default_pages_path(output_path))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated server latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--per-host-limit", type=int, default=16)
+    parser.add_argument("--rps", type=float, default=None, help="Per-host requests per second")
+    parser.add_argument("--paragraphs", type=int, default=20, help="Paragraphs per page (parse cost)")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Also run with a parse process pool")
+    parser.add_argument("--discover", action="store_true", help="Also run with sitemap discovery")
+    parser.add_argument("--orphans", type=int, default=0, help="Pages listed only in the sitemap")
+    args = parser.parse_args()
+
+    site = SyntheticSite(num_pages=args.pages, latency=args.latency, paragraphs=args.paragraphs,
+                         sitemap=args.discover, orphans=args.orphans)
+    with site, tempfile.TemporaryDirectory() as tmp:
+        engine = dict(
+            concurrency=args.concurrency,
+            per_host_limit=args.per_host_limit,
+            requests_per_second=args.rps,
+        )
+        runs = {"serial": run("serial", site.base_url, os.path.join(tmp, "serial.txt"))}
+        runs["concurrent"] = run("concurrent", site.base_url, os.path.join(tmp, "concurrent.txt"), **engine)
+        if args.parse_workers:
+            runs["process-pool"] = run(
+                "process-pool", site.base_url, os.path.join(tmp, "process-pool.txt"),
+                parse_workers=args.parse_workers, **engine,
+            )
+
+        expected = page_texts(os.path.join(tmp, "serial.txt"))
+        if args.discover:
+            discover_path = os.path.join(tmp, "discover.txt")
+            run("discover", site.base_url, discover_path, discover=True)
+            found = page_texts(discover_path)
+            print(f"[BENCH] discover     found {len(found)} pages, link-following alone {len(expected)} "
+                  f"({args.orphans} pages are only in the sitemap)")
+
+        for label, elapsed in runs.items():
+            same = page_texts(os.path.join(tmp, f"{label}.txt")) == expected
+            print(f"[BENCH] {label:<12} speedup {runs['serial'] / elapsed:5.1f}x, "
+                  f"output {'matches' if same else 'DIFFERS FROM'} serial")
+
+
+if __name__ == "__main__":
+    main()
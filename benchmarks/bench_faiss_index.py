@@ -0,0 +1,78 @@
+# benchmarks/bench_faiss_index.py
+"""
+Compare FAISS index types on synthetic vectors: recall@k, query latency, memory.
+
+Generates `--vectors` clustered Gaussian vectors (embeddings are clustered by
+topic, which is what IVF exploits), builds every index type from
+`utils/faiss_indexes.py` and runs `--queries` single-vector searches against each.
+Recall@k is measured against exact flat search; memory is the serialized index
+size.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_faiss_index --vectors 100000 --dim 1024 --k 5
+    python -m benchmarks.bench_faiss_index --vectors 20000 --types flat hnsw
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from utils.faiss_indexes import INDEX_TYPES, make_index, train_index, index_type_of
+
+
+def synthetic_vectors(num_vectors, dim, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(clusters, size=num_vectors)
+    vectors = centers[labels] + 0.5 * rng.normal(size=(num_vectors, dim)).astype(np.float32)
+    return vectors.astype(np.float32)
+
+
+def bench(index_type, vectors, queries, k, truth):
+    start = time.perf_counter()
+    index = make_index(index_type, vectors.shape[1], len(vectors))
+    train_index(index, vectors)
+    index.add(vectors)
+    build_seconds = time.perf_counter() - start
+
+    latencies, hits = [], 0
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, found = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(found[0]) & set(truth[i]))
+
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    memory_mb = faiss.serialize_index(index).nbytes / 1024 / 1024
+    label = index_type if index_type != "auto" else f"auto:{index_type_of(index)}"
+    print(f"[BENCH] {label:<14} recall@{k} {hits / truth.size:6.3f}  p50 {p50:7.3f} ms  p99 {p99:7.3f} ms  "
+          f"memory {memory_mb:8.1f} MB  build {build_seconds:6.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1024, help="Cohere embed-english-v3.0 is 1024-dim")
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.vectors + args.queries, args.dim, args.clusters)
+    vectors, queries = vectors[:args.vectors], vectors[args.vectors:]
+
+    exact = faiss.IndexFlatL2(args.dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"[BENCH] {args.vectors} vectors x {args.dim} dims, {args.queries} queries")
+    for index_type in args.types:
+        bench(index_type, vectors, queries, args.k, truth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_html_parse.py
+"""
+Micro-benchmark HTML extraction: BeautifulSoup (html.parser) vs the lxml fast path.
+
+Parses every `*.html` file in `--corpus` (e.g. pages saved with `curl -o`), or a
+set of synthetic link-heavy pages when no corpus is given, and checks both paths
+extract the same text and links.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_html_parse --corpus saved_pages/ --repeat 3
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from benchmarks.synthetic_site import render_page
+from tools.html_extract import extract_page, parse_page_soup, registered_domain
+
+
+def load_corpus(corpus, pages, fanout):
+    if corpus:
+        docs = []
+        for path in sorted(glob.glob(os.path.join(corpus, "**", "*.htm*"), recursive=True)):
+            with open(path, "rb") as f:
+                html = f.read().decode("utf-8", errors="replace")
+            docs.append((f"https://{os.path.basename(corpus.rstrip('/'))}.example/{os.path.basename(path)}", html))
+        return docs
+    return [
+        (f"https://www.example.com/page/{i}", render_page(i, pages, fanout=fanout, paragraphs=40))
+        for i in range(pages)
+    ]
+
+
+def bench(label, fn, docs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        registered_domain.cache_clear()
+        start = time.perf_counter()
+        results = [fn(url, html) for url, html in docs]
+        best = min(best, time.perf_counter() - start)
+    links = sum(len(r[1]) for r in results)
+    print(f"[BENCH] {label:<14} {len(docs)} pages, {links} links in {best:.3f}s ({len(docs) / best:.0f} pages/s)")
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of saved .html pages")
+    parser.add_argument("--pages", type=int, default=300, help="Synthetic pages when no corpus is given")
+    parser.add_argument("--fanout", type=int, default=150, help="Links per synthetic page")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    docs = load_corpus(args.corpus, args.pages, args.fanout)
+    if not docs:
+        raise SystemExit(f"No .html files found in {args.corpus}")
+
+    soup_time, soup_results = bench("beautifulsoup", parse_page_soup, docs, args.repeat)
+    fast_time, fast_results = bench("lxml", extract_page, docs, args.repeat)
+
+    mismatches = sum(a[:2] != b[:2] for a, b in zip(soup_results, fast_results))
+    print(f"[BENCH] speedup: {soup_time / fast_time:.1f}x, {mismatches} pages with different output")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_query_cache.py
+"""
+Hit rates and latency saved by the query-embedding and semantic answer caches.
+
+Replays `--questions` chat questions drawn with a Zipf-like skew from a small set of
+FAQ topics, each asked in several phrasings ("pricing?", "What is the pricing?"...),
+through the same steps as `rag_pipeline.get_rag_response`: embed the question, look
+up the answer cache, otherwise search a FAISS store and "generate" an answer. The
+embedding and the LLM are local stand-ins that sleep `--embed-ms` and `--llm-ms`;
+the embedding is a bag of words, so rephrasings of a question land close together.
+Halfway through, the vectorstore version changes and the answer cache must start
+over. The run is repeated with caches disabled for comparison.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_query_cache --questions 2000 --llm-ms 20
+    python -m benchmarks.bench_query_cache --threshold 0.9
+"""
+
+import argparse
+import hashlib
+import random
+import re
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from utils.faiss_indexes import build_faiss_db
+from utils.query_cache import ANSWER_CACHE_THRESHOLD, QueryEmbeddingCache, SemanticAnswerCache
+
+TOPICS = {
+    "pricing": ["pricing?", "What is the pricing?", "what is the pricing", "How much does it cost? pricing"],
+    "contact": ["contact?", "How can I contact you?", "contact email?", "how do I contact support"],
+    "hours": ["opening hours?", "What are your opening hours?", "when are you open? hours"],
+    "refund": ["refund policy?", "How do refunds work?", "Can I get a refund?"],
+    "shipping": ["shipping?", "How long does shipping take?", "shipping time?"],
+}
+STOP_WORDS = {"what", "is", "the", "how", "do", "i", "can", "you", "a", "does", "it", "are", "your", "get"}
+
+
+class BagOfWordsEmbedding(Embeddings):
+    """Hashed bag-of-words vectors, so that rephrased questions are similar."""
+
+    def __init__(self, dim=256, delay_ms=0.0):
+        self.dim = dim
+        self.delay = delay_ms / 1000
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"[a-z]+", text.lower()):
+            if word not in STOP_WORDS:
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.delay)
+        return self._embed(text)
+
+
+def questions(count, seed=0):
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    weights = [1 / (rank + 1) for rank in range(len(topics))]
+    for _ in range(count):
+        yield rng.choice(TOPICS[rng.choices(topics, weights)[0]])
+
+
+def run(label, embeddings, faiss_db, args, answer_cache=None):
+    latencies = []
+    for i, query in enumerate(questions(args.questions)):
+        version = "v1" if i < args.questions // 2 else "v2"  # a rebuild halfway through
+        start = time.perf_counter()
+        vector = embeddings.embed_query(query)
+        if answer_cache is not None and answer_cache.lookup(vector, version) is not None:
+            answer_cache.record_hit(time.perf_counter() - start)
+        else:
+            docs = faiss_db.similarity_search_by_vector(vector, k=5)
+            time.sleep(args.llm_ms / 1000)  # generation
+            if answer_cache is not None:
+                answer_cache.store(vector, version, ("answer", docs))
+                answer_cache.record_miss(time.perf_counter() - start)
+        latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    p50 = np.percentile(np.array(latencies) * 1000, 50)
+    print(f"[BENCH] {label:<10} total {total:7.2f}s  mean {total / len(latencies) * 1000:7.2f} ms  p50 {p50:7.2f} ms")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--embed-ms", type=float, default=2.0, help="simulated query embedding call")
+    parser.add_argument("--llm-ms", type=float, default=10.0, help="simulated answer generation")
+    parser.add_argument("--threshold", type=float, default=ANSWER_CACHE_THRESHOLD)
+    args = parser.parse_args()
+
+    model = BagOfWordsEmbedding(delay_ms=args.embed_ms)
+    chunks = [(str(i), Document(page_content=f"{topic} details part {i}", metadata={"source": topic}))
+              for i, topic in enumerate(list(TOPICS) * 20)]
+    with tempfile.TemporaryDirectory() as directory:
+        faiss_db = build_faiss_db(chunks, model, directory, "flat")
+        print(f"[BENCH] {args.questions} questions over {sum(map(len, TOPICS.values()))} phrasings, "
+              f"threshold {args.threshold}")
+
+        baseline = run("uncached", model, faiss_db, args)
+        embeddings = QueryEmbeddingCache(model)
+        answer_cache = SemanticAnswerCache(threshold=args.threshold)
+        cached = run("cached", embeddings, faiss_db, args, answer_cache)
+        faiss_db.close()
+    print(f"[BENCH] {embeddings.summary()}")
+    print(f"[BENCH] {answer_cache.summary()}")
+    print(f"[BENCH] measured saving {baseline - cached:.2f}s ({1 - cached / baseline:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/bench_rag_retrieval.py
+"""
+Per-query retrieval latency: loading the vectorstore on every question vs a shared index.
+
+Builds a synthetic vectorstore of `--chunks` chunks with a deterministic local
+embedding, saved both in LangChain's pickle format and in the compact format, then
+times `--queries` retrievals (load if needed + embed + top-k search, no LLM call) for:
+
+- `pickle/query`:  `FAISS.load_local` on every question (the old `get_rag_response`)
+- `compact/query`: `CompactVectorStore` opened on every question
+- `holder`:        `utils.index_holder.IndexHolder`, loaded once per process
+
+It then rewrites the vectorstore while queries keep running against the holder and
+reports how long the background reload took to be picked up, and the worst query
+latency during it.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rag_retrieval --chunks 50000 --queries 50
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils.compact_store import HEADER_FILE, INDEX_FILE, CompactVectorStore
+from utils.faiss_indexes import build_faiss_db
+from utils.index_holder import IndexHolder, file_signature
+
+
+def synthetic_chunks(count, generation=0):
+    for i in range(count):
+        text = f"chunk {i} of generation {generation}: " + "lorem ipsum dolor sit amet " * 30
+        yield f"{generation}-{i}", Document(page_content=text, metadata={"source": f"page-{i // 10}"})
+
+
+def save_pickled(store, directory):
+    """Save a compact store in LangChain's pickle format (what the vectorstore used to be)."""
+    docs = [store.get(position) for position in range(len(store))]
+    faiss_db = FAISS(store.embeddings, faiss.read_index(os.path.join(store.directory, INDEX_FILE)),
+                     InMemoryDocstore({doc.id: doc for doc in docs}), {i: doc.id for i, doc in enumerate(docs)})
+    faiss_db.save_local(directory)
+
+
+def timed(label, queries, retrieve, k):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        retrieve().similarity_search(query, k=k)
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    print(f"[BENCH] {label:<14} p50 {p50:9.2f} ms  p99 {p99:9.2f} ms")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    embeddings = DeterministicFakeEmbedding(size=args.dim)
+    queries = [f"question {i} about lorem ipsum" for i in range(args.queries)]
+    with tempfile.TemporaryDirectory() as root:
+        pickle_dir, compact_dir = os.path.join(root, "pickle"), os.path.join(root, "compact")
+        faiss_db = build_faiss_db(synthetic_chunks(args.chunks), embeddings, compact_dir, "flat")
+        save_pickled(faiss_db, pickle_dir)
+        faiss_db.close()
+        print(f"[BENCH] {args.chunks} chunks x {args.dim} dims, {args.queries} queries, k={args.k}")
+
+        before = timed("pickle/query", queries,
+                       lambda: FAISS.load_local(pickle_dir, embeddings, allow_dangerous_deserialization=True), args.k)
+        timed("compact/query", queries, lambda: CompactVectorStore(compact_dir, embeddings), args.k)
+        signature = lambda: file_signature(os.path.join(compact_dir, HEADER_FILE),  # noqa: E731
+                                           os.path.join(compact_dir, "index.faiss"))
+        holder = IndexHolder(lambda: CompactVectorStore(compact_dir, embeddings), signature, check_interval=0.05)
+        holder.get()
+        after = timed("holder", queries, holder.get, args.k)
+        print(f"[BENCH] speedup vs loading per query: {before / after:.0f}x")
+
+        # Rebuild while a thread keeps querying through the holder.
+        worst, stop = [0.0], threading.Event()
+
+        def query_loop():
+            while not stop.is_set():
+                start = time.perf_counter()
+                holder.get().similarity_search(queries[0], k=args.k)
+                worst[0] = max(worst[0], time.perf_counter() - start)
+
+        thread = threading.Thread(target=query_loop)
+        thread.start()
+        build_faiss_db(synthetic_chunks(args.chunks, generation=1), embeddings, compact_dir, "flat").close()
+        saved = time.perf_counter()
+        while holder.get().get(0).id != "1-0":
+            time.sleep(0.01)
+        picked_up = time.perf_counter() - saved
+        stop.set()
+        thread.join()
+        print(f"[BENCH] reload picked up {picked_up * 1000:.0f} ms after the save "
+              f"(load {holder.last_load_seconds * 1000:.0f} ms); worst query during rebuild {worst[0] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
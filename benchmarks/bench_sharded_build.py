@@ -0,0 +1,107 @@
+# benchmarks/bench_sharded_build.py
+"""
+Compare the serial vector DB build with the sharded build in worker processes.
+
+Builds the same synthetic chunks with `utils.faiss_indexes.build_faiss_db` and with
+`utils.sharded_build.build_sharded_faiss_db` for each `--workers` count, using a
+deterministic local embedding (no API, no embedding cache) that burns `--embed-ms`
+of CPU per text to stand in for a local embedding model. Every sharded store is
+checked against the serial one: same chunk IDs, and the top-k hits of `--queries`
+searches (exact for flat and IVF, overlap for HNSW, whose insertion order of
+parallel adds is not fixed).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sharded_build --chunks 20000 --workers 2 4
+    python -m benchmarks.bench_sharded_build --chunks 50000 --type ivf-flat --embed-ms 1
+"""
+
+import argparse
+import functools
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils.faiss_indexes import INDEX_TYPES, build_faiss_db
+from utils.sharded_build import build_sharded_faiss_db, shard_size_for
+
+
+class SlowFakeEmbedding(DeterministicFakeEmbedding):
+    """`DeterministicFakeEmbedding` that spends `cost_ms` of CPU per text."""
+    cost_ms: float = 0.0
+
+    def _get_embedding(self, seed):
+        deadline = time.perf_counter() + self.cost_ms / 1000
+        while time.perf_counter() < deadline:
+            pass
+        return super()._get_embedding(seed)
+
+
+def fake_embeddings(dim, cost_ms):
+    """Embedding factory for the build workers (picklable through functools.partial)."""
+    return SlowFakeEmbedding(size=dim, cost_ms=cost_ms)
+
+
+def synthetic_chunks(count, seed=0):
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(5000)]
+    for i in range(count):
+        text = " ".join(rng.choices(words, k=150))
+        yield f"chunk-{i:08d}", Document(page_content=text, metadata={"source": f"page-{i // 10}"})
+
+
+def chunk_ids(store):
+    return [store.get(position).id for position in range(len(store))]
+
+
+def top_ids(faiss_db, queries, k):
+    return [[doc.id for doc in faiss_db.similarity_search(query, k=k)] for query in queries]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--embed-ms", type=float, default=0.5, help="CPU time per embedded text")
+    parser.add_argument("--type", default="flat", choices=INDEX_TYPES)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--shard-size", type=int, help="default: sized from --chunks and the worker count")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    factory = functools.partial(fake_embeddings, args.dim, args.embed_ms)
+    embeddings = factory()
+    queries = [doc.page_content for _, doc in synthetic_chunks(args.queries, seed=1)]
+    print(f"[BENCH] {args.chunks} chunks, {args.dim} dims, {args.embed_ms} ms/text, {args.type} index")
+
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        serial = build_faiss_db(synthetic_chunks(args.chunks), embeddings, os.path.join(root, "serial"), args.type)
+        serial_seconds = time.perf_counter() - start
+        expected = top_ids(serial, queries, args.k)
+        print(f"[BENCH] serial       {serial_seconds:7.2f}s")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            sharded, _ = build_sharded_faiss_db(synthetic_chunks(args.chunks), embeddings, factory,
+                                                os.path.join(root, f"sharded-{workers}"), args.type,
+                                                shard_size=args.shard_size or shard_size_for(args.chunks, workers),
+                                                max_workers=workers)
+            seconds = time.perf_counter() - start
+            same_ids = chunk_ids(sharded) == chunk_ids(serial)
+            found = top_ids(sharded, queries, args.k)
+            sharded.close()
+            agreement = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(found, expected)])
+            print(f"[BENCH] {workers} workers    {seconds:7.2f}s  speedup {serial_seconds / seconds:4.2f}x  "
+                  f"same IDs {same_ids}  top-{args.k} agreement {agreement:.3f}")
+        serial.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_streaming.py
+"""
+Time to first text: `get_rag_response` vs `stream_rag_response`.
+
+Runs the real pipeline functions of `rag_pipeline` with their external services
+replaced by local fakes: the LLM is LangChain's `FakeListChatModel`, which streams its
+canned answer one character at a time with `--char-ms` of delay per character,
+standing in for token-by-token generation (a non-streamed call takes as long as the
+whole answer, like a real model); the vector store is a small FAISS store
+(in a temporary directory) behind the pipeline's `index_holder`; the chat history fetch sleeps `--history-ms`
+and chat writes are captured instead of going to MongoDB. The answer cache is off so
+every run calls the LLM.
+
+With `get_rag_response` the user sees nothing until the whole answer exists; with
+`stream_rag_response` (what `st.write_stream` consumes) the first text shows up after
+retrieval and one token. Both must produce, and persist, the same full answer.
+
+`rag_pipeline` builds its Cohere clients at import time without calling the API, so
+a placeholder COHERE_API_KEY is set when none is configured.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_streaming --answer-chars 800 --char-ms 4 --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+
+from utils.faiss_indexes import build_faiss_db
+from utils.index_holder import IndexHolder
+from utils.query_cache import QueryEmbeddingCache
+
+os.environ.setdefault("COHERE_API_KEY", "benchmark-placeholder")
+import rag_pipeline  # noqa: E402
+
+
+class SlowFakeListChatModel(FakeListChatModel):
+    """`FakeListChatModel` whose non-streamed call also spends `sleep` per character."""
+
+    def _call(self, *args, **kwargs):
+        response = super()._call(*args, **kwargs)
+        time.sleep(len(response) * (self.sleep or 0))
+        return response
+
+
+def patch_pipeline(answer, char_ms, history_ms, directory):
+    """Point `rag_pipeline` at local fakes; returns the list chat writes are appended to."""
+    embeddings = DeterministicFakeEmbedding(size=64)
+    chunks = [
+        (str(i), Document(page_content=f"Plans start at {10 + i} dollars per month.",
+                          metadata={"source": "https://example.com/pricing"}))
+        for i in range(50)
+    ]
+    store = build_faiss_db(chunks, embeddings, directory, "flat")
+    persisted = []
+
+    def fetch_history(user_id, session_id):
+        time.sleep(history_ms / 1000)
+        return ""
+
+    rag_pipeline.EMBEDDING_MODEL = QueryEmbeddingCache(embeddings)
+    rag_pipeline.index_holder = IndexHolder(lambda: store, lambda: "benchmark")
+    rag_pipeline._fetch_history = fetch_history
+    rag_pipeline._finish_turn = lambda turn, text: persisted.append(text)
+    rag_pipeline.chain = rag_pipeline.prompt | SlowFakeListChatModel(responses=[answer], sleep=char_ms / 1000)
+    rag_pipeline.ANSWER_CACHE_ENABLED = False
+    return persisted
+
+
+def wait_for_writes(persisted, count, timeout=10):
+    deadline = time.monotonic() + timeout
+    while len(persisted) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def run_benchmark(args, answer, directory):
+    persisted = patch_pipeline(answer, args.char_ms, args.history_ms, directory)
+    query = "What does it cost?"
+
+    invoke_first, stream_first, stream_total = [], [], []
+    for run in range(args.runs):
+        start = time.perf_counter()
+        full, docs = rag_pipeline.get_rag_response(query, "bench-session", "bench-user")
+        invoke_first.append(time.perf_counter() - start)  # nothing to show before the whole answer
+        assert full == answer and docs
+
+        start = time.perf_counter()
+        tokens, docs = rag_pipeline.stream_rag_response(query, "bench-session", "bench-user")
+        pieces = [next(tokens)]
+        stream_first.append(time.perf_counter() - start)
+        pieces.extend(tokens)
+        stream_total.append(time.perf_counter() - start)
+        assert "".join(pieces) == answer and docs
+
+        wait_for_writes(persisted, 2 * (run + 1))
+    assert persisted == [answer] * (2 * args.runs), "every answer must be persisted in full"
+
+    ms = lambda values: statistics.median(values) * 1000  # noqa: E731
+    print(f"[BENCH] {args.answer_chars}-char answer at {args.char_ms} ms/char, median of {args.runs} runs")
+    print(f"[BENCH] get_rag_response     first text {ms(invoke_first):8.1f} ms")
+    print(f"[BENCH] stream_rag_response  first text {ms(stream_first):8.1f} ms  "
+          f"full answer {ms(stream_total):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answer-chars", type=int, default=600)
+    parser.add_argument("--char-ms", type=float, default=3.0, help="generation delay per streamed character")
+    parser.add_argument("--history-ms", type=float, default=20.0, help="simulated chat history fetch")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    answer = ("Our plans start at 10 dollars per month and include email support. " * 50)[:args.answer_chars]
+    with tempfile.TemporaryDirectory() as directory:
+        run_benchmark(args, answer, directory)
+
+
+if __name__ == "__main__":
+    main()
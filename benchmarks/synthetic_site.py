@@ -0,0 +1,120 @@
+# benchmarks/synthetic_site.py
+
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def render_page(page_id, num_pages, fanout=5, paragraphs=20):
+    """Render a synthetic HTML page linking to `fanout` other pages of the site."""
+    links = "".join(
+        f'<li><a href="/page/{(page_id * fanout + i) % num_pages}">Page {(page_id * fanout + i) % num_pages}</a></li>'
+        for i in range(1, fanout + 1)
+    )
+    body = "".join(
+        f"<p>Page {page_id} paragraph {j}: synthetic content for crawler benchmarks.</p>"
+        for j in range(paragraphs)
+    )
+    return (
+        "<html><head><title>Page {0}</title><style>p {{ color: #333; }}</style></head>"
+        "<body><nav><ul>{1}</ul></nav><main>{2}</main>"
+        "<script>console.log('page {0}');</script></body></html>"
+    ).format(page_id, links, body)
+
+
+def render_sitemap(urls):
+    """Render a sitemap `<urlset>`; every 10th URL gets a higher priority."""
+    entries = "".join(
+        f"<url><loc>{url}</loc><lastmod>2024-01-01</lastmod><priority>{0.9 if i % 10 == 0 else 0.5}</priority></url>"
+        for i, url in enumerate(urls)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+
+
+class SyntheticSite:
+    """
+    Serve a synthetic site of `num_pages` linked pages from a local HTTP server.
+
+    Every response is delayed by `latency` seconds to mimic a remote host.
+    With `sitemap=True` the site also serves a robots.txt pointing at a sitemap
+    index with one gzipped sitemap listing every page, plus `orphans` extra pages
+    that nothing links to. Use as a context manager; `base_url` points at the
+    first page.
+    """
+
+    def __init__(self, num_pages=200, latency=0.05, fanout=5, paragraphs=20, sitemap=False, orphans=0):
+        self.num_pages = num_pages
+        self.latency = latency
+        self.fanout = fanout
+        self.paragraphs = paragraphs
+        self.sitemap = sitemap
+        self.orphans = orphans
+        self.server = None
+        self.thread = None
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(site.latency)
+                if site.sitemap and self._serve_discovery():
+                    return
+                if self.path == "/" or self.path.startswith("/page/"):
+                    try:
+                        page_id = int(self.path.rsplit("/", 1)[-1] or 0)
+                    except ValueError:
+                        page_id = -1
+                    if 0 <= page_id < site.num_pages + (site.orphans if site.sitemap else 0):
+                        body = render_page(page_id, site.num_pages, site.fanout, site.paragraphs)
+                        self._send(200, body.encode("utf-8"), "text/html; charset=utf-8")
+                        return
+                self._send(404, b"not found", "text/plain")
+
+            def _serve_discovery(self):
+                base = site.base_url
+                if self.path == "/robots.txt":
+                    body = f"User-agent: *\nDisallow: /private/\nSitemap: {base}sitemap_index.xml\n"
+                    self._send(200, body.encode("utf-8"), "text/plain")
+                elif self.path == "/sitemap_index.xml":
+                    body = (
+                        '<?xml version="1.0" encoding="UTF-8"?>'
+                        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                        f"<sitemap><loc>{base}sitemap-1.xml.gz</loc></sitemap></sitemapindex>"
+                    )
+                    self._send(200, body.encode("utf-8"), "application/xml")
+                elif self.path == "/sitemap-1.xml.gz":
+                    urls = [f"{base}page/{i}" for i in range(1, site.num_pages + site.orphans)]
+                    self._send(200, gzip.compress(render_sitemap(urls).encode("utf-8")), "application/gzip")
+                else:
+                    return False
+                return True
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,7 +1,8 @@
 import streamlit as st
-from rag_pipeline import get_rag_response
-from utils.mongo_utils import store_chat, clear_chat
+from rag_pipeline import stream_rag_response
+from utils.mongo_utils import clear_chat
 from utils.session_utils import init_user_session, get_user_and_session
+from utils.document_sources import format_source
 
 # ------------------------ Streamlit Page Config ------------------------ #
 st.set_page_config(page_title="Chatbot", page_icon="🤖")
@@ -20,32 +21,39 @@ user_id, session_id = get_user_and_session()
 if "conversation" not in st.session_state:
     st.session_state.conversation = []
 
+# ------------------------ Display Conversation ------------------------ #
+for chat in st.session_state.conversation:
+    if chat["role"] == "user":
+        st.markdown(f"**You:** {chat['message']}")
+    else:
+        st.markdown(f"**Assistant:** {chat['message']}")
+        if chat.get("sources"):
+            st.caption("Sources: " + " · ".join(chat["sources"]))
+
 # ------------------------ Chat Interface ------------------------ #
 user_input = st.chat_input("💬 Ask me anything...")
 
 if user_input:
     try:
+        st.markdown(f"**You:** {user_input}")
         with st.spinner("🧠 Thinking..."):
-            # Get response from the model
-            answer, sources = get_rag_response(user_input, session_id=session_id, user_id=user_id)
+            # Retrieve documents; the answer is generated while it streams in
+            answer_stream, sources = stream_rag_response(user_input, session_id=session_id, user_id=user_id)
+
+        # Render tokens as they arrive; the pipeline stores the full answer to chat history
+        st.markdown("**Assistant:**")
+        answer = st.write_stream(answer_stream)
+        sources = list(dict.fromkeys(format_source(doc.metadata) for doc in sources))
+        if sources:
+            st.caption("Sources: " + " · ".join(sources))
 
         # Append the conversation to session state
         st.session_state.conversation.append({"role": "user", "message": user_input})
-        st.session_state.conversation.append({"role": "assistant", "message": answer})
-
-        # Store the chat interaction in the database
-        store_chat(user_id, session_id, user_input, answer)
+        st.session_state.conversation.append({"role": "assistant", "message": answer, "sources": sources})
 
     except Exception as e:
         st.error(f"❌ Error occurred: {str(e)}")
 
-# ------------------------ Display Conversation ------------------------ #
-for chat in st.session_state.conversation:
-    if chat["role"] == "user":
-        st.markdown(f"**You:** {chat['message']}")
-    else:
-        st.markdown(f"**Assistant:** {chat['message']}")
-
 # ------------------------ Clear Chat Option ------------------------ #
 if st.button("🗑️ Clear Chat"):
     clear_chat(user_id, session_id)
@@ -1,11 +1,22 @@
 # rag_pipeline.py
 
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
 from langchain_cohere import CohereEmbeddings, ChatCohere
 from langchain_core.prompts import ChatPromptTemplate
 
+from utils.compact_store import HEADER_FILE, INDEX_FILE, LEGACY_DOCSTORE_FILE, CompactVectorStore, has_compact_store
+from utils.document_sources import format_source
+from utils.index_holder import IndexHolder, file_signature
+from utils.query_cache import ANSWER_CACHE_THRESHOLD, QueryEmbeddingCache, SemanticAnswerCache
+from utils.snapshots import current_dir, current_version
+
 # Load environment variables
 load_dotenv()
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
@@ -15,13 +26,18 @@ if not COHERE_API_KEY:
 
 # Vector DB configuration
 FAISS_DB_PATH = "vectorstore"
-INDEX_FILE = os.path.join(FAISS_DB_PATH, "index.faiss")
+
+# Cache configuration
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "1") != "0"
+ANSWER_CACHE_MIN_SIMILARITY = float(os.getenv("ANSWER_CACHE_THRESHOLD", str(ANSWER_CACHE_THRESHOLD)))
+CACHE_REPORT_EVERY = 100    # queries between two cache hit-rate log lines
 
 # Embedding and LLM setup
-EMBEDDING_MODEL = CohereEmbeddings(
+# Repeated questions reuse their query embedding instead of calling Cohere again.
+EMBEDDING_MODEL = QueryEmbeddingCache(CohereEmbeddings(
     model="embed-english-v3.0",
     cohere_api_key=COHERE_API_KEY
-)
+))
 llm = ChatCohere(
     model="command-r-plus",
     temperature=0.3,
@@ -53,23 +69,221 @@ chain = prompt | llm
 
 
 def load_faiss_db():
-    """Load FAISS index from disk (raise if missing)."""
-    if not os.path.exists(INDEX_FILE):
+    """
+    Load the current FAISS snapshot from disk (raise if missing).
+
+    The compact format is memory-mapped and only the retrieved chunks are decoded;
+    a vector DB saved before snapshots and the compact format existed is still
+    loaded from `vectorstore/` itself, through LangChain's pickle.
+    """
+    directory = current_dir(FAISS_DB_PATH)
+    index_file = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(index_file):
         raise FileNotFoundError(
-            f"❌ FAISS index not found at {INDEX_FILE}. "
+            f"❌ FAISS index not found at {index_file}. "
             "Run `vector_database.py` to generate the vectorstore."
         )
+    if has_compact_store(directory):
+        return CompactVectorStore(directory, EMBEDDING_MODEL)
     return FAISS.load_local(
-        FAISS_DB_PATH,
+        directory,
         EMBEDDING_MODEL,
         allow_dangerous_deserialization=True
     )
 
 
+def vectorstore_signature():
+    """Current snapshot version; before snapshots, the vectorstore files' mtimes."""
+    return current_version(FAISS_DB_PATH) or file_signature(
+        os.path.join(FAISS_DB_PATH, INDEX_FILE),
+        os.path.join(FAISS_DB_PATH, HEADER_FILE),
+        os.path.join(FAISS_DB_PATH, LEGACY_DOCSTORE_FILE),
+    )
+
+
+# Loaded once per process and shared by all sessions; reloaded in the background
+# when a new snapshot is published.
+index_holder = IndexHolder(load_faiss_db, vectorstore_signature)
+
+
+def get_faiss_db():
+    """Shared vector store, loading it on first use (raise if missing)."""
+    return index_holder.get()
+
+
+# Answers to (near-)identical questions, valid for the snapshot they were generated from.
+answer_cache = SemanticAnswerCache(threshold=ANSWER_CACHE_MIN_SIMILARITY)
+_queries_answered = 0
+
+
+def cache_report():
+    """Hit rates and estimated time saved by the query caches."""
+    return f"{EMBEDDING_MODEL.summary()}; {answer_cache.summary()}"
+
+
+def _count_query():
+    global _queries_answered
+    _queries_answered += 1
+    if _queries_answered % CACHE_REPORT_EVERY == 0:
+        print(f"[INFO] Query caches after {_queries_answered} questions: {cache_report()}")
+
+
+@dataclass
+class _Turn:
+    """State of one question between retrieval and the answer."""
+    query: str
+    session_id: str
+    user_id: str
+    start: float
+    version: object
+    query_vector: list
+    chat_history: str
+    docs: list = field(default_factory=list)
+    cached_answer: str = None
+
+    @property
+    def inputs(self):
+        context = "\n\n".join(f"[Source: {format_source(doc.metadata)}]\n{doc.page_content}" for doc in self.docs)
+        return {
+            "question": self.query,
+            "context": context,
+            "chat_history": self.chat_history
+        }
+
+
+def _retrieve(query):
+    """Embed the question (cached for repeated questions) and search the shared vector DB."""
+    faiss_db, version = index_holder.current()
+    query_vector = EMBEDDING_MODEL.embed_query(query)
+    return version, query_vector, faiss_db.similarity_search_by_vector(query_vector, k=5)
+
+
+def _fetch_history(user_id, session_id):
+    from utils.mongo_utils import fetch_chat_history  # delayed import
+    return fetch_chat_history(user_id=user_id, session_id=session_id, limit=5)
+
+
+async def _aprepare_turn(query, session_id, user_id):
+    """Steps up to the LLM call: retrieval and history fetch (concurrently), then the answer cache."""
+    start = time.perf_counter()
+
+    # Steps 1-3: Retrieve top-matching documents from the current snapshot while
+    # fetching the previous conversation from MongoDB; neither needs the other.
+    (version, query_vector, docs), chat_history = await asyncio.gather(
+        asyncio.to_thread(_retrieve, query),
+        asyncio.to_thread(_fetch_history, user_id, session_id),
+    )
+    turn = _Turn(query, session_id, user_id, start, version, query_vector, chat_history, docs)
+
+    # Step 4: Reuse the answer to a near-identical question with the same history
+    cached = answer_cache.lookup(query_vector, version, chat_history) if ANSWER_CACHE_ENABLED else None
+    if cached is not None:
+        turn.cached_answer, turn.docs = cached
+    return turn
+
+
+def _finish_turn(turn, answer):
+    """Cache the answer and store this interaction to MongoDB."""
+    from utils.mongo_utils import store_chat  # delayed import
+    if ANSWER_CACHE_ENABLED:
+        if turn.cached_answer is None:
+            answer_cache.store(turn.query_vector, turn.version, (answer, turn.docs), turn.chat_history)
+            answer_cache.record_miss(time.perf_counter() - turn.start)
+        else:
+            answer_cache.record_hit(time.perf_counter() - turn.start)
+    store_chat(turn.user_id, turn.session_id, turn.query, answer)
+    _count_query()
+
+
+# Chat writes happen here, off the response path. Worker threads are joined at
+# interpreter exit, so queued writes are not lost on shutdown.
+_persist_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-persist")
+
+
+def _persist_turn(turn, answer):
+    """Queue `_finish_turn` in the background; failures are logged, not raised to the user."""
+    def persist():
+        try:
+            _finish_turn(turn, answer)
+        except Exception as e:
+            print(f"[ERROR] Failed to store chat turn for session {turn.session_id}: {e}")
+    _persist_pool.submit(persist)
+
+
+# The sync API runs the async pipeline on one long-lived event loop, so the LLM's
+# async HTTP client is always used from the same loop, for whole and streamed answers.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="rag-event-loop", daemon=True).start()
+    return _loop
+
+
+def _run(coroutine):
+    """Run a coroutine on the pipeline's background event loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coroutine, _event_loop()).result()
+
+
+async def _anext(agen):
+    return await agen.__anext__()
+
+
+def _iterate(agen):
+    """
+    Iterate an async generator on the pipeline's event loop from synchronous code.
+
+    Closing the returned generator early (e.g. the user left the page) closes `agen`
+    too, which cancels its pending work.
+    """
+    try:
+        while True:
+            try:
+                yield _run(_anext(agen))
+            except StopAsyncIteration:
+                return
+    finally:
+        # Not waited for: the garbage collector may close this generator on any
+        # thread, including the event loop's own.
+        asyncio.run_coroutine_threadsafe(agen.aclose(), _event_loop())
+
+
+async def aget_rag_response(query: str, session_id: str, user_id: str):
+    """
+    Async RAG response: retrieval and history fetch run concurrently, the LLM is
+    called as soon as both are done, and the chat write happens in the background.
+
+    Args:
+        query (str): User question
+        session_id (str): Unique session ID
+        user_id (str): Unique user ID
+
+    Returns:
+        tuple: (response: str, documents: List[Document])
+    """
+    turn = await _aprepare_turn(query, session_id, user_id)
+
+    # Step 5: Query LLM with context + history
+    answer = turn.cached_answer
+    if answer is None:
+        answer = (await chain.ainvoke(turn.inputs)).content
+
+    # Step 6: Cache and store this interaction, without making the user wait
+    _persist_turn(turn, answer)
+    return answer, turn.docs
+
+
 def get_rag_response(query: str, session_id: str, user_id: str):
     """
     Generate RAG-based response to a query with session-based context.
 
+    Synchronous wrapper around `aget_rag_response`.
+
     Args:
         query (str): User question
         session_id (str): Unique session ID
@@ -78,26 +292,42 @@ def get_rag_response(query: str, session_id: str, user_id: str):
     Returns:
         tuple: (response: str, documents: List[Document])
     """
-    # Step 1: Load FAISS vector DB
-    faiss_db = load_faiss_db()
+    return _run(aget_rag_response(query, session_id, user_id))
 
-    # Step 2: Retrieve top-matching documents
-    docs = faiss_db.similarity_search(query, k=5)
-    context = "\n\n".join(doc.page_content for doc in docs)
 
-    # Step 3: Fetch previous conversation from MongoDB
-    from utils.mongo_utils import store_chat, fetch_chat_history  # delayed import
-    chat_history = fetch_chat_history(user_id=user_id, session_id=session_id, limit=5)
+async def _astream_answer(turn):
+    """Answer pieces for a prepared turn; the full answer is persisted once they are all out."""
+    if turn.cached_answer is not None:
+        pieces = [turn.cached_answer]
+        yield turn.cached_answer
+    else:
+        pieces = []
+        async for chunk in chain.astream(turn.inputs):
+            if chunk.content:
+                pieces.append(chunk.content)
+                yield chunk.content
+    _persist_turn(turn, "".join(pieces))
 
-    # Step 4: Query LLM with context + history
-    inputs = {
-        "question": query,
-        "context": context,
-        "chat_history": chat_history
-    }
-    response = chain.invoke(inputs)
 
-    # Step 5: Store this interaction to MongoDB
-    store_chat(user_id, session_id, query, response.content)
+def stream_rag_response(query: str, session_id: str, user_id: str):
+    """
+    Like `get_rag_response`, but the answer is a generator of text pieces.
+
+    Retrieval runs before this returns; the LLM call starts when the generator is
+    first iterated and yields tokens as they arrive, e.g. for `st.write_stream`. The
+    tokens come from `chain.astream` on the same event loop and async client as
+    `get_rag_response`; the generator only hands them over to the calling thread.
+    Once the stream is exhausted the full answer is cached and stored to chat history
+    in the background; closing the generator early stops generation and stores
+    nothing.
 
-    return response.content, docs
+    Args:
+        query (str): User question
+        session_id (str): Unique session ID
+        user_id (str): Unique user ID
+
+    Returns:
+        tuple: (answer: Iterator[str], documents: List[Document])
+    """
+    turn = _run(_aprepare_turn(query, session_id, user_id))
+    return _iterate(_astream_answer(turn)), turn.docs
@@ -0,0 +1,38 @@
+# tests/conftest.py
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves `server.pages` (path -> HTML) as is, without redirects; 404 otherwise."""
+
+    def do_GET(self):
+        body = self.server.pages.get(self.path)
+        self.send_response(200 if body else 404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.end_headers()
+        self.wfile.write((body or "not found").encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    """Start a local site: `serve(pages)` returns its base URL; edit `pages` to change it."""
+    servers = []
+
+    def start(pages):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        server.pages = pages
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,40 @@
+# tests/test_crawl_links.py
+
+import pytest
+
+from tools.incremental_crawl import recrawl_website
+from tools.page_store import default_pages_path, iter_pages
+from tools.scrap_and_filter import crawl_website
+
+# The test site does not redirect /guide to /guide/, so a crawler that fetches
+# the canonical `/guide` resolves `install/` to the missing `/install`.
+PAGES = {
+    "/": '<html><body><a href="/guide/">Guide</a></body></html>',
+    "/guide/": '<html><body><p>Guide</p><a href="install/">Install</a></body></html>',
+    "/guide/install/": "<html><body><p>Install steps</p></body></html>",
+}
+
+
+@pytest.fixture
+def site(serve):
+    return serve(PAGES)
+
+
+def crawled(output_path):
+    return {page["url"]: page["text"] for page in iter_pages(default_pages_path(output_path))}
+
+
+@pytest.mark.parametrize("concurrency", [None, 2])
+def test_relative_link_on_trailing_slash_page(site, tmp_path, concurrency):
+    output_path = str(tmp_path / "site.txt")
+    crawl_website(site, output_path=output_path, concurrency=concurrency)
+    pages = crawled(output_path)
+    assert pages[f"{site}/guide/install"] == "Install steps"
+    assert f"{site}/install" not in pages
+
+
+def test_recrawl_resolves_relative_link_on_trailing_slash_page(site, tmp_path):
+    output_path = str(tmp_path / "changes.txt")
+    _, changes = recrawl_website(site, output_path=output_path, state_path=str(tmp_path / "state.db"))
+    assert f"{site}/guide/install" in changes.added
+    assert crawled(output_path)[f"{site}/guide/install"] == "Install steps"
@@ -0,0 +1,31 @@
+# tests/test_html_extract.py
+
+import pytest
+
+from tools.html_extract import extract_page, parse_page_soup
+
+URL = "https://www.example.com/docs/"
+
+# `extract_page` must give the same text, links and link texts as the BeautifulSoup reference path.
+CASES = [
+    '<html><head><title>Docs</title></head><body><p>Hello <b>world</b></p><a href="a">A</a></body></html>',
+    "<body><script>var a = 1;</script><style>p {}</style><noscript>Enable JS</noscript><p>x</p></body>",
+    "<body><!-- comment --><p>x</p><?pi y?>tail</body>",
+    '<body><a href="https://other.org/">out</a><a href="/in">in</a><a href="mailto:a@b.c">mail</a></body>',
+    "<p>a<![CDATA[cdata text]]>b</p>",
+    "<body><svg><![CDATA[svg <cdata>]]></svg></body>",
+    '<body><template><p>not shown</p><a href="/t">t</a></template>tail<p>x</p></body>',
+    "<body><textarea>raw <b>not bold</b></textarea></body>",
+    "<body><textarea>a &amp; b &lt;i&gt;</textarea></body>",
+    "<body><xmp>a <b>b</b></xmp><iframe>i <b>x</b></iframe><noembed>n</noembed><noframes>nf</noframes></body>",
+    "<body><plaintext>zz <i>q</i></body>",
+    '<body><script>//<![CDATA[\nvar a = "<textarea>";//]]></script><p>x</p></body>',
+    '<body><nav>Menu<ul><li><a href="/">Home</a></li><li><a href="/p"><b>Pri</b>cing</a> tail</li></ul></nav>'
+    '<p>Call <a href="tel:1">+1 555</a> or <a href="/c">Home</a>.</p></body>',
+    '<body><a href="/x"><!-- c --><script>s</script>Text<template>t</template> after</a></body>',
+]
+
+
+@pytest.mark.parametrize("html", CASES)
+def test_extract_page_matches_beautifulsoup(html):
+    assert extract_page(URL, html) == parse_page_soup(URL, html)
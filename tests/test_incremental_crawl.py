@@ -0,0 +1,134 @@
+# tests/test_incremental_crawl.py
+
+import pytest
+
+import tools.incremental_crawl as incremental_crawl
+import tools.scrap_and_filter as scrap_and_filter
+from tools.incremental_crawl import apply_staged_state, recrawl_website
+from tools.page_store import iter_pages
+
+PAGES = {
+    "/": '<html><body><p>Home</p><a href="/a">A</a> <a href="/b">B</a></body></html>',
+    "/a": "<html><body><p>Page A</p></body></html>",
+    "/b": "<html><body><p>Page B</p></body></html>",
+}
+
+
+@pytest.fixture
+def site(serve):
+    return serve(dict(PAGES))
+
+
+def recrawl(site, tmp_path):
+    return recrawl_website(site, output_path=str(tmp_path / "changes.txt"),
+                           state_path=str(tmp_path / "state.db"))[1]
+
+
+def test_state_is_applied_only_after_indexing(site, tmp_path):
+    changes = recrawl(site, tmp_path)
+    assert len(changes.added) == 3
+
+    # The index update failed (state never applied): the next run sees the same pages as new.
+    changes = recrawl(site, tmp_path)
+    assert len(changes.added) == 3 and not changes.unchanged
+
+    apply_staged_state(changes.run_id, str(tmp_path / "state.db"))
+    changes = recrawl(site, tmp_path)
+    assert not changes.added and len(changes.unchanged) == 3
+
+
+def test_removals_are_applied_only_after_indexing(serve, tmp_path):
+    pages = dict(PAGES)
+    site = serve(pages)
+    apply_staged_state(recrawl(site, tmp_path).run_id, str(tmp_path / "state.db"))
+
+    del pages["/b"]
+    assert recrawl(site, tmp_path).removed == [f"{site}/b"]
+    changes = recrawl(site, tmp_path)
+    assert changes.removed == [f"{site}/b"]
+    apply_staged_state(changes.run_id, str(tmp_path / "state.db"))
+    assert recrawl(site, tmp_path).removed == []
+
+
+def test_resumed_recrawl_reports_pages_from_before_the_interruption(site, tmp_path, monkeypatch):
+    written = []
+
+    def page_record(url, *args, **kwargs):
+        if written:
+            raise KeyboardInterrupt  # the process dies after writing one page
+        written.append(url)
+        return {"url": url, "text": args[0] if args else ""}
+
+    monkeypatch.setattr(incremental_crawl, "page_record", page_record)
+    with pytest.raises(KeyboardInterrupt):
+        recrawl(site, tmp_path)
+    monkeypatch.undo()
+
+    changes = recrawl(site, tmp_path)
+    assert written[0] in changes.added
+    assert sorted(changes.added) == sorted(f"{site}{path}" for path in PAGES)
+
+
+def test_pipeline_keeps_state_when_the_index_update_fails(site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the pipeline writes under ./txt
+    monkeypatch.setattr(scrap_and_filter, "build_or_update_vector_db", lambda **kwargs: False)
+    with pytest.raises(RuntimeError):
+        scrap_and_filter.scrape_and_clean_and_vectorize(site, incremental=True, cleaning="local")
+    assert len(recrawl_website(site)[1].added) == 3
+
+    monkeypatch.setattr(scrap_and_filter, "build_or_update_vector_db", lambda **kwargs: True)
+    scrap_and_filter.scrape_and_clean_and_vectorize(site, incremental=True, cleaning="local")
+    _, changes = recrawl_website(site)
+    assert not changes.added and len(changes.unchanged) == 3
+
+
+def test_pipeline_removes_chunks_of_changed_pages_it_drops(serve, tmp_path, monkeypatch):
+    pages = dict(PAGES)
+    site = serve(pages)
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    def build_or_update_vector_db(**kwargs):
+        calls.append(kwargs)
+        return True
+
+    monkeypatch.setattr(scrap_and_filter, "build_or_update_vector_db", build_or_update_vector_db)
+    scrap_and_filter.scrape_and_clean_and_vectorize(site, incremental=True, cleaning="local")
+    assert not calls[-1]["removed_sources"]
+
+    pages["/a"] = pages["/b"] = "<html><body><p>Both pages now say the same thing.</p></body></html>"
+    scrap_and_filter.scrape_and_clean_and_vectorize(site, incremental=True, cleaning="local")
+    assert calls[-1]["removed_sources"] == [f"{site}/b"]
+
+
+FOOTER = ("<footer><p>Example Inc answers support questions every day of the week.</p>"
+          "<p>Write to help@example.com for anything about your account.</p></footer>")
+
+
+def cleaned_pages(tmp_path):
+    return {page["url"]: page["text"] for page in iter_pages(str(tmp_path / "txt" / "cleaned_text.jsonl"))}
+
+
+def test_incremental_dedup_covers_the_whole_site(serve, tmp_path, monkeypatch):
+    paths = [f"/p{i}" for i in range(6)]
+    pages = {"/": "<html><body><p>Home</p>" + "".join(f'<a href="{p}">{p}</a>' for p in paths) + FOOTER}
+    pages.update({p: f"<html><body><p>Topic {p} explained in detail.</p>{FOOTER}</body></html>" for p in paths})
+    site = serve(pages)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scrap_and_filter, "build_or_update_vector_db", lambda **kwargs: True)
+
+    scrap_and_filter.scrape_and_clean_and_vectorize(site, incremental=True, cleaning="local")
+    cleaned = cleaned_pages(tmp_path)
+    assert sum("help@example.com" in text for text in cleaned.values()) == 1
+
+    # A one-page delta is still checked against the other pages' boilerplate.
+    pages["/p1"] = f"<html><body><p>Topic p1, now with a new section.</p>{FOOTER}</body></html>"
+    scrap_and_filter.scrape_and_clean_and_vectorize(site, incremental=True, cleaning="local")
+    assert cleaned_pages(tmp_path) == {f"{site}/p1": "Topic p1, now with a new section."}
+
+    # ...and against their text for duplicates.
+    pages["/p2"] = pages["/p3"]
+    calls = []
+    monkeypatch.setattr(scrap_and_filter, "build_or_update_vector_db", lambda **kwargs: calls.append(kwargs) or True)
+    scrap_and_filter.scrape_and_clean_and_vectorize(site, incremental=True, cleaning="local")
+    assert calls[-1]["removed_sources"] == [f"{site}/p2"]
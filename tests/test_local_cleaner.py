@@ -0,0 +1,52 @@
+# tests/test_local_cleaner.py
+
+from tools.html_extract import extract_page
+from tools.local_cleaner import clean_text_locally
+
+URL = "https://www.example.com/contact"
+
+NAV = '<nav><ul>' + "".join(f'<li><a href="/{name}">{name}</a></li>'
+                            for name in ("Home", "About", "Pricing", "Blog", "Contact")) + '</ul></nav>'
+TABLE = """<table>
+<tr><th>Plan</th><th>Price</th><th>Support</th><th>API</th></tr>
+<tr><td>Basic</td><td>$10/month</td><td>Email</td><td>Yes</td></tr>
+<tr><td>Pro</td><td>$10/month</td><td>Included</td><td>Yes</td></tr>
+</table>"""
+ADDRESS = "<address>Example Inc<br>12 Main Street<br>Springfield<br>IL 62704<br>United States</address>"
+SENTENCE = ('<p>Call us at <a href="tel:+15550100">+1 555 0100</a> or email us at '
+            '<a href="mailto:help@x.com">help@x.com</a> today</p>')
+
+
+def clean(body):
+    text, _, _, link_texts = extract_page(URL, f"<html><body>{body}</body></html>")
+    return clean_text_locally(text, link_texts).splitlines()
+
+
+def test_navigation_menu_is_dropped():
+    assert clean(NAV + "<p>We answer within a day.</p>") == ["We answer within a day."]
+
+
+def test_table_keeps_every_cell():
+    lines = clean(NAV + TABLE)
+    assert lines == ["Plan", "Price", "Support", "API",
+                     "Basic", "$10/month", "Email", "Yes",
+                     "Pro", "$10/month", "Included", "Yes"]
+
+
+def test_address_is_kept():
+    assert clean(ADDRESS) == ["Example Inc", "12 Main Street", "Springfield", "IL 62704", "United States"]
+
+
+def test_sentence_with_inline_links_is_kept():
+    assert clean(TABLE + SENTENCE)[-5:] == ["Call us at", "+1 555 0100", "or email us at", "help@x.com", "today"]
+
+
+def test_short_lines_are_only_menus_when_they_are_link_texts():
+    text = "Home\nAbout\nPricing\nBlog\nContact"
+    assert clean_text_locally(text) == text
+    assert clean_text_locally(text, link_texts=["Home", "About", "Pricing", "Blog", "Contact"]) == ""
+
+
+def test_long_repeated_lines_are_removed():
+    line = "Our support team answers every question within one business day."
+    assert clean_text_locally(f"{line}\nYes\n{line}\nYes") == f"{line}\nYes\nYes"
@@ -0,0 +1,18 @@
+# tests/test_query_cache.py
+
+from utils.query_cache import SemanticAnswerCache
+
+
+def test_store_with_stale_version_is_dropped():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store([1.0, 0.0], "v1", "old answer")
+    assert cache.lookup([1.0, 0.0], "v1") == "old answer"
+
+    # a hot reload to v2 is seen by a lookup while an answer from v1 is being generated
+    assert cache.lookup([0.0, 1.0], "v2") is None
+    cache.store([0.0, 1.0], "v2", "new answer")
+    cache.store([1.0, 0.0], "v1", "stale answer")
+
+    assert cache.lookup([1.0, 0.0], "v2") is None
+    assert cache.lookup([0.0, 1.0], "v2") == "new answer"
+    assert cache.invalidations == 1
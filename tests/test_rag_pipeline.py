@@ -0,0 +1,95 @@
+# tests/test_rag_pipeline.py
+
+import os
+import threading
+import time
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessageChunk
+
+from utils.faiss_indexes import build_faiss_db
+from utils.index_holder import IndexHolder
+
+os.environ.setdefault("COHERE_API_KEY", "test-placeholder")
+import rag_pipeline  # noqa: E402
+
+
+class FakeChain:
+    """Streams `pieces` as LLM chunks, recording the thread it ran on and whether it was closed."""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.threads = set()
+        self.closed = threading.Event()
+
+    async def astream(self, inputs):
+        try:
+            for piece in self.pieces:
+                self.threads.add(threading.current_thread().name)
+                yield AIMessageChunk(content=piece)
+        finally:
+            self.closed.set()
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    store = build_faiss_db([("0", Document(page_content="Plans start at 10 dollars.",
+                                           metadata={"source": "https://example.com/pricing"}))],
+                           embeddings, str(tmp_path / "store"), "flat")
+    persisted = []
+    monkeypatch.setattr(rag_pipeline, "EMBEDDING_MODEL", embeddings)
+    monkeypatch.setattr(rag_pipeline, "index_holder", IndexHolder(lambda: store, lambda: "v1"))
+    monkeypatch.setattr(rag_pipeline, "_fetch_history", lambda user_id, session_id: "")
+    monkeypatch.setattr(rag_pipeline, "_finish_turn", lambda turn, answer: persisted.append(answer))
+    monkeypatch.setattr(rag_pipeline, "ANSWER_CACHE_ENABLED", False)
+    return persisted
+
+
+def test_stream_runs_on_the_pipeline_event_loop(pipeline, monkeypatch):
+    chain = FakeChain(["Plans ", "start ", "at 10."])
+    monkeypatch.setattr(rag_pipeline, "chain", chain)
+
+    tokens, docs = rag_pipeline.stream_rag_response("price?", "s", "u")
+    assert list(tokens) == chain.pieces and docs
+    assert chain.threads == {"rag-event-loop"}
+    assert wait_until(lambda: pipeline == ["Plans start at 10."])
+
+
+def test_abandoned_stream_is_closed_and_not_persisted(pipeline, monkeypatch):
+    chain = FakeChain(["Plans ", "start ", "at 10."])
+    monkeypatch.setattr(rag_pipeline, "chain", chain)
+
+    tokens, _ = rag_pipeline.stream_rag_response("price?", "s", "u")
+    assert next(tokens) == "Plans "
+    tokens.close()  # e.g. the user navigated away mid-answer
+    assert chain.closed.wait(5)
+    time.sleep(0.1)
+    assert pipeline == []
+
+
+def test_persist_failure_does_not_reach_the_user(pipeline, monkeypatch, capsys):
+    monkeypatch.setattr(rag_pipeline, "chain", FakeChain(["Plans ", "start ", "at 10."]))
+
+    def failing_finish(turn, answer):
+        raise ConnectionError("MongoDB is down")
+
+    monkeypatch.setattr(rag_pipeline, "_finish_turn", failing_finish)
+    tokens, _ = rag_pipeline.stream_rag_response("price?", "s", "u")
+    assert "".join(tokens) == "Plans start at 10."
+    output = []
+
+    def logged():
+        output.append(capsys.readouterr().out)
+        return "[ERROR] Failed to store chat turn" in "".join(output)
+
+    assert wait_until(logged)
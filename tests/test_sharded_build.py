@@ -0,0 +1,49 @@
+# tests/test_sharded_build.py
+
+import functools
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils import sharded_build
+from utils.faiss_indexes import build_faiss_db
+from utils.sharded_build import MIN_SHARD_SIZE, build_sharded_faiss_db, shard_size_for
+
+factory = functools.partial(DeterministicFakeEmbedding, size=16)
+
+
+def chunks(count):
+    for i in range(count):
+        yield f"chunk-{i:05d}", Document(page_content=f"text {i}", metadata={"source": f"page-{i // 10}"})
+
+
+def ids(store):
+    return [store.get(position).id for position in range(len(store))]
+
+
+def test_shard_size_follows_corpus_and_workers():
+    assert shard_size_for(100, 4) == MIN_SHARD_SIZE
+    assert shard_size_for(100_000, 4) == 6250
+    assert shard_size_for(100_000, 16) == 1563
+
+
+def test_single_shard_corpus_is_built_in_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(sharded_build, "ProcessPoolExecutor", lambda *args, **kwargs: pytest.fail("pool started"))
+    store, stats = build_sharded_faiss_db(list(chunks(200)), factory(), factory, str(tmp_path), "flat", max_workers=4)
+    assert ids(store) == [doc_id for doc_id, _ in chunks(200)]
+    assert stats.texts == 0
+    store.close()
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf-flat"])
+def test_sharded_build_matches_serial_build(tmp_path, index_type):
+    serial = build_faiss_db(chunks(700), factory(), str(tmp_path / "serial"), index_type)
+    sharded, _ = build_sharded_faiss_db(chunks(700), factory(), factory, str(tmp_path / "sharded"), index_type,
+                                        shard_size=MIN_SHARD_SIZE, max_workers=2)
+    assert ids(sharded) == ids(serial)
+    query = "text 512"
+    assert [doc.id for doc in sharded.similarity_search(query, k=3)] == \
+        [doc.id for doc in serial.similarity_search(query, k=3)]
+    serial.close()
+    sharded.close()
@@ -0,0 +1,121 @@
+# tests/test_vector_store.py
+
+import os
+
+import faiss
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import vector_database
+from utils.compact_store import RECORDS_FILE, CompactVectorStore
+from utils.faiss_indexes import build_faiss_db
+from vector_database import chunk_id, update_index
+
+INDEX_TYPES = ["flat", "hnsw", "ivf-flat"]
+
+
+def pages(sources, version=0):
+    return [
+        Document(page_content=f"{source} paragraph {i} version {version}", metadata={"source": source})
+        for source in sources for i in range(3)
+    ]
+
+
+def records(store):
+    """Chunks of a store, deleted records excluded."""
+    return [store.get(position) for position, _, _ in store.iter_keys()]
+
+
+def assert_aligned(store, embeddings):
+    """Every live vector label is the position of the record it was embedded from."""
+    index = store.index
+    if isinstance(index, faiss.IndexIVF):
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    positions = np.array([position for position, _, _ in store.iter_keys()], dtype=np.int64)
+    texts = [doc.page_content for doc in records(store)]
+    expected = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    assert np.allclose(index.reconstruct_batch(positions), expected)
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def built(tmp_path, embeddings, request):
+    sources = [f"page-{i}" for i in range(30)]
+    directory = str(tmp_path / "base")
+    store = build_faiss_db(((chunk_id(doc), doc) for doc in pages(sources)), embeddings, directory, request.param)
+    store.close()
+    return directory, sources
+
+
+@pytest.mark.parametrize("built", INDEX_TYPES, indirect=True)
+def test_build_streams_records_to_the_store(built, embeddings):
+    directory, sources = built
+    store = CompactVectorStore(directory, embeddings, mmap_index=False)
+    assert [doc.id for doc in records(store)] == [chunk_id(doc) for doc in pages(sources)]
+    assert not [name for name in os.listdir(directory) if name.endswith(".tmp")]
+    assert_aligned(store, embeddings)
+    store.close()
+
+
+@pytest.mark.parametrize("built", INDEX_TYPES, indirect=True)
+def test_update_appends_and_deletes_records(built, embeddings, tmp_path):
+    base_dir, sources = built
+    changed = pages(sources[:2], version=1)
+    current = changed + pages(sources[2:-3])
+    with open(os.path.join(base_dir, RECORDS_FILE), "rb") as f:
+        base_records = f.read()
+
+    store, update = update_index(base_dir, str(tmp_path / "next"), iter(current), embeddings, batch_size=4)
+    assert (update.added, update.removed, update.kept) == (6, 15, 75)
+    assert sorted(doc.id for doc in records(store)) == sorted(chunk_id(doc) for doc in current)
+    assert_aligned(store, embeddings)
+    hit = store.similarity_search(changed[0].page_content, k=1)[0]
+    assert hit.page_content == changed[0].page_content
+    store.close()
+    with open(os.path.join(base_dir, RECORDS_FILE), "rb") as f:
+        assert f.read() == base_records  # the published snapshot is never modified
+
+
+@pytest.mark.parametrize("built", INDEX_TYPES, indirect=True)
+def test_few_deletions_do_not_rebuild_the_index(built, embeddings, tmp_path, monkeypatch):
+    base_dir, sources = built
+    monkeypatch.setattr(vector_database, "rebuild_index", lambda index, keep: pytest.fail("index rebuilt"))
+    removed = pages(sources[:2])
+
+    first, update = update_index(base_dir, str(tmp_path / "first"), iter(pages(sources[2:])), embeddings)
+    assert (update.removed, update.rebuilt) == (6, False)
+    assert len(first) == 84 and first.record_count == 90
+    assert first.index.ntotal == (84 if isinstance(first.index, faiss.IndexIVF) else 90)
+    first.close()
+
+    # Tombstones carry over to the next update, and new vectors get the next positions.
+    added = Document(page_content="a new page", metadata={"source": "page-new"})
+    second, update = update_index(str(tmp_path / "first"), str(tmp_path / "second"),
+                                  iter(pages(sources[3:]) + [added]), embeddings)
+    assert (update.added, update.removed, update.rebuilt) == (1, 3, False)
+    assert len(second) == 82 and second.record_count == 91
+    assert_aligned(second, embeddings)
+    assert second.similarity_search("a new page", k=1)[0].page_content == "a new page"
+    deleted = {chunk_id(doc) for doc in removed + pages(sources[2:3])}
+    for doc in removed:
+        assert not deleted & {hit.id for hit in second.similarity_search(doc.page_content, k=5)}
+    second.close()
+
+
+@pytest.mark.parametrize("built", INDEX_TYPES, indirect=True)
+def test_many_deletions_compact_the_store(built, embeddings, tmp_path):
+    base_dir, sources = built
+    kept = pages(sources[10:])
+
+    store, update = update_index(base_dir, str(tmp_path / "next"), iter(kept), embeddings)
+    assert (update.removed, update.rebuilt) == (30, True)
+    assert len(store) == store.record_count == store.index.ntotal == 60
+    assert [doc.id for doc in records(store)] == [chunk_id(doc) for doc in kept]
+    assert_aligned(store, embeddings)
+    store.close()
@@ -0,0 +1,181 @@
+# tools/ai_cleaner.py
+
+import hashlib
+import os
+import random
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+CLEAN_MODEL = "command-r"
+CLEAN_PROMPT = (
+    "Please clean and reformat the following text without summarizing or removing important information. "
+    "Remove exact duplicate lines, extra spaces, or broken formatting, but preserve the full content:\n\n"
+)
+CACHE_PATH = "cache/cleaned_chunks.db"
+
+# --- Execution defaults ---
+MAX_WORKERS = 4
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 1.0
+CHARS_PER_TOKEN = 4         # rough token estimate used for budgeting
+COST_PER_1K_TOKENS = 0.0006  # USD, blended input/output estimate for command-r
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class CleaningCache:
+    """On-disk cache of cleaned chunks keyed by a hash of (model, prompt, chunk)."""
+
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cleaned (key TEXT PRIMARY KEY, text TEXT NOT NULL)")
+
+    @staticmethod
+    def key(model, prompt, chunk):
+        return hashlib.sha256("\0".join((model, prompt, chunk)).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        row = self.conn.execute("SELECT text FROM cleaned WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, text):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO cleaned (key, text) VALUES (?, ?)", (key, text))
+
+    def close(self):
+        self.conn.close()
+
+
+@dataclass
+class CleaningStats:
+    chunks: int = 0
+    cache_hits: int = 0
+    api_calls: int = 0
+    retries: int = 0
+    failed: int = 0
+    over_budget: int = 0
+    tokens: int = 0
+
+    @property
+    def cost(self):
+        return self.tokens / 1000 * COST_PER_1K_TOKENS
+
+    def summary(self):
+        return (
+            f"{self.chunks} chunks: {self.cache_hits} cached, {self.api_calls} API calls "
+            f"({self.retries} retries), {self.failed} failed, {self.over_budget} over budget; "
+            f"~{self.tokens} tokens (~${self.cost:.4f})"
+        )
+
+
+class CleaningExecutor:
+    """
+    Clean text chunks with an LLM, concurrently, with caching, retries and a budget.
+
+    Chunks run on a bounded thread pool and come back in input order. Results are
+    cached on disk, so re-running the pipeline only pays for new chunks. Failed calls
+    are retried with exponential backoff; a chunk that still fails, or that would push
+    the run over `token_budget` / `max_cost`, is passed through uncleaned instead of
+    being dropped.
+
+    Args:
+        chat_fn (Callable[[str, str], str]): Sends `(model, message)` to the chat API and
+            returns the reply text. Swap in a fake for tests and benchmarks.
+        model (str): Chat model name (part of the cache key)
+        prompt (str): Instruction prefixed to every chunk (part of the cache key)
+        max_workers (int): Concurrent chat calls
+        cache_path (str): SQLite cache file, or None to disable caching
+        max_retries (int): Retries per chunk after the first attempt
+        backoff (float): Base delay in seconds, doubled on every retry
+        token_budget (int): Maximum estimated tokens to spend (None for no limit)
+        max_cost (float): Maximum estimated USD to spend (None for no limit)
+    """
+
+    def __init__(self, chat_fn, model=CLEAN_MODEL, prompt=CLEAN_PROMPT, max_workers=MAX_WORKERS,
+                 cache_path=CACHE_PATH, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS,
+                 token_budget=None, max_cost=None):
+        self.chat_fn = chat_fn
+        self.model = model
+        self.prompt = prompt
+        self.max_workers = max_workers
+        self.cache = CleaningCache(cache_path) if cache_path else None
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.token_budget = token_budget
+        if max_cost is not None:
+            cost_tokens = int(max_cost / COST_PER_1K_TOKENS * 1000)
+            self.token_budget = min(self.token_budget or cost_tokens, cost_tokens)
+        self.stats = CleaningStats()
+
+    def _call(self, chunk):
+        """Run one chat call with retries; runs on a worker thread."""
+        message = self.prompt + chunk
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.chat_fn(self.model, message).strip(), attempt
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+                print(f"[WARN] Clean call failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _submit(self, pool, index, chunk):
+        self.stats.chunks += 1
+        key = self.cache.key(self.model, self.prompt, chunk) if self.cache else None
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            self.stats.cache_hits += 1
+            return index, chunk, key, None, cached
+
+        # Reserve the request's estimated cost up front so concurrent calls cannot
+        # overshoot the budget; the reply's share is added when it arrives.
+        request_tokens = estimate_tokens(self.prompt) + estimate_tokens(chunk)
+        if self.token_budget is not None and self.stats.tokens + 2 * request_tokens > self.token_budget:
+            self.stats.over_budget += 1
+            return index, chunk, key, None, chunk
+        self.stats.tokens += request_tokens
+        self.stats.api_calls += 1
+        return index, chunk, key, pool.submit(self._call, chunk), None
+
+    def _resolve(self, pending):
+        index, chunk, key, future, text = pending
+        if future is None:
+            return text
+        try:
+            text, retries = future.result()
+        except Exception as e:
+            self.stats.failed += 1
+            print(f"[ERROR] Failed to clean chunk {index + 1}: {e}; keeping it uncleaned.")
+            return chunk
+        self.stats.retries += retries
+        self.stats.tokens += estimate_tokens(text)
+        if self.cache:
+            self.cache.put(key, text)
+        print(f"[INFO] Chunk {index + 1} cleaned.")
+        return text
+
+    def imap(self, chunks):
+        """Yield cleaned chunks in input order, keeping at most 2x `max_workers` in flight."""
+        window = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for index, chunk in enumerate(chunks):
+                window.append(self._submit(pool, index, chunk))
+                if len(window) >= 2 * self.max_workers:
+                    yield self._resolve(window.popleft())
+            while window:
+                yield self._resolve(window.popleft())
+
+    def clean(self, chunks):
+        """Clean a list of chunks, returning the cleaned texts in the same order."""
+        return list(self.imap(chunks))
+
+    def close(self):
+        if self.cache:
+            self.cache.close()
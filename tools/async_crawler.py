@@ -0,0 +1,188 @@
+# tools/async_crawler.py
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+import aiohttp
+
+from tools.html_extract import link_base, parse_page_bytes
+from tools.crawl_frontier import DEFAULT_TRACKING_PARAMS
+from tools.crawl_journal import CrawlJournal, default_journal_path
+from tools.page_store import PageSink, page_record
+from tools.sitemap_discovery import discover_site
+
+# --- Engine defaults ---
+DEFAULT_CONCURRENCY = 16
+DEFAULT_PER_HOST_LIMIT = 4
+DEFAULT_QUEUE_SIZE = 256
+REQUEST_TIMEOUT = 10
+
+
+class HostRateLimiter:
+    """Space out requests to the same host to at most `requests_per_second`."""
+
+    def __init__(self, requests_per_second=None):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = {}
+        self._locks = {}
+
+    async def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            slot = self._next_slot.get(host, now)
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            self._next_slot[host] = max(slot, now) + self.interval
+
+
+async def fetch_page(session, limiter, url):
+    """
+    Download a single page through the shared session.
+
+    Returns:
+        tuple: (status: int or None, body: bytes or None, content_type: str or None,
+        final_url: str); body is None on failure, final_url is where redirects ended
+    """
+    await limiter.wait(url)
+    status = None
+    try:
+        async with session.get(url) as resp:
+            status = resp.status
+            resp.raise_for_status()
+            return status, await resp.read(), resp.headers.get("Content-Type"), str(resp.url)
+    except Exception as e:
+        print(f"[ERROR] Failed to scrape {url}: {e}")
+        return status, None, None, url
+
+
+async def _worker(session, limiter, work_queue, result_queue, parse_pool, parse_slots):
+    """
+    Fetch `(canonical_url, url)` pairs from `work_queue` and push `(url, record, links)`
+    to `result_queue`; the record is keyed by the canonical URL.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        key, url = await work_queue.get()
+        status, text, links, title, link_texts = None, "", [], "", []
+        try:
+            status, body, content_type, final_url = await fetch_page(session, limiter, url)
+            if body is not None:
+                # Parsing is CPU-bound; keep it off the event loop. Waiting for a
+                # parse slot stops this worker from fetching more pages meanwhile,
+                # which bounds how much raw HTML is held in memory.
+                async with parse_slots:
+                    text, links, title, link_texts = await loop.run_in_executor(
+                        parse_pool, parse_page_bytes, link_base(url, final_url), body, content_type
+                    )
+        except Exception as e:
+            print(f"[ERROR] Failed to parse {url}: {e}")
+        finally:
+            work_queue.task_done()
+        record = page_record(key, text, title=title, status=status, link_texts=link_texts)
+        await result_queue.put((url, record, links))
+
+
+async def crawl_website_async(start_url, max_pages=None, output_path="txt/webscraper.txt",
+                              concurrency=DEFAULT_CONCURRENCY,
+                              per_host_limit=DEFAULT_PER_HOST_LIMIT,
+                              requests_per_second=None,
+                              queue_size=DEFAULT_QUEUE_SIZE,
+                              tracking_params=DEFAULT_TRACKING_PARAMS,
+                              journal_path=None,
+                              resume=True,
+                              pages_path=None,
+                              parse_workers=None,
+                              discover=False,
+                              since=None):
+    """
+    Crawl internal pages concurrently and save text in the `crawl_website` format.
+
+    Args:
+        start_url (str): URL to start crawling from
+        max_pages (int): Maximum number of pages to fetch (None for no limit)
+        output_path (str): Where to write the scraped text
+        concurrency (int): Number of requests in flight at once
+        per_host_limit (int): Maximum open connections per host
+        requests_per_second (float): Per-host request rate limit (None for no limit)
+        queue_size (int): Capacity of the bounded work and result queues
+        tracking_params (Iterable[str]): Query parameters dropped when canonicalizing URLs
+        journal_path (str): Crawl checkpoint file (defaults to one next to `output_path`)
+        resume (bool): Resume an interrupted crawl of the same `start_url` from the journal
+        pages_path (str): JSONL page stream (defaults to `output_path` with a `.jsonl` suffix)
+        parse_workers (int): Parse HTML in a pool of this many processes instead of a
+            thread, so parsing is not limited to one core (None to parse in a thread)
+        discover (bool): Seed the frontier from robots.txt and sitemaps, skip disallowed
+            URLs and honour `Crawl-delay` (see `tools.sitemap_discovery.discover_site`)
+        since (datetime or str): With `discover`, skip URLs whose sitemap `lastmod` is older
+
+    Returns:
+        str: Path of the written text file
+    """
+    discovery = None
+    if discover:
+        discovery = await asyncio.to_thread(discover_site, start_url, since)
+        requests_per_second = discovery.requests_per_second(requests_per_second)
+
+    journal = CrawlJournal(journal_path or default_journal_path(output_path), start_url, resume)
+    frontier = journal.frontier(tracking_params, allow=discovery.allow if discovery else None)
+    if discovery:
+        journal.record_links(discovery.seed(frontier))
+    sink = PageSink(output_path, pages_path, append=journal.resumed)
+
+    work_queue = asyncio.Queue(maxsize=queue_size)
+    result_queue = asyncio.Queue(maxsize=queue_size)
+    limiter = HostRateLimiter(requests_per_second)
+
+    parse_pool = None
+    parse_slots = asyncio.Semaphore(concurrency)
+    if parse_workers:
+        # Spawned workers only import the lightweight html_extract module.
+        parse_pool = ProcessPoolExecutor(parse_workers, mp_context=multiprocessing.get_context("spawn"))
+        parse_slots = asyncio.Semaphore(2 * parse_workers)
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host_limit)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        workers = [
+            asyncio.create_task(_worker(session, limiter, work_queue, result_queue, parse_pool, parse_slots))
+            for _ in range(concurrency)
+        ]
+        in_flight = 0
+        try:
+            while True:
+                # Hand out as much work as the bounded queue accepts without blocking,
+                # so this loop is always free to drain results.
+                while (frontier and not work_queue.full()
+                       and (max_pages is None or frontier.visited < max_pages)):
+                    url = frontier.pop()
+                    print(f"[INFO] Scraping: {url}")
+                    work_queue.put_nowait((frontier.canonicalize(url), url))
+                    in_flight += 1
+
+                if in_flight == 0:
+                    break
+
+                url, record, links = await result_queue.get()
+                in_flight -= 1
+                sink.write(record)
+                journal.record_page(url, frontier.extend(links))
+
+            journal.mark_complete()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if parse_pool:
+                parse_pool.shutdown(cancel_futures=True)
+            sink.close()
+            journal.close()
+
+    print(f"[INFO] Raw scraped content saved to {output_path}")
+    return output_path
@@ -0,0 +1,133 @@
+# tools/crawl_frontier.py
+
+from collections import deque
+from functools import lru_cache
+from urllib.parse import urldefrag, urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that only track the visitor and never change page content.
+# Entries ending in "*" match any parameter with that prefix.
+DEFAULT_TRACKING_PARAMS = frozenset({
+    "utm_*", "gclid", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "igshid", "ref_src",
+})
+
+
+@lru_cache(maxsize=32)
+def _tracking_rules(tracking_params):
+    """Split a frozenset of tracking params into exact names and prefixes."""
+    exact = frozenset(p for p in tracking_params if not p.endswith("*"))
+    prefixes = tuple(p[:-1] for p in tracking_params if p.endswith("*"))
+    return exact, prefixes
+
+
+def canonicalize_url(url, tracking_params=DEFAULT_TRACKING_PARAMS):
+    """
+    Normalize a URL so that equivalent spellings of the same page compare equal.
+
+    Lowercases the scheme and host, drops default ports, the fragment and tracking
+    query parameters, sorts the remaining query parameters and removes trailing
+    slashes from non-root paths.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    host = (parts.hostname or "").lower()
+    if ":" in host:  # IPv6 literal
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    exact, prefixes = _tracking_rules(frozenset(tracking_params))
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in exact and not k.startswith(prefixes)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+class CrawlFrontier:
+    """
+    FIFO queue of URLs to crawl with O(1) membership checks.
+
+    Every URL is canonicalized on the way in and is handed out at most once, so the
+    frontier also acts as the crawl's visited set. The canonical form is only a key:
+    URLs are queued and handed out as they were discovered (minus the fragment), since
+    canonicalizing can change how the page's relative links resolve (e.g. `/guide/`
+    vs `/guide`). Each crawl owns its own frontier,
+    which lets several crawls run side by side in one process. URLs for which
+    `allow(url)` is false (e.g. disallowed by robots.txt) are never queued.
+    """
+
+    def __init__(self, seeds=(), tracking_params=DEFAULT_TRACKING_PARAMS, allow=None):
+        self.tracking_params = frozenset(tracking_params)
+        self.allow = allow
+        self._queue = deque()
+        self._seen = set()
+        self.visited = 0
+        self.extend(seeds)
+
+    def canonicalize(self, url):
+        return canonicalize_url(url, self.tracking_params)
+
+    def add(self, url):
+        """Queue a URL unless an equivalent one was already queued or visited."""
+        return bool(self.extend([url]))
+
+    def extend(self, urls):
+        """Queue several URLs, returning those that were new, as they will be fetched."""
+        added = []
+        for url in urls:
+            key = self.canonicalize(url)
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            url = urldefrag(url.strip()).url
+            if self.allow is None or self.allow(url):
+                self._queue.append(url)
+                added.append(url)
+        return added
+
+    def skip(self, urls):
+        """Mark URLs as seen without queueing them, so links to them are ignored too."""
+        self._seen.update(self.canonicalize(url) for url in urls)
+
+    @classmethod
+    def restore(cls, pending, seen, visited, tracking_params=DEFAULT_TRACKING_PARAMS, allow=None):
+        """Rebuild a frontier from saved state: URLs still to fetch and canonical URLs already seen."""
+        frontier = cls(tracking_params=tracking_params, allow=allow)
+        frontier._queue.extend(pending)
+        frontier._seen.update(seen)
+        frontier._seen.update(frontier.canonicalize(url) for url in pending)
+        frontier.visited = visited
+        return frontier
+
+    def pop(self):
+        """Return the next URL to fetch and count it as visited; `canonicalize` it for a key."""
+        url = self._queue.popleft()
+        self.visited += 1
+        return url
+
+    def __contains__(self, url):
+        return self.canonicalize(url) in self._seen
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __bool__(self):
+        return bool(self._queue)
@@ -0,0 +1,132 @@
+# tools/crawl_journal.py
+
+import os
+import sqlite3
+import time
+
+from tools.crawl_frontier import CrawlFrontier, DEFAULT_TRACKING_PARAMS, canonicalize_url
+
+QUEUED, DONE = 0, 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, state INTEGER NOT NULL DEFAULT 0, fetch_url TEXT);
+"""
+
+
+def default_journal_path(output_path):
+    """Journal file kept next to the crawl output, e.g. `txt/webscraper.journal.db`."""
+    return os.path.splitext(output_path)[0] + ".journal.db"
+
+
+class CrawlJournal:
+    """
+    SQLite checkpoint of a crawl: the frontier and the visited set.
+
+    Each finished page is committed together with the links it discovered, so a crawl
+    that dies midway can be resumed from the last finished page. URLs that were handed
+    out but never finished stay queued and are fetched again on resume. URLs are keyed
+    by their canonical form; queued ones also keep the URL to fetch. Page text is not
+    kept here; it is streamed to disk by `tools.page_store.PageSink`.
+    """
+
+    def __init__(self, path, start_url, resume=True):
+        self.path = path
+        self.start_url = start_url
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if "fetch_url" not in {row[1] for row in self.conn.execute("PRAGMA table_info(urls)")}:
+            self.conn.execute("ALTER TABLE urls ADD COLUMN fetch_url TEXT")  # journal from an older version
+        self.canonicalize = canonicalize_url
+
+        saved_start = self._get_meta("start_url")
+        self.resumed = (
+            resume
+            and saved_start == start_url
+            and self._get_meta("status") == "running"
+        )
+        if not self.resumed:
+            self.reset()
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def reset(self):
+        """Discard any previous crawl and start a fresh journal."""
+        with self.conn:
+            self.conn.execute("DELETE FROM urls")
+            self.conn.execute("DELETE FROM meta")
+            self._set_meta("start_url", self.start_url)
+            self._set_meta("status", "running")
+            self._set_meta("run_id", str(int(time.time() * 1000)))
+
+    @property
+    def run_id(self):
+        """Identifier of the crawl run, kept across resumes."""
+        value = self._get_meta("run_id")
+        return int(value) if value else 0
+
+    def frontier(self, tracking_params=DEFAULT_TRACKING_PARAMS, allow=None):
+        """Return the crawl frontier, restored from the journal when resuming."""
+        if not self.resumed:
+            frontier = CrawlFrontier(tracking_params=tracking_params, allow=allow)
+            self.canonicalize = frontier.canonicalize
+            self.record_links(frontier.extend([self.start_url]))
+            return frontier
+
+        pending, seen, visited = [], [], 0
+        for url, state, fetch_url in self.conn.execute("SELECT url, state, fetch_url FROM urls ORDER BY rowid"):
+            if state == DONE:
+                seen.append(url)
+                visited += 1
+            else:
+                pending.append(fetch_url or url)
+        print(f"[INFO] Resuming crawl from {self.path}: {visited} pages done, {len(pending)} queued")
+        frontier = CrawlFrontier.restore(pending, seen, visited, tracking_params=tracking_params, allow=allow)
+        self.canonicalize = frontier.canonicalize
+        return frontier
+
+    def _queued_rows(self, urls):
+        return ((self.canonicalize(url), QUEUED, url) for url in urls)
+
+    def record_links(self, urls):
+        """Persist newly queued URLs (as returned by `CrawlFrontier.extend`)."""
+        if urls:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO urls (url, state, fetch_url) VALUES (?, ?, ?)",
+                    self._queued_rows(urls),
+                )
+
+    def record_page(self, url, new_links=()):
+        """Mark a page as visited and store its newly queued links atomically."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO urls (url, state) VALUES (?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET state = excluded.state",
+                (self.canonicalize(url), DONE),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, state, fetch_url) VALUES (?, ?, ?)",
+                self._queued_rows(new_links),
+            )
+
+    def mark_complete(self):
+        with self.conn:
+            self._set_meta("status", "complete")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,293 @@
+# tools/dedup.py
+
+import hashlib
+import math
+import os
+import sqlite3
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from tools.page_store import PageSink, iter_pages
+
+# --- Defaults ---
+SHINGLE_SIZE = 3            # words per shingle
+SIMHASH_BITS = 64
+NEAR_DUP_DISTANCE = 3       # max differing SimHash bits for a near-duplicate
+LSH_BANDS = 4               # > NEAR_DUP_DISTANCE, so near-duplicates always share a band
+BOILERPLATE_RATIO = 0.3     # a line on more than this share of pages is boilerplate...
+BOILERPLATE_MIN_PAGES = 3   # ...as long as it appears on at least this many pages
+CHUNK_SIZE, CHUNK_OVERLAP = 1000, 200  # matches vector_database.create_chunks
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dedup_state (
+    url TEXT PRIMARY KEY,
+    line_hashes BLOB NOT NULL,
+    kept_boilerplate BLOB,
+    digest BLOB,
+    simhash BLOB
+);
+"""
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _normalize_line(line):
+    return " ".join(line.split())
+
+
+def estimate_chunks(num_chars, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Rough number of embedding chunks the splitter makes from `num_chars` characters."""
+    if num_chars <= 0:
+        return 0
+    return max(1, math.ceil((num_chars - overlap) / (chunk_size - overlap)))
+
+
+def simhash(text, shingle_size=SHINGLE_SIZE):
+    """64-bit SimHash of a text over its word shingles."""
+    words = text.lower().split()
+    if len(words) < shingle_size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    hashes = np.fromiter((_hash64(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # One row of 64 bits per shingle; a fingerprint bit is set when most shingles set it.
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(-1, SIMHASH_BITS)
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(majority).tobytes(), "big")
+
+
+class NearDuplicateIndex:
+    """
+    LSH index over SimHash fingerprints.
+
+    Fingerprints are split into `bands` bit bands and bucketed per band. Two
+    fingerprints that differ in fewer than `bands` bits must agree on at least
+    one band, so only pages sharing a bucket are compared.
+    """
+
+    def __init__(self, max_distance=NEAR_DUP_DISTANCE, bands=LSH_BANDS):
+        if bands <= max_distance:
+            raise ValueError("`bands` must be greater than `max_distance`")
+        self.max_distance = max_distance
+        self.band_bits = SIMHASH_BITS // bands
+        self.bands = bands
+        self._buckets = defaultdict(list)
+
+    def _keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(i, (fingerprint >> (i * self.band_bits)) & mask) for i in range(self.bands)]
+
+    def find(self, fingerprint):
+        """Return a stored fingerprint within `max_distance` bits, or None."""
+        for key in self._keys(fingerprint):
+            for other in self._buckets.get(key, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return other
+        return None
+
+    def add(self, fingerprint):
+        for key in self._keys(fingerprint):
+            self._buckets[key].append(fingerprint)
+
+
+@dataclass
+class DedupStats:
+    pages_in: int = 0
+    pages_out: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    boilerplate_lines: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    chunks_in: int = 0
+    chunks_out: int = 0
+    dropped: list = field(default_factory=list)     # URLs of the pages dropped
+
+    def summary(self):
+        saved = self.bytes_in - self.bytes_out
+        return (
+            f"{self.pages_out}/{self.pages_in} pages kept "
+            f"({self.exact_duplicates} exact, {self.near_duplicates} near duplicates dropped), "
+            f"{self.boilerplate_lines} boilerplate lines removed, "
+            f"{saved} bytes ({saved / max(self.bytes_in, 1):.0%}) and "
+            f"~{self.chunks_in - self.chunks_out} chunks saved"
+        )
+
+
+def _line_hashes(text):
+    return {_hash64(_normalize_line(line)) for line in text.splitlines() if line.strip()}
+
+
+def _to_blob(hashes):
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes)).tobytes()
+
+
+def _from_blob(blob):
+    return np.frombuffer(blob, dtype=np.uint64).tolist()
+
+
+class DedupState:
+    """
+    Dedup fingerprints of every page of a site, kept in SQLite next to the crawl state.
+
+    Per page: the hashes of its lines (for boilerplate counts), the boilerplate lines
+    it kept the first occurrence of, and, unless it was dropped as a duplicate, the
+    digest and SimHash of its deduplicated text. An incremental run dedups only the
+    added and changed pages; with the other pages' fingerprints loaded from here,
+    `dedup_pages` still counts boilerplate and finds duplicates across the whole site.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def baseline(self):
+        """Yield `(line_hashes, kept_boilerplate, digest, simhash)` of every stored page."""
+        for lines, kept, digest, fingerprint in self.conn.execute(
+            "SELECT line_hashes, kept_boilerplate, digest, simhash FROM dedup_state"
+        ):
+            yield (
+                _from_blob(lines),
+                _from_blob(kept) if kept is not None else None,
+                digest,
+                int.from_bytes(fingerprint, "big") if fingerprint is not None else None,
+            )
+
+    def put(self, url, line_hashes, kept_boilerplate=None, digest=None, fingerprint=None):
+        """Store a page's fingerprints (only line hashes for a dropped page); see `commit`."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO dedup_state (url, line_hashes, kept_boilerplate, digest, simhash) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                url, _to_blob(line_hashes),
+                _to_blob(kept_boilerplate) if kept_boilerplate is not None else None,
+                digest,
+                fingerprint.to_bytes(SIMHASH_BITS // 8, "big") if fingerprint is not None else None,
+            ),
+        )
+
+    def remove(self, urls):
+        """Forget pages that are removed, or about to be deduplicated again; see `commit`."""
+        self.conn.executemany("DELETE FROM dedup_state WHERE url = ?", ((url,) for url in urls))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def find_boilerplate_lines(pages_path, ratio=BOILERPLATE_RATIO, min_pages=BOILERPLATE_MIN_PAGES,
+                           document_frequency=None, num_pages=0):
+    """
+    Return hashes of normalized lines that appear on many pages.
+
+    `document_frequency` (line hash -> pages) and `num_pages` may carry counts of
+    pages outside `pages_path`, e.g. the unchanged pages of an incremental run.
+    """
+    document_frequency = Counter() if document_frequency is None else document_frequency
+    for page in iter_pages(pages_path):
+        num_pages += 1
+        document_frequency.update(_line_hashes(page["text"]))
+    threshold = max(min_pages, ratio * num_pages)
+    return {h for h, count in document_frequency.items() if count >= threshold}
+
+
+def dedup_pages(pages_path, output_path="txt/webscraper_dedup.txt", output_pages_path=None,
+                max_distance=NEAR_DUP_DISTANCE, boilerplate_ratio=BOILERPLATE_RATIO,
+                boilerplate_min_pages=BOILERPLATE_MIN_PAGES, state=None, removed=()):
+    """
+    Drop duplicate pages and cross-page boilerplate from a JSONL page stream.
+
+    Makes two streaming passes: the first counts on how many pages each line
+    appears, the second removes boilerplate lines (keeping their first occurrence,
+    so e.g. footer contact details stay searchable once), then drops pages whose
+    remaining text is an exact or SimHash near-duplicate of an earlier page.
+    Memory grows with the number of distinct lines and kept pages, not with the
+    size of the text, and each page is compared only against LSH bucket-mates.
+
+    With a `DedupState`, `pages_path` may hold only part of the site (the added and
+    changed pages of an incremental run): the stored fingerprints of the other
+    pages count towards boilerplate, their kept boilerplate lines count as first
+    occurrences, and pages are also checked for duplicates against them. The state
+    is then updated with the pages of `pages_path` and without the `removed` URLs.
+
+    Returns:
+        tuple: (output_pages_path: str, stats: DedupStats)
+    """
+    document_frequency, num_pages = Counter(), 0
+    boilerplate_seen = set()
+    exact_seen = set()
+    near_index = NearDuplicateIndex(max_distance)
+    if state is not None:
+        state.remove(page["url"] for page in iter_pages(pages_path, skip_empty=False))
+        state.remove(removed)
+        for lines, kept, digest, fingerprint in state.baseline():
+            num_pages += 1
+            document_frequency.update(lines)
+            if kept is not None:
+                boilerplate_seen.update(kept)
+                exact_seen.add(digest)
+                near_index.add(fingerprint)
+    boilerplate = find_boilerplate_lines(pages_path, boilerplate_ratio, boilerplate_min_pages,
+                                         document_frequency, num_pages)
+    boilerplate_seen &= boilerplate
+    del document_frequency  # only needed to find the boilerplate
+    stats = DedupStats()
+
+    with PageSink(output_path, output_pages_path) as sink:
+        for page in iter_pages(pages_path):
+            text = page["text"]
+            stats.pages_in += 1
+            stats.bytes_in += len(text.encode("utf-8"))
+            stats.chunks_in += estimate_chunks(len(text))
+
+            kept_lines, kept_boilerplate = [], set()
+            for line in text.splitlines():
+                key = _hash64(_normalize_line(line))
+                if key in boilerplate:
+                    if key in boilerplate_seen:
+                        stats.boilerplate_lines += 1
+                        continue
+                    boilerplate_seen.add(key)
+                    kept_boilerplate.add(key)
+                kept_lines.append(line)
+            if state is not None:
+                state.put(page["url"], _line_hashes(text))  # completed below if the page is kept
+            text = "\n".join(kept_lines).strip()
+            if not text:
+                stats.dropped.append(page["url"])
+                continue
+
+            digest = hashlib.sha1(text.encode("utf-8")).digest()
+            if digest in exact_seen:
+                stats.exact_duplicates += 1
+                stats.dropped.append(page["url"])
+                continue
+            exact_seen.add(digest)
+
+            fingerprint = simhash(text)
+            if near_index.find(fingerprint) is not None:
+                stats.near_duplicates += 1
+                stats.dropped.append(page["url"])
+                continue
+            near_index.add(fingerprint)
+            if state is not None:
+                state.put(page["url"], _line_hashes(page["text"]), kept_boilerplate, digest, fingerprint)
+
+            sink.write({**page, "text": text})
+            stats.pages_out += 1
+            stats.bytes_out += len(text.encode("utf-8"))
+            stats.chunks_out += estimate_chunks(len(text))
+
+        output_pages_path = sink.pages_path
+    if state is not None:
+        state.commit()
+
+    print(f"[INFO] Dedup: {stats.summary()}")
+    return output_pages_path, stats
@@ -0,0 +1,197 @@
+# tools/html_extract.py
+
+import re
+from functools import lru_cache
+from html import escape
+from urllib.parse import urljoin, urlparse, urlsplit
+
+import tldextract
+from bs4 import BeautifulSoup
+from lxml import etree
+import lxml.html
+
+SKIP_TAGS = frozenset({"script", "style", "noscript"})
+# Not rendered, so BeautifulSoup's get_text leaves the text out; links inside still count.
+TEXTLESS_TAGS = frozenset({"template"})
+# Text inside these is navigation (see `tools.local_cleaner`), reported as link texts.
+LINK_TEXT_TAGS = frozenset({"a", "nav"})
+
+# libxml2 reads the content of these elements as raw text and drops CDATA sections,
+# while html.parser (behind `parse_page_soup`) parses markup inside them and keeps
+# CDATA text as a node of its own. `_match_soup` rewrites both before parsing.
+_RAW_TEXT_TAG_RE = re.compile(r"<(/?)(textarea|xmp|plaintext|iframe|noembed|noframes)\b", re.IGNORECASE)
+_CDATA_RE = re.compile(r"<!\[CDATA\[(.*?)\]\]>", re.DOTALL)
+
+
+@lru_cache(maxsize=65536)
+def registered_domain(host):
+    """Registered domain of a host (e.g. "docs.example.co.uk" -> "example.co.uk"), memoized per host."""
+    return tldextract.extract(host).registered_domain
+
+
+def url_domain(url):
+    """Registered domain of a URL, or None for non-HTTP(S) URLs."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        return None
+    return registered_domain(parts.hostname or "")
+
+
+def link_base(url, final_url=None):
+    """
+    URL to resolve a fetched page's links against: `final_url` (where redirects
+    ended) unless the redirect left the site, else the requested `url`.
+    """
+    final_url = str(final_url or url)
+    return final_url if url_domain(final_url) == url_domain(url) else url
+
+
+def decode_html(body, content_type=None):
+    """Decode a response body using the charset from its Content-Type header (UTF-8 otherwise)."""
+    charset = "utf-8"
+    for param in (content_type or "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            charset = value.strip().strip('"\'')
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:  # unknown charset name
+        return body.decode("utf-8", errors="replace")
+
+
+def _match_soup(html):
+    """Rename raw-text elements and turn CDATA sections into elements, as html.parser sees them."""
+    if "<![CDATA[" in html:
+        html = _CDATA_RE.sub(lambda m: f"<x-cdata>{escape(m.group(1), quote=False)}</x-cdata>", html)
+    return _RAW_TEXT_TAG_RE.sub(r"<\1x-\2", html)
+
+
+def _parse_html(html):
+    if isinstance(html, str):
+        html = _match_soup(html)
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration.
+        if isinstance(html, str):
+            return lxml.html.document_fromstring(html.encode("utf-8"))
+        raise
+
+
+def extract_page(url, html):
+    """
+    Extract visible text, internal links and the title from HTML in one lxml pass.
+
+    Produces the same text as BeautifulSoup's `get_text(separator="\\n", strip=True)`
+    after dropping script, style and noscript elements: every non-blank text node
+    outside `<template>`, stripped, one per line; markup inside raw-text elements such
+    as `<textarea>` is parsed and CDATA text is kept. Links are resolved against `url`
+    and kept only when they share its registered domain. The text lines that come from
+    inside `<a>` or `<nav>` elements are also returned, once each, in page order.
+
+    Returns:
+        tuple: (text: str, links: List[str], title: str, link_texts: List[str])
+    """
+    try:
+        root = _parse_html(html)
+    except etree.ParserError:  # empty document
+        return "", [], "", []
+
+    base_domain = url_domain(url)
+    parts, links, title = [], [], None
+    link_texts = {}
+    skip_depth = hidden_depth = link_depth = 0
+
+    for event, el in etree.iterwalk(root, events=("start", "end", "comment", "pi")):
+        if event == "start":
+            tag = el.tag
+            if tag in SKIP_TAGS:
+                skip_depth += 1
+                continue
+            if skip_depth:
+                continue
+            if tag in TEXTLESS_TAGS:
+                hidden_depth += 1
+            if tag in LINK_TEXT_TAGS:
+                link_depth += 1
+            if tag == "a":
+                href = el.get("href")
+                if href is not None:
+                    link = urljoin(url, href)
+                    if base_domain is not None and url_domain(link) == base_domain:
+                        links.append(link)
+            elif tag == "title" and title is None:
+                title = el.text_content().strip()
+            if el.text and not hidden_depth:
+                text = el.text.strip()
+                if text:
+                    parts.append(text)
+                    if link_depth:
+                        link_texts[text] = None
+        else:
+            # "end" of an element, or a comment / processing instruction: their own
+            # text is never visible, but the tail that follows them is.
+            if event == "end" and el.tag in SKIP_TAGS:
+                skip_depth -= 1
+            elif event == "end" and not skip_depth:
+                if el.tag in TEXTLESS_TAGS:
+                    hidden_depth -= 1
+                if el.tag in LINK_TEXT_TAGS:
+                    link_depth -= 1
+            if not skip_depth and not hidden_depth and el.tail:
+                tail = el.tail.strip()
+                if tail:
+                    parts.append(tail)
+                    if link_depth:
+                        link_texts[tail] = None
+
+    return "\n".join(parts), links, title or "", list(link_texts)
+
+
+def is_internal_link(base_url, link):
+    """Check if a link belongs to the same domain as the base URL."""
+    link_domain = url_domain(link)
+    return link_domain is not None and link_domain == registered_domain(urlparse(base_url).hostname or "")
+
+
+def extract_visible_text(soup):
+    """Extract only visible text from a parsed HTML document."""
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+    return soup.get_text(separator="\n", strip=True)
+
+
+def parse_page(url, html):
+    """
+    Extract visible text, internal links, the title and link texts from a downloaded HTML page.
+
+    Uses the single-pass lxml extractor and falls back to BeautifulSoup for
+    documents lxml cannot handle.
+    """
+    try:
+        return extract_page(url, html)
+    except Exception as e:
+        print(f"[WARN] Fast parser failed for {url} ({e}); falling back to BeautifulSoup.")
+        return parse_page_soup(url, html)
+
+
+def parse_page_soup(url, html):
+    """BeautifulSoup version of `parse_page` (slower; kept as the reference path)."""
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    text = extract_visible_text(soup)
+
+    links = []
+    for a in soup.find_all("a", href=True):
+        href = urljoin(url, a["href"])
+        if is_internal_link(url, href):
+            links.append(href)
+    link_texts = {}
+    for el in soup.find_all(LINK_TEXT_TAGS):
+        link_texts.update(dict.fromkeys(el.stripped_strings))
+    return text, links, title, list(link_texts)
+
+
+def parse_page_bytes(url, body, content_type=None):
+    """`parse_page` on a raw response body; the entry point for parse worker processes."""
+    return parse_page(url, decode_html(body, content_type))
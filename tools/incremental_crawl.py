@@ -0,0 +1,301 @@
+# tools/incremental_crawl.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+
+import requests
+
+from tools.html_extract import decode_html, link_base, parse_page
+from tools.crawl_frontier import DEFAULT_TRACKING_PARAMS
+from tools.crawl_journal import CrawlJournal, default_journal_path
+from tools.page_store import PageSink, page_record
+from tools.sitemap_discovery import discover_site
+
+DEFAULT_STATE_PATH = "txt/crawl_state.db"
+GONE_STATUSES = (404, 410)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_state (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    text_hash TEXT,
+    links TEXT NOT NULL DEFAULT '[]',
+    last_seen INTEGER NOT NULL,
+    checked INTEGER
+);
+CREATE TABLE IF NOT EXISTS staged_state (
+    url TEXT PRIMARY KEY,
+    change TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    text_hash TEXT,
+    links TEXT NOT NULL DEFAULT '[]',
+    run_id INTEGER NOT NULL
+);
+"""
+
+
+def text_hash(text):
+    """Stable hash of a page's extracted text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CrawlChanges:
+    """URLs grouped by what happened to them since the previous crawl."""
+    added: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    run_id: int = 0     # crawl run whose staged page states `apply_staged_state` makes current
+
+    def summary(self):
+        return (
+            f"{len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.removed)} removed, {len(self.unchanged)} unchanged"
+        )
+
+
+class PageStateStore:
+    """
+    Per-URL validators (ETag, Last-Modified), text hash and outgoing links from
+    previous crawls, kept in SQLite so a nightly re-crawl can send conditional
+    requests and tell which pages actually changed.
+
+    The state of an added, changed or removed page is only staged during a crawl;
+    `apply` makes it current once the change has reached the vector DB. Until then
+    `get` keeps returning the previous state, so a page whose update failed is
+    reported as changed again by the next crawl.
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(page_state)")}
+        if "checked" not in columns:  # state files from before sitemap discovery
+            with self.conn:
+                self.conn.execute("ALTER TABLE page_state ADD COLUMN checked INTEGER")
+
+    def get(self, url):
+        row = self.conn.execute(
+            "SELECT etag, last_modified, text_hash, links, checked FROM page_state WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, digest, links, checked = row
+        return {
+            "etag": etag, "last_modified": last_modified, "text_hash": digest,
+            "links": json.loads(links), "checked": checked,
+        }
+
+    def put(self, url, run_id, etag=None, last_modified=None, digest=None, links=()):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO page_state (url, etag, last_modified, text_hash, links, last_seen, checked) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, digest, json.dumps(list(links)), run_id, run_id),
+            )
+
+    def touch(self, url, run_id, checked=False):
+        """Mark a URL as still present; `checked` when its content was confirmed unchanged."""
+        with self.conn:
+            if checked:
+                self.conn.execute(
+                    "UPDATE page_state SET last_seen = ?, checked = ? WHERE url = ?", (run_id, run_id, url)
+                )
+            else:
+                self.conn.execute("UPDATE page_state SET last_seen = ? WHERE url = ?", (run_id, url))
+
+    def stage(self, url, run_id, change, etag=None, last_modified=None, digest=None, links=()):
+        """Record the new state of an "added", "changed" or "removed" page, applied by `apply`."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO staged_state (url, change, etag, last_modified, text_hash, links, run_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, change, etag, last_modified, digest, json.dumps(list(links)), run_id),
+            )
+            self.conn.execute("UPDATE page_state SET last_seen = ? WHERE url = ?", (run_id, url))
+
+    def staged(self, run_id):
+        """`(url, change)` of every page staged during `run_id`, in crawl order."""
+        return self.conn.execute(
+            "SELECT url, change FROM staged_state WHERE run_id = ? ORDER BY rowid", (run_id,)
+        ).fetchall()
+
+    def discard_staged(self, run_id):
+        """Drop what earlier, unfinished runs staged; their pages are compared afresh."""
+        with self.conn:
+            self.conn.execute("DELETE FROM staged_state WHERE run_id != ?", (run_id,))
+
+    def stage_removals(self, run_id):
+        """Stage the removal of every URL not seen during `run_id` and return them."""
+        removed = [row[0] for row in self.conn.execute(
+            "SELECT url FROM page_state WHERE last_seen != ? ORDER BY url", (run_id,)
+        )]
+        for url in removed:
+            self.stage(url, run_id, "removed")
+        return removed
+
+    def apply(self, run_id):
+        """Make the page states staged during `run_id` current, in one transaction."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO page_state (url, etag, last_modified, text_hash, links, last_seen, checked) "
+                "SELECT url, etag, last_modified, text_hash, links, run_id, run_id FROM staged_state "
+                "WHERE run_id = ? AND change != 'removed'", (run_id,)
+            )
+            self.conn.execute(
+                "DELETE FROM page_state WHERE url IN "
+                "(SELECT url FROM staged_state WHERE run_id = ? AND change = 'removed')", (run_id,)
+            )
+            self.conn.execute("DELETE FROM staged_state WHERE run_id = ?", (run_id,))
+
+    def close(self):
+        self.conn.close()
+
+
+def conditional_headers(previous):
+    """Build If-None-Match / If-Modified-Since headers from a stored page state."""
+    headers = {}
+    if previous:
+        if previous["etag"]:
+            headers["If-None-Match"] = previous["etag"]
+        if previous["last_modified"]:
+            headers["If-Modified-Since"] = previous["last_modified"]
+    return headers
+
+
+def apply_staged_state(run_id, state_path=DEFAULT_STATE_PATH):
+    """Make a re-crawl's page states current; call once its changes are in the vector DB."""
+    state = PageStateStore(state_path)
+    try:
+        state.apply(run_id)
+    finally:
+        state.close()
+
+
+def recrawl_website(start_url, max_pages=None, output_path="txt/webscraper_changes.txt",
+                    state_path=DEFAULT_STATE_PATH, tracking_params=DEFAULT_TRACKING_PARAMS,
+                    journal_path=None, resume=True, pages_path=None, discover=False):
+    """
+    Re-crawl a site incrementally, saving only added and changed pages.
+
+    Pages answered with `304 Not Modified`, or whose extracted text hashes the same as
+    last time, are reported as unchanged and are not written to `output_path` or to
+    the `pages_path` JSONL stream, so cleaning and embedding only see the delta. A 304
+    skips parsing entirely; the links stored from the previous crawl keep the frontier
+    going. Pages that are no longer reachable (or now return 404/410) are reported as
+    removed, unless the crawl was cut short by `max_pages`.
+
+    The new state of added, changed and removed pages is only staged: once they are
+    indexed, pass `changes.run_id` to `apply_staged_state`. A resumed crawl reports
+    the pages staged before the interruption too, since they are already in the
+    output.
+
+    With `discover=True` the frontier is seeded from robots.txt and the sitemaps (see
+    `tools.sitemap_discovery.discover_site`), disallowed URLs are skipped and the
+    `Crawl-delay` is honoured. A known page whose sitemap `lastmod` is older than the
+    run in which it was last checked is reported as unchanged without being fetched.
+
+    Returns:
+        tuple: (output_path: str, changes: CrawlChanges)
+    """
+    if not start_url.startswith(("http://", "https://")):
+        start_url = "https://" + start_url
+
+    changes = CrawlChanges()
+    state = PageStateStore(state_path)
+    session = requests.Session()
+    discovery = discover_site(start_url, session=session) if discover else None
+    lastmods = discovery.lastmod() if discovery else {}
+    delay = discovery.crawl_delay if discovery else None
+    journal = CrawlJournal(journal_path or default_journal_path(output_path), start_url, resume)
+    sink = PageSink(output_path, pages_path, append=journal.resumed)
+    try:
+        run_id = changes.run_id = journal.run_id
+        state.discard_staged(run_id)
+        frontier = journal.frontier(tracking_params, allow=discovery.allow if discovery else None)
+        if discovery:
+            journal.record_links(discovery.seed(frontier))
+            lastmods = {frontier.canonicalize(url): lastmod for url, lastmod in lastmods.items()}
+
+        while frontier and (max_pages is None or frontier.visited < max_pages):
+            url = frontier.pop()
+            key = frontier.canonicalize(url)
+            previous = state.get(key)
+
+            lastmod = lastmods.get(key)
+            if previous and previous["checked"] and lastmod and lastmod.timestamp() * 1000 < previous["checked"]:
+                # The sitemap says the page has not changed since we last checked it.
+                state.touch(key, run_id)
+                changes.unchanged.append(key)
+                journal.record_page(url, frontier.extend(previous["links"]))
+                continue
+            if delay and frontier.visited > 1:
+                time.sleep(delay)
+
+            print(f"[INFO] Re-crawling: {url}")
+            try:
+                resp = session.get(url, headers=conditional_headers(previous), timeout=10)
+            except Exception as e:
+                print(f"[ERROR] Failed to scrape {url}: {e}")
+                resp = None
+
+            if resp is not None and resp.status_code == 304 and previous:
+                state.touch(key, run_id, checked=True)
+                changes.unchanged.append(key)
+                journal.record_page(url, frontier.extend(previous["links"]))
+                continue
+
+            if resp is None or not resp.ok:
+                if resp is not None:
+                    print(f"[ERROR] Failed to scrape {url}: HTTP {resp.status_code}")
+                if previous and (resp is None or resp.status_code not in GONE_STATUSES):
+                    # Transient failure: keep the old state rather than reporting a removal.
+                    state.touch(key, run_id)
+                    journal.record_page(url, frontier.extend(previous["links"]))
+                else:
+                    journal.record_page(url)
+                continue
+
+            html = decode_html(resp.content, resp.headers.get("Content-Type"))
+            text, links, title, link_texts = parse_page(link_base(url, resp.url), html)
+            digest = text_hash(text)
+            validators = dict(
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+                digest=digest,
+                links=links,
+            )
+            if previous is not None and previous["text_hash"] == digest:
+                state.put(key, run_id, **validators)
+                changes.unchanged.append(key)
+            else:
+                sink.write(page_record(key, text, title=title, status=resp.status_code, link_texts=link_texts))
+                state.stage(key, run_id, "added" if previous is None else "changed", **validators)
+            journal.record_page(url, frontier.extend(links))
+
+        if frontier:
+            print("[INFO] Crawl stopped at max_pages; skipping removal detection.")
+        else:
+            state.stage_removals(run_id)
+        # Staged rows also cover pages written before a resume, not just this process's.
+        for url, change in state.staged(run_id):
+            getattr(changes, change).append(url)
+
+        journal.mark_complete()
+    finally:
+        sink.close()
+        journal.close()
+        state.close()
+        session.close()
+
+    print(f"[INFO] Re-crawl finished: {changes.summary()}")
+    print(f"[INFO] Changed content saved to {output_path}")
+    return output_path, changes
@@ -0,0 +1,126 @@
+# tools/local_cleaner.py
+
+import re
+import unicodedata
+
+# --- Rules ---
+MENU_MAX_WORDS = 3      # link texts this short with no sentence punctuation look like menu items...
+MENU_MAX_CHARS = 30
+MENU_MIN_RUN = 4        # ...and this many of them in a row are treated as a link list
+DEDUP_MIN_CHARS = 50    # shorter repeated lines (table cells, headings) are kept
+
+_INVISIBLE = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u2060\ufeff\u00ad"))
+_WHITESPACE = re.compile(r"\s+")
+_HYPHENATED = re.compile(r"[^\W\d_]-$")
+_SENTENCE_END = (".", "!", "?", ":", ";", ",")
+
+
+def normalize_line(line):
+    """NFKC-normalize a line, drop invisible characters and collapse whitespace."""
+    if not line.isascii():
+        line = unicodedata.normalize("NFKC", line).translate(_INVISIBLE)
+    return _WHITESPACE.sub(" ", line).strip()
+
+
+def _is_menu_item(line):
+    return (
+        len(line) <= MENU_MAX_CHARS
+        and line.count(" ") < MENU_MAX_WORDS
+        and not line.endswith(_SENTENCE_END)
+    )
+
+
+def _rejoin_hyphenation(lines):
+    """Join words split across lines, e.g. "infor-" + "mation" -> "information"."""
+    pending = None
+    for line in lines:
+        if pending is not None:
+            if line and line[0].islower():
+                head, sep, rest = line.partition(" ")
+                line = pending[:-1] + head + sep + rest
+            else:
+                yield pending
+            pending = None
+        if _HYPHENATED.search(line):
+            pending = line
+        else:
+            yield line
+    if pending is not None:
+        yield pending
+
+
+def _drop_menus(lines, link_texts, min_run=MENU_MIN_RUN):
+    """Drop runs of `min_run` or more consecutive menu-like lines that are all link texts."""
+    run = []
+    for line in lines:
+        if line in link_texts and _is_menu_item(line):
+            run.append(line)
+            continue
+        if len(run) < min_run:
+            yield from run
+        run = []
+        yield line
+    if len(run) < min_run:
+        yield from run
+
+
+def clean_lines(lines, link_texts=None):
+    """
+    Clean an iterable of text lines, yielding cleaned lines lazily.
+
+    Normalizes Unicode, collapses whitespace, rejoins hyphenated words, drops
+    duplicate lines of at least DEDUP_MIN_CHARS characters (keeping the first), and
+    squeezes runs of blank lines into one. Short repeats such as table cells are
+    kept; boilerplate repeated across pages is `tools.dedup`'s job.
+
+    Menu-like link lists are dropped only when `link_texts` (the page's link and
+    navigation texts, see `tools.html_extract.extract_page`) are given and every
+    line of the run is one of them, so tables, addresses and sentences split
+    around inline links are kept. Only one line of lookahead and a short run of
+    candidate menu lines are buffered, so input of any size streams through.
+    """
+    seen = set()
+    blank = True  # suppress leading blank lines
+    cleaned = (normalize_line(line) for line in lines)
+    cleaned = _rejoin_hyphenation(cleaned)
+    if link_texts:
+        cleaned = _drop_menus(cleaned, {normalize_line(text) for text in link_texts})
+    for line in cleaned:
+        if not line:
+            if not blank:
+                blank = True
+                yield ""
+            continue
+        if len(line) >= DEDUP_MIN_CHARS:
+            key = hash(line)
+            if key in seen:
+                continue
+            seen.add(key)
+        blank = False
+        yield line
+
+
+def clean_text_locally(text, link_texts=None):
+    """Clean a text string without any API calls."""
+    return "\n".join(clean_lines(text.splitlines(), link_texts)).strip()
+
+
+def clean_file_locally(input_path, output_path, link_texts=None):
+    """
+    Stream-clean a text file line by line and return `(chars_in, chars_out)`.
+
+    A plain text file carries no markup, so menus are only dropped when their
+    `link_texts` are given.
+    """
+    chars_in = chars_out = 0
+    with open(input_path, "r", encoding="utf-8", errors="ignore") as src, \
+            open(output_path, "w", encoding="utf-8") as dst:
+        def read():
+            nonlocal chars_in
+            for line in src:
+                chars_in += len(line)
+                yield line
+        for line in clean_lines(read(), link_texts):
+            dst.write(line + "\n")
+            chars_out += len(line) + 1
+    return chars_in, chars_out
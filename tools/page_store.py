@@ -0,0 +1,96 @@
+# tools/page_store.py
+
+import json
+import os
+from datetime import datetime, timezone
+
+
+def default_pages_path(output_path):
+    """JSONL page stream kept next to the text output, e.g. `txt/webscraper.jsonl`."""
+    return os.path.splitext(output_path)[0] + ".jsonl"
+
+
+def page_record(url, text, title="", status=None, link_texts=()):
+    """
+    Build the JSONL record for one crawled page.
+
+    `link_texts` are the lines of `text` that came from links or navigation (see
+    `tools.html_extract.extract_page`); the local cleaner only drops menus made of them.
+    """
+    return {
+        "url": url,
+        "title": title,
+        "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "status": status,
+        "text": text,
+        "link_texts": list(link_texts),
+    }
+
+
+class PageSink:
+    """
+    Write each crawled page as soon as it finishes.
+
+    Every record is appended to a JSONL file (one page per line) and, when it has
+    text, to the `--- Page: <url> ---` text file that the rest of the pipeline reads.
+    Both files are flushed per page, so memory stays flat and an interrupted crawl
+    keeps everything written so far. Pass `append=True` to continue a resumed crawl.
+    """
+
+    def __init__(self, txt_path, pages_path=None, append=False):
+        self.txt_path = txt_path
+        self.pages_path = pages_path or default_pages_path(txt_path)
+        mode = "a" if append else "w"
+        os.makedirs(os.path.dirname(txt_path) or ".", exist_ok=True)
+        os.makedirs(os.path.dirname(self.pages_path) or ".", exist_ok=True)
+        self._txt = open(txt_path, mode, encoding="utf-8")
+        self._pages = open(self.pages_path, mode, encoding="utf-8")
+        self.count = 0
+
+    def write(self, record):
+        self._pages.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._pages.flush()
+        if record["text"]:
+            self._txt.write(f"\n--- Page: {record['url']} ---\n{record['text']}\n")
+            self._txt.flush()
+        self.count += 1
+
+    def close(self):
+        self._txt.close()
+        self._pages.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_pages(path, skip_empty=True, unique=True):
+    """
+    Lazily yield page records from a JSONL page stream.
+
+    Args:
+        path (str): JSONL file written by `PageSink`
+        skip_empty (bool): Skip pages without text (failed or empty fetches)
+        unique (bool): Yield each URL once (a resumed crawl may repeat the page
+            that was being written when it was interrupted)
+
+    Yields:
+        dict: {"url", "title", "fetched_at", "status", "text", "link_texts"}
+        ("link_texts" is missing from records of older crawls)
+    """
+    seen = set()
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # partially written line from an interrupted crawl
+            if skip_empty and not record.get("text"):
+                continue
+            if unique:
+                if record["url"] in seen:
+                    continue
+                seen.add(record["url"])
+            yield record
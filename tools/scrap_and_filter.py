@@ -1,81 +1,130 @@
 # tools/scrap_and_filter.py
 
 import os
+import time
+import asyncio
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-import tldextract
 import textwrap
+from collections import deque
 from cohere import Client
 from vector_database import build_or_update_vector_db
-#from utils.file_merge_utils import merge_txt_files
+from tools.async_crawler import DEFAULT_CONCURRENCY
+from tools.crawl_frontier import DEFAULT_TRACKING_PARAMS
+from tools.html_extract import decode_html, link_base, parse_page
+from tools.crawl_journal import CrawlJournal, default_journal_path
+from tools.page_store import PageSink, page_record, iter_pages, default_pages_path
+from tools.dedup import DedupState, dedup_pages
+from tools.ai_cleaner import CleaningExecutor
+from tools.local_cleaner import clean_text_locally
+from tools.sitemap_discovery import discover_site
+from utils.document_sources import iter_documents
 
 # --- Load Cohere API key securely ---
 COHERE_API_KEY = os.getenv("COHERE_API_KEY", "your-default-api-key")  # Replace fallback with dummy if desired
 cohere_client = Client(COHERE_API_KEY)
 
-visited_links = set()
-
-def is_internal_link(base_url, link):
-    """Check if a link belongs to the same domain as the base URL."""
-    parsed = urlparse(link)
-    if parsed.scheme not in ("http", "https"):
-        return False
-    base_domain = tldextract.extract(base_url).registered_domain
-    link_domain = tldextract.extract(link).registered_domain
-    return base_domain == link_domain
-
-def extract_visible_text(soup):
-    """Extract only visible text from a parsed HTML document."""
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
-    return soup.get_text(separator="\n", strip=True)
-
-def scrape_page(url):
-    """Download and extract text and internal links from a single web page."""
+UPLOADED_PAGES_PATH = default_pages_path("txt/filedata.txt")  # written by utils.doc_extract.extract_uploads
+
+# --- Crawl settings (0 concurrency uses the serial `requests` loop) ---
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", str(DEFAULT_CONCURRENCY)))
+CRAWL_DISCOVER = os.getenv("CRAWL_DISCOVER", "0") == "1"  # seed crawls from robots.txt and sitemaps
+
+def scrape_page(url, fetch_url=None):
+    """
+    Download a single web page and extract its text and internal links.
+
+    Args:
+        url (str): Canonical URL the page is recorded under
+        fetch_url (str): URL to download, as it was linked (default: `url`); relative
+            links are resolved against it, or against where its redirects ended
+
+    Returns:
+        tuple: (record: dict, links: List[str]) where `record` is the page's
+        `tools.page_store.page_record` (empty text if the download failed)
+    """
+    status = None
     try:
-        resp = requests.get(url, timeout=10)
+        resp = requests.get(fetch_url or url, timeout=10)
+        status = resp.status_code
         resp.raise_for_status()
     except Exception as e:
         print(f"[ERROR] Failed to scrape {url}: {e}")
-        return "", []
+        return page_record(url, "", status=status), []
+
+    html = decode_html(resp.content, resp.headers.get("Content-Type"))
+    text, links, title, link_texts = parse_page(link_base(fetch_url or url, resp.url), html)
+    return page_record(url, text, title=title, status=status, link_texts=link_texts), links
 
-    soup = BeautifulSoup(resp.text, "html.parser")
-    text = extract_visible_text(soup)
+def crawl_website(start_url, max_pages=None, output_path="txt/webscraper.txt",
+                  concurrency=None, per_host_limit=4, requests_per_second=None,
+                  tracking_params=DEFAULT_TRACKING_PARAMS, journal_path=None, resume=True,
+                  pages_path=None, parse_workers=None, discover=False, since=None):
+    """
+    Recursively crawl internal pages starting from a URL and save text.
 
-    links = []
-    for a in soup.find_all("a", href=True):
-        href = urljoin(url, a["href"])
-        if is_internal_link(url, href):
-            links.append(href)
-    return text, links
+    Pages are fetched one at a time unless `concurrency` is set, in which case
+    the asyncio engine in `tools/async_crawler.py` keeps up to `concurrency`
+    requests in flight, at most `per_host_limit` connections per host and at
+    most `requests_per_second` requests per host. Both modes stream each page,
+    as soon as it is scraped, to `output_path` as a `--- Page: <url> ---` block
+    and to `pages_path` (default: `output_path` with a `.jsonl` suffix) as one
+    JSON record with url, title, fetch time, status and text. With `concurrency`
+    set, `parse_workers` moves HTML parsing into a process pool.
 
-def crawl_website(start_url, max_pages=None, output_path="txt/webscraper.txt"):
-    """Recursively crawl internal pages starting from a URL and save text."""
+    Each call keeps its own `CrawlFrontier`, so URLs are canonicalized (dropping
+    `tracking_params`) and fetched once per crawl, independently of other crawls.
+
+    Progress is checkpointed to a `CrawlJournal` (by default next to `output_path`)
+    after every page. If a previous crawl of the same `start_url` was interrupted,
+    it is resumed from the journal unless `resume=False`.
+
+    With `discover=True` the site's robots.txt and sitemaps are read first (see
+    `tools/sitemap_discovery.py`): sitemap URLs seed the frontier, highest priority
+    first, so pages nothing links to are found too; URLs disallowed by robots.txt are
+    never fetched; the robots.txt `Crawl-delay` is honoured; and with `since`, URLs
+    whose sitemap `lastmod` is older are skipped.
+    """
     if not start_url.startswith(("http://", "https://")):
         start_url = "https://" + start_url
 
-    to_visit = [start_url]
-    content_dump = []
+    if concurrency:
+        from tools.async_crawler import crawl_website_async  # delayed import
+        return asyncio.run(crawl_website_async(
+            start_url,
+            max_pages=max_pages,
+            output_path=output_path,
+            concurrency=concurrency,
+            per_host_limit=per_host_limit,
+            requests_per_second=requests_per_second,
+            tracking_params=tracking_params,
+            journal_path=journal_path,
+            resume=resume,
+            pages_path=pages_path,
+            parse_workers=parse_workers,
+            discover=discover,
+            since=since,
+        ))
+
+    discovery = discover_site(start_url, since=since) if discover else None
+    delay = discovery.crawl_delay if discovery else None
 
-    while to_visit and (max_pages is None or len(visited_links) < max_pages):
-        url = to_visit.pop(0)
-        if url in visited_links:
-            continue
+    with CrawlJournal(journal_path or default_journal_path(output_path), start_url, resume) as journal, \
+            PageSink(output_path, pages_path, append=journal.resumed) as sink:
+        frontier = journal.frontier(tracking_params, allow=discovery.allow if discovery else None)
+        if discovery:
+            journal.record_links(discovery.seed(frontier))
 
-        print(f"[INFO] Scraping: {url}")
-        text, links = scrape_page(url)
-        if text:
-            content_dump.append(f"\n--- Page: {url} ---\n{text}\n")
-        visited_links.add(url)
+        while frontier and (max_pages is None or frontier.visited < max_pages):
+            url = frontier.pop()
+            if delay and frontier.visited > 1:
+                time.sleep(delay)
 
-        for link in links:
-            if link not in visited_links and link not in to_visit:
-                to_visit.append(link)
+            print(f"[INFO] Scraping: {url}")
+            record, links = scrape_page(frontier.canonicalize(url), url)
+            sink.write(record)
+            journal.record_page(url, frontier.extend(links))
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("".join(content_dump))
+        journal.mark_complete()
 
     print(f"[INFO] Raw scraped content saved to {output_path}")
     return output_path
@@ -84,53 +133,141 @@ def chunk_text(text, max_chunk_size=2000):
     """Split long text into manageable chunks for AI processing."""
     return textwrap.wrap(text, max_chunk_size, break_long_words=False, break_on_hyphens=False)
 
-def clean_text_with_ai(input_text):
-    """Use Cohere to clean and reformat large text input chunk-by-chunk."""
-    chunks = chunk_text(input_text)
-    cleaned_chunks = []
-
-    for i, chunk in enumerate(chunks):
-        try:
-            response = cohere_client.chat(
-                model='command-r',
-                message=(
-                    "Please clean and reformat the following text without summarizing or removing important information. "
-                    "Remove exact duplicate lines, extra spaces, or broken formatting, but preserve the full content:\n\n" + chunk
-                )
-            )
-            cleaned_chunks.append(response.text.strip())
-            print(f"[INFO] Chunk {i + 1}/{len(chunks)} cleaned.")
-        except Exception as e:
-            print(f"[ERROR] Failed to clean chunk {i + 1}: {e}")
+def cohere_chat(model, message):
+    """Send one chat message to Cohere and return the reply text."""
+    return cohere_client.chat(model=model, message=message).text
 
+def clean_text_with_ai(input_text, executor=None):
+    """Use Cohere to clean and reformat large text input chunk-by-chunk."""
+    executor = executor or CleaningExecutor(cohere_chat)
+    cleaned_chunks = executor.clean(chunk_text(input_text))
+    print(f"[INFO] Cleaning: {executor.stats.summary()}")
     return "\n\n".join(cleaned_chunks)
 
-def scrape_and_clean_and_vectorize(start_url):
-    """Main pipeline: scrape > clean with AI > merge > vectorize."""
-    raw_file = crawl_website(start_url)
+def clean_pages_with_ai(pages, executor):
+    """
+    Clean page records chunk by chunk with `executor`, yielding cleaned pages in order.
+
+    Chunks of all pages share one stream, so the executor stays busy across page
+    boundaries; each page's cleaned chunks are joined back together afterwards.
+    """
+    in_flight = deque()  # (page, number of chunks) in the order their chunks were handed out
+
+    def chunks():
+        for page in pages:
+            page_chunks = chunk_text(page["text"])
+            if page_chunks:
+                in_flight.append((page, len(page_chunks)))
+                yield from page_chunks
+
+    parts = []
+    for cleaned in executor.imap(chunks()):
+        parts.append(cleaned)
+        page, count = in_flight[0]
+        if len(parts) == count:
+            in_flight.popleft()
+            yield dict(page, text="\n\n".join(parts))
+            parts = []
+
+def scrape_and_clean_and_vectorize(start_url, incremental=False, cleaning="ai", discover=CRAWL_DISCOVER):
+    """
+    Main pipeline: scrape > dedup > clean > vectorize.
+
+    With `incremental=True` the site is re-crawled against the state of the previous
+    crawl and only added or changed pages go through cleaning and vectorizing;
+    chunks of removed pages are deleted from the vector DB, and so are those of
+    changed pages that dedup or cleaning now drop. Dedup still covers the whole
+    site: the fingerprints of the unchanged pages are kept with the crawl state
+    (see `tools.dedup.DedupState`). The crawl state is only updated once the vector
+    DB update succeeded, so failed pages are retried by the next run.
+
+    Raises:
+        RuntimeError: If the vector DB could not be built or updated
+
+    `cleaning` picks the cleaner: "ai" (Cohere), "local" (rule-based, no API calls)
+    or "local+ai" (rule-based pre-pass, then Cohere on the smaller text).
+
+    `discover=True` seeds the crawl from robots.txt and the site's sitemaps. Full
+    crawls keep CRAWL_CONCURRENCY requests in flight (see `tools/async_crawler.py`).
+    """
+    if cleaning not in ("ai", "local", "local+ai"):
+        raise ValueError(f"Unknown cleaning mode: {cleaning}")
+
+    removed_pages = ()
+    dedup_state = None
+    if incremental:
+        from tools.incremental_crawl import DEFAULT_STATE_PATH, apply_staged_state, recrawl_website  # delayed import
+        raw_file, changes = recrawl_website(start_url, discover=discover)
+        removed_pages = changes.removed
+        dedup_state = DedupState(DEFAULT_STATE_PATH)
+        if removed_pages:
+            print(f"[INFO] {len(removed_pages)} pages no longer exist on the site.")
+        if not (changes.added or changes.changed):
+            print("[INFO] No new or changed pages; skipping cleaning.")
+            dedup_state.remove(removed_pages)
+            dedup_state.commit()
+            dedup_state.close()
+            if removed_pages and not build_or_update_vector_db(
+                    documents=[], remove_missing_sources=False, removed_sources=removed_pages):
+                raise RuntimeError("Vector database update failed; the next re-crawl retries these pages.")
+            apply_staged_state(changes.run_id)
+            return
+    else:
+        raw_file = crawl_website(start_url, concurrency=CRAWL_CONCURRENCY, discover=discover)
+
+    print("[INFO] Removing duplicate pages and boilerplate...")
+    pages_path, dedup_stats = dedup_pages(default_pages_path(raw_file), state=dedup_state, removed=removed_pages)
+    if dedup_state is not None:
+        dedup_state.close()
 
-    with open(raw_file, 'r', encoding='utf-8', errors='ignore') as f:
-        raw_text = f.read()
+    # Clean page by page straight from the JSONL stream so the whole crawl never
+    # has to sit in memory at once, and every page keeps its URL for the vector DB.
+    pages = iter_pages(pages_path)
+    if cleaning.startswith("local"):
+        print("[INFO] Cleaning text locally...")
+        pages = (dict(page, text=clean_text_locally(page["text"], page.get("link_texts")))
+                 for page in pages)
 
-    print("[INFO] Cleaning text using Cohere...")
-    cleaned_text = clean_text_with_ai(raw_text)
+    executor = None
+    if cleaning.endswith("ai"):
+        print("[INFO] Cleaning text using Cohere...")
+        executor = CleaningExecutor(cohere_chat)
+        pages = clean_pages_with_ai(pages, executor)
 
     cleaned_path = "txt/cleaned_text.txt"
-    with open(cleaned_path, 'w', encoding='utf-8') as f:
-        f.write(cleaned_text)
+    dropped, kept = list(dedup_stats.dropped), set()
+    with PageSink(cleaned_path) as sink:
+        for page in pages:
+            if page["text"]:
+                sink.write(page)
+                kept.add(page["url"])
+            else:
+                dropped.append(page["url"])
+    if executor:
+        executor.close()
+        print(f"[INFO] Cleaning: {executor.stats.summary()}")
 
     print(f"[✅] Cleaned content saved to {cleaned_path}")
 
-    merged_path = merge_txt_files(
-        folder_path = "txt",
-        output_filename="datafile.txt",
-        exclude_filenames=["webscraper.txt", "cleaned_text.txt", "merged.txt"]
-        )
-    
-    print(f"[INFO] Merged txt files saved to {merged_path}")
+    if incremental:
+        # A changed page that is now dropped must not keep its chunks from before.
+        dropped = [url for url in dict.fromkeys(dropped) if url not in kept]
+        if dropped:
+            print(f"[INFO] {len(dropped)} changed pages were dropped as duplicates or empty; removing their chunks.")
+            removed_pages = list(removed_pages) + dropped
 
-    print("[INFO] Building vector database with merged content...")
-    build_or_update_vector_db(txt_path=merged_path)
+    # Cleaned pages and any uploaded-file pages go straight into chunking, each
+    # keeping its source; there is no intermediate merged file.
+    print("[INFO] Building vector database from cleaned pages...")
+    if not build_or_update_vector_db(
+        documents=iter_documents(sink.pages_path, UPLOADED_PAGES_PATH),
+        remove_missing_sources=not incremental,
+        removed_sources=removed_pages,
+    ):
+        raise RuntimeError("Vector database build failed; the next re-crawl retries these pages."
+                           if incremental else "Vector database build failed.")
+    if incremental:
+        apply_staged_state(changes.run_id)
 
 if __name__ == "__main__":
     website = input("Enter website URL: ")
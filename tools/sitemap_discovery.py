@@ -0,0 +1,241 @@
+# tools/sitemap_discovery.py
+
+import gzip
+import io
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+from xml.etree.ElementTree import ParseError, iterparse
+
+import requests
+
+from tools.html_extract import url_domain
+
+ROBOTS_USER_AGENT = "*"
+MAX_SITEMAPS = 100          # sitemap files fetched per discovery, indexes included
+REQUEST_TIMEOUT = 10
+DEFAULT_PRIORITY = 0.5      # sitemap protocol default for <priority>
+
+
+@dataclass
+class SitemapEntry:
+    """One `<url>` of a sitemap."""
+    url: str
+    lastmod: datetime = None
+    priority: float = DEFAULT_PRIORITY
+
+
+@dataclass
+class SiteDiscovery:
+    """
+    What robots.txt and the sitemaps say about a site.
+
+    `entries` are the sitemap URLs worth fetching, highest priority and most recently
+    modified first; `stale` are the URLs skipped because their `lastmod` is older than
+    the `since` cutoff.
+    """
+    robots: RobotFileParser = None
+    entries: list = field(default_factory=list)
+    stale: list = field(default_factory=list)
+    crawl_delay: float = None
+    sitemaps: int = 0
+
+    @property
+    def urls(self):
+        return [entry.url for entry in self.entries]
+
+    def lastmod(self):
+        """Map of sitemap URL to its `lastmod` (only URLs that have one)."""
+        return {entry.url: entry.lastmod for entry in self.entries if entry.lastmod is not None}
+
+    def allow(self, url):
+        """Whether robots.txt lets the crawler fetch `url` (hosts without rules are allowed)."""
+        if self.robots is None or urlsplit(url).netloc != self.robots.host:
+            return True
+        return self.robots.can_fetch(ROBOTS_USER_AGENT, url)
+
+    def requests_per_second(self, requested=None):
+        """Per-host request rate honouring the robots.txt `Crawl-delay`, if any."""
+        if not self.crawl_delay:
+            return requested
+        limit = 1.0 / self.crawl_delay
+        return min(requested, limit) if requested else limit
+
+    def seed(self, frontier):
+        """Skip stale URLs and queue the sitemap URLs; returns the newly queued ones."""
+        frontier.skip(self.stale)
+        return frontier.extend(self.urls)
+
+    def summary(self):
+        delay = f", crawl-delay {self.crawl_delay}s" if self.crawl_delay else ""
+        return (
+            f"{len(self.entries)} URLs from {self.sitemaps} sitemaps, "
+            f"{len(self.stale)} stale skipped{delay}"
+        )
+
+
+def parse_lastmod(value):
+    """
+    Parse a W3C datetime from a sitemap `<lastmod>` into an aware UTC datetime.
+
+    Values without a time (e.g. "2024-05-01" or "2024-05") count as the end of that
+    period, so a page is never judged older than it might be. Returns None when the
+    value cannot be parsed.
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        if len(value) == 4:
+            return datetime(int(value) + 1, 1, 1, tzinfo=timezone.utc)
+        if len(value) == 7:
+            year, month = map(int, value.split("-"))
+            return datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+        if len(value) == 10:
+            return datetime.fromisoformat(value).replace(tzinfo=timezone.utc) + timedelta(days=1)
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _as_utc(since):
+    if since is None or isinstance(since, datetime):
+        moment = since
+    else:
+        moment = datetime.fromisoformat(str(since).replace("Z", "+00:00"))
+    if moment is not None and moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def _fetch(session, url):
+    """GET a URL and return its body, or None on failure."""
+    try:
+        resp = session.get(url, timeout=REQUEST_TIMEOUT)
+    except Exception as e:
+        print(f"[WARN] Could not fetch {url}: {e}")
+        return None
+    if not resp.ok:
+        if resp.status_code != 404:
+            print(f"[WARN] Could not fetch {url}: HTTP {resp.status_code}")
+        return None
+    return resp.content
+
+
+def fetch_robots(session, base_url):
+    """
+    Fetch and parse the robots.txt of `base_url`'s host.
+
+    A missing robots.txt (or one that fails to download) allows everything, as
+    crawlers conventionally assume.
+    """
+    robots = RobotFileParser(urljoin(base_url, "/robots.txt"))
+    body = _fetch(session, robots.url)
+    robots.parse(body.decode("utf-8", errors="replace").splitlines() if body else [])
+    return robots
+
+
+def parse_sitemap(body):
+    """
+    Parse a sitemap or sitemap index, gzipped or not.
+
+    Returns:
+        tuple: (kind: "urlset" or "sitemapindex", entries: List[SitemapEntry])
+    """
+    if body[:2] == b"\x1f\x8b":
+        body = gzip.decompress(body)
+
+    kind, entries = None, []
+    loc = lastmod = priority = None
+    for event, el in iterparse(io.BytesIO(body), events=("start", "end")):
+        tag = el.tag.rsplit("}", 1)[-1]  # ignore the sitemap namespace
+        if event == "start":
+            if kind is None:
+                kind = tag
+            continue
+        if tag == "loc":
+            loc = (el.text or "").strip()
+        elif tag == "lastmod":
+            lastmod = parse_lastmod(el.text)
+        elif tag == "priority":
+            try:
+                priority = float(el.text)
+            except (TypeError, ValueError):
+                priority = None
+        elif tag in ("url", "sitemap"):
+            if loc:
+                entries.append(SitemapEntry(loc, lastmod, DEFAULT_PRIORITY if priority is None else priority))
+            loc = lastmod = priority = None
+            el.clear()  # keep memory flat on 50,000-URL sitemaps
+    return kind, entries
+
+
+def discover_site(start_url, since=None, session=None, max_sitemaps=MAX_SITEMAPS):
+    """
+    Read robots.txt and the site's sitemaps to seed a crawl.
+
+    Sitemaps listed in robots.txt are used, or `/sitemap.xml` when it lists none.
+    Sitemap indexes are followed (up to `max_sitemaps` files in total) and gzipped
+    sitemaps are decompressed. URLs outside the start URL's registered domain or
+    disallowed by robots.txt are dropped. With `since` (a datetime or ISO string),
+    URLs whose `lastmod` is older are reported as stale instead of being seeded, and
+    child sitemaps of an index that have not changed since then are not downloaded.
+
+    Args:
+        start_url (str): Page the crawl starts from
+        since (datetime or str): Skip URLs not modified since this moment (None keeps all)
+        session (requests.Session): Session to reuse (a new one is opened otherwise)
+        max_sitemaps (int): Maximum number of sitemap files to download
+
+    Returns:
+        SiteDiscovery: robots rules, crawl delay, seed entries and stale URLs
+    """
+    since = _as_utc(since)
+    own_session = session is None
+    session = session or requests.Session()
+    discovery = SiteDiscovery()
+    try:
+        discovery.robots = fetch_robots(session, start_url)
+        discovery.crawl_delay = discovery.robots.crawl_delay(ROBOTS_USER_AGENT)
+        queue = list(discovery.robots.site_maps() or [urljoin(start_url, "/sitemap.xml")])
+        domain = url_domain(start_url)
+        fetched, seen = set(), set()
+
+        while queue and discovery.sitemaps < max_sitemaps:
+            sitemap_url = queue.pop(0)
+            if sitemap_url in fetched:
+                continue
+            fetched.add(sitemap_url)
+            body = _fetch(session, sitemap_url)
+            if body is None:
+                continue
+            try:
+                kind, entries = parse_sitemap(body)
+            except (ParseError, OSError, EOFError) as e:
+                print(f"[WARN] Could not parse sitemap {sitemap_url}: {e}")
+                continue
+            discovery.sitemaps += 1
+
+            for entry in entries:
+                is_stale = since is not None and entry.lastmod is not None and entry.lastmod < since
+                if kind == "sitemapindex":
+                    if not is_stale:
+                        queue.append(entry.url)
+                elif entry.url not in seen and url_domain(entry.url) == domain and discovery.allow(entry.url):
+                    seen.add(entry.url)
+                    if is_stale:
+                        discovery.stale.append(entry.url)
+                    else:
+                        discovery.entries.append(entry)
+    finally:
+        if own_session:
+            session.close()
+
+    min_time = datetime.min.replace(tzinfo=timezone.utc)
+    discovery.entries.sort(key=lambda e: (e.priority, e.lastmod or min_time), reverse=True)
+    print(f"[INFO] Discovery for {start_url}: {discovery.summary()}")
+    return discovery
@@ -0,0 +1,265 @@
+# utils/compact_store.py
+
+import json
+import mmap
+import os
+import shutil
+import zlib
+from array import array
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)          # version 1 stores have no deleted records
+INDEX_FILE = "index.faiss"
+HEADER_FILE = "docstore.json"
+RECORDS_FILE = "docstore.bin"
+OFFSETS_FILE = "docstore.offsets.npy"
+DELETED_FILE = "docstore.deleted.npy"
+LEGACY_DOCSTORE_FILE = "index.pkl"    # LangChain's pickled docstore
+
+# Map the vectors (flat and HNSW storage, IVF lists) instead of reading them into RAM.
+# IO_FLAG_MMAP alone only maps IVF lists, and the two flags cannot be combined.
+MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC
+
+
+def has_compact_store(directory):
+    return os.path.exists(os.path.join(directory, HEADER_FILE))
+
+
+def _replace(path, write):
+    """Write a file next to `path` and move it into place atomically."""
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class CompactStoreWriter:
+    """
+    Write chunk records to a compact store directory as they are produced.
+
+    Each `append` writes one record (JSON `id`, `metadata`, `text`, zlib-compressed
+    unless `compress=False`) straight to the records file; only the byte offsets are
+    kept in memory, so a build never holds the chunk texts. `delete` marks records
+    as deleted (tombstones) without rewriting anything; `compact` drops them.
+    `finish` moves the records into place and writes the offsets, the deleted
+    positions, the header and the FAISS index, whose vector labels must be the record
+    positions. Every file is replaced atomically and the index comes last, so a
+    reader never finds an index with more vectors than records.
+    """
+
+    def __init__(self, directory, compress=True):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compress = compress
+        self._path = os.path.join(directory, RECORDS_FILE) + ".tmp"
+        self._file = open(self._path, "wb")
+        self.offsets = array("q", [0])
+        self.deleted = set()
+
+    @classmethod
+    def copy_of(cls, source, directory):
+        """Writer for `directory` that starts as a copy of the store in `source` and appends to it."""
+        header = read_header(source)
+        writer = cls(directory, compress=header["compression"] == "zlib")
+        writer._file.close()
+        shutil.copyfile(os.path.join(source, RECORDS_FILE), writer._path)
+        writer._file = open(writer._path, "ab")
+        writer.offsets = array("q", np.load(os.path.join(source, OFFSETS_FILE)).tolist())
+        writer.deleted = set(read_deleted(source).tolist())
+        return writer
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _write(self, payload):
+        self._file.write(payload)
+        self.offsets.append(self.offsets[-1] + len(payload))
+
+    def append(self, doc_id, doc):
+        """Write one chunk's record; returns its position."""
+        payload = json.dumps(
+            {"id": doc_id, "metadata": doc.metadata, "text": doc.page_content}, ensure_ascii=False
+        ).encode("utf-8")
+        self._write(zlib.compress(payload) if self.compress else payload)
+        return len(self) - 1
+
+    def delete(self, positions):
+        """Mark the records at `positions` as deleted; they stay in place until `compact`."""
+        self.deleted.update(int(position) for position in positions)
+
+    def compact(self):
+        """Remove the deleted records; the records after them move up, in order."""
+        drop, self.deleted = self.deleted, set()
+        self._file.close()
+        old_path = self._path + ".old"
+        os.replace(self._path, old_path)
+        offsets, self.offsets = self.offsets, array("q", [0])
+        with open(old_path, "rb") as old, open(self._path, "wb") as self._file:
+            size = os.fstat(old.fileno()).st_size
+            records = mmap.mmap(old.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            for position in range(len(offsets) - 1):
+                if position not in drop:
+                    self._write(records[offsets[position]:offsets[position + 1]])
+            if size:
+                records.close()
+        os.remove(old_path)
+        self._file = open(self._path, "ab")
+
+    def finish(self, index):
+        """
+        Write the offsets, the deleted positions, the header and `index`, completing the store.
+
+        The vectors of deleted records may still be in `index` (they are filtered out
+        at search time) or already removed from it (IVF, see
+        `utils.faiss_indexes.remove_vectors`).
+        """
+        if index.ntotal not in (len(self), len(self) - len(self.deleted)):
+            raise ValueError(f"Index has {index.ntotal} vectors for {len(self)} records "
+                             f"({len(self.deleted)} deleted)")
+        self._file.close()
+
+        def write_array(values):
+            def write(path):
+                with open(path, "wb") as f:
+                    np.save(f, values)
+            return write
+
+        def write_header(path):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"version": FORMAT_VERSION, "count": len(self), "deleted": len(self.deleted),
+                           "compression": "zlib" if self.compress else None}, f)
+
+        os.replace(self._path, os.path.join(self.directory, RECORDS_FILE))
+        _replace(os.path.join(self.directory, OFFSETS_FILE), write_array(np.frombuffer(self.offsets, dtype=np.int64)))
+        _replace(os.path.join(self.directory, DELETED_FILE), write_array(np.array(sorted(self.deleted), dtype=np.int64)))
+        _replace(os.path.join(self.directory, HEADER_FILE), write_header)
+        _replace(os.path.join(self.directory, INDEX_FILE), lambda path: faiss.write_index(index, path))
+        legacy = os.path.join(self.directory, LEGACY_DOCSTORE_FILE)
+        if os.path.exists(legacy):
+            os.remove(legacy)  # superseded; keeping it would leave a stale copy of every chunk
+
+    def close(self):
+        """Stop writing without completing the store (e.g. nothing was indexed)."""
+        self._file.close()
+        if os.path.exists(self._path):
+            os.remove(self._path)
+
+
+def save_compact(faiss_db, directory, compress=True):
+    """
+    Save a LangChain FAISS store (e.g. a legacy pickled vector DB) in the compact format.
+
+    Chunks are written in index position order through `CompactStoreWriter`.
+    """
+    writer = CompactStoreWriter(directory, compress)
+    for position in range(faiss_db.index.ntotal):
+        doc_id = faiss_db.index_to_docstore_id[position]
+        writer.append(doc_id, faiss_db.docstore.search(doc_id))
+    writer.finish(faiss_db.index)
+
+
+def read_header(directory):
+    with open(os.path.join(directory, HEADER_FILE), encoding="utf-8") as f:
+        header = json.load(f)
+    if header["version"] not in READABLE_VERSIONS:
+        raise ValueError(f"Unsupported vector store format version {header['version']} in {directory}")
+    return header
+
+
+def read_deleted(directory):
+    """Sorted positions of the deleted records of a store (empty for a version 1 store)."""
+    path = os.path.join(directory, DELETED_FILE)
+    if not os.path.exists(path):
+        return np.empty(0, dtype=np.int64)
+    return np.load(path)
+
+
+def _search_params(index, deleted):
+    """FAISS search parameters that skip the `deleted` labels, or None when none are deleted."""
+    if not len(deleted):
+        return None
+    selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(deleted))
+    # Unset fields of the index-specific parameters take FAISS defaults, not the index's settings.
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+class CompactVectorStore:
+    """
+    Read-only vector store over a compact store directory (see `CompactStoreWriter`).
+
+    The FAISS index, the records file and the offsets are all memory-mapped, so
+    opening a store is cheap whatever the corpus size, and processes serving the same
+    directory share one copy through the OS page cache. Only the top-k hits of a
+    search are decoded. Deleted records are skipped by the search (see
+    `CompactStoreWriter.delete`). Implements the `similarity_search` calls the RAG
+    pipeline uses.
+    """
+
+    def __init__(self, directory, embeddings, mmap_index=True):
+        self.directory = directory
+        self.embeddings = embeddings
+        header = read_header(directory)
+        self.compressed = header["compression"] == "zlib"
+        self.index = faiss.read_index(os.path.join(directory, INDEX_FILE), MMAP_FLAGS if mmap_index else 0)
+        self.offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode="r")
+        self.deleted = read_deleted(directory)
+        self._search_params = _search_params(self.index, self.deleted)
+        self._file = open(os.path.join(directory, RECORDS_FILE), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._records = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        """Number of chunks, not counting deleted records."""
+        return self.record_count - len(self.deleted)
+
+    @property
+    def record_count(self):
+        """Number of records, deleted ones included (positions run from 0 to this)."""
+        return len(self.offsets) - 1
+
+    def get(self, position):
+        """Decode the chunk stored at an index position."""
+        payload = self._records[int(self.offsets[position]):int(self.offsets[position + 1])]
+        record = json.loads(zlib.decompress(payload) if self.compressed else payload)
+        return Document(id=record["id"], page_content=record["text"], metadata=record["metadata"])
+
+    def iter_keys(self):
+        """Yield `(position, id, metadata)` of every chunk but deleted ones, without keeping their texts."""
+        deleted = set(self.deleted.tolist())
+        for position in range(self.record_count):
+            if position in deleted:
+                continue
+            doc = self.get(position)
+            yield position, doc.id, doc.metadata
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        if not len(self):
+            return []
+        distances, positions = self.index.search(np.asarray([embedding], dtype=np.float32), k,
+                                                 params=self._search_params)
+        return [
+            (self.get(position), float(distance))
+            for distance, position in zip(distances[0], positions[0])
+            if position != -1
+        ]
+
+    def similarity_search_by_vector(self, embedding, k=4):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4):
+        return self.similarity_search_with_score_by_vector(self.embeddings.embed_query(query), k)
+
+    def similarity_search(self, query, k=4):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def close(self):
+        if isinstance(self._records, mmap.mmap):
+            self._records.close()
+        self._file.close()
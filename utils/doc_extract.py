@@ -0,0 +1,252 @@
+# utils/doc_extract.py
+
+import io
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+from tools.page_store import default_pages_path
+from utils.extract_cache import CACHE_DIR, MAX_CACHE_BYTES, CacheStats, ExtractCache
+
+EXTRACTOR_VERSION = 1       # part of the cache key; bump when extraction output changes
+MAX_WORKERS = 4
+POLL_SECONDS = 0.1
+SUPPORTED_TYPES = (".pdf", ".txt", ".docx")
+
+
+def iter_document_pages(name, data):
+    """
+    Yield `(page_number, total_pages, text)` for each page of an uploaded document.
+
+    PDFs are read page by page; DOCX and TXT files have no pages and come out as a
+    single page.
+    """
+    lower = name.lower()
+    if lower.endswith(".pdf"):
+        from PyPDF2 import PdfReader  # delayed import
+        reader = PdfReader(io.BytesIO(data))
+        total = len(reader.pages)
+        for number, page in enumerate(reader.pages, 1):
+            yield number, total, page.extract_text() or ""
+    elif lower.endswith(".docx"):
+        import docx  # delayed import
+        doc = docx.Document(io.BytesIO(data))
+        yield 1, 1, "\n".join(para.text for para in doc.paragraphs)
+    elif lower.endswith(".txt"):
+        yield 1, 1, data.decode("utf-8", errors="replace")
+    else:
+        raise ValueError(f"Unsupported file type: {name}")
+
+
+def extract_to_part(name, upload_path, part_path, progress=None):
+    """
+    Extract one uploaded file into a JSONL part file, one record per page.
+
+    Runs in a worker process. Each page is written as soon as it is extracted and
+    reported on `progress` as `(name, page, total_pages)`.
+
+    Returns:
+        tuple: (pages: int, chars: int)
+    """
+    with open(upload_path, "rb") as f:
+        data = f.read()
+    pages = chars = 0
+    with open(part_path, "w", encoding="utf-8") as part:
+        for number, total, text in iter_document_pages(name, data):
+            part.write(json.dumps({"source": name, "page": number, "text": text}, ensure_ascii=False) + "\n")
+            pages += 1
+            chars += len(text)
+            if progress is not None:
+                progress.put((name, number, total))
+    return pages, chars
+
+
+@dataclass
+class FileResult:
+    """Outcome of extracting one uploaded file."""
+    name: str
+    pages: int = 0
+    chars: int = 0
+    error: str = None
+    cached: bool = False
+
+
+@dataclass
+class ExtractionReport:
+    files: list = field(default_factory=list)
+    cache: CacheStats = None
+
+    @property
+    def failed(self):
+        return [result for result in self.files if result.error]
+
+    def summary(self):
+        pages = sum(result.pages for result in self.files)
+        return (
+            f"{len(self.files) - len(self.failed)} of {len(self.files)} files extracted, "
+            f"{pages} pages, {len(self.failed)} failed"
+            + (f"; cache: {self.cache.summary()}" if self.cache else "")
+        )
+
+
+def _merge_parts(results, part_paths, output_path, pages_path):
+    """Concatenate the per-file parts, in upload order, into the text file and JSONL."""
+    with open(output_path, "w", encoding="utf-8") as out, open(pages_path, "w", encoding="utf-8") as jsonl:
+        for result, part_path in zip(results, part_paths):
+            if result.error or not os.path.exists(part_path):
+                continue
+            out.write(f"\n\n--- Extracted from: {result.name} ---\n\n")
+            with open(part_path, encoding="utf-8") as part:
+                for i, line in enumerate(part):
+                    record = json.loads(line)
+                    record["source"] = result.name  # cached parts may come from another upload
+                    jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    if i:
+                        out.write("\n")
+                    out.write(record["text"])
+
+
+def _part_stats(part_path):
+    """Page and character counts of a JSONL part file."""
+    pages = chars = 0
+    with open(part_path, encoding="utf-8") as part:
+        for line in part:
+            pages += 1
+            chars += len(json.loads(line)["text"])
+    return pages, chars
+
+
+def _run_pool(jobs, max_workers, context, progress, page_done, finished, retry=True):
+    """
+    Extract `(result, upload_path, part_path, cache_key)` jobs in a process pool.
+
+    Returns:
+        list: jobs lost to a crashed worker process (when `retry` is set)
+    """
+    crashed = []
+    with ProcessPoolExecutor(min(max_workers, len(jobs)), mp_context=context) as pool:
+        pending = {
+            pool.submit(extract_to_part, job[0].name, job[1], job[2], progress): job
+            for job in jobs
+        }
+
+        while pending:
+            completed, _ = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+            while True:
+                try:
+                    page_done(*progress.get_nowait())
+                except queue.Empty:
+                    break
+            for future in completed:
+                job = pending.pop(future)
+                result = job[0]
+                try:
+                    result.pages, result.chars = future.result()
+                except BrokenProcessPool as e:
+                    if retry:
+                        crashed.append(job)
+                        continue
+                    result.error = str(e) or type(e).__name__
+                except Exception as e:
+                    result.error = str(e) or type(e).__name__
+                if result.error:
+                    print(f"[ERROR] Failed to extract {result.name}: {result.error}")
+                finished(job)
+    return crashed
+
+
+def extract_uploads(files, output_path="txt/filedata.txt", pages_path=None,
+                    max_workers=MAX_WORKERS, on_progress=None,
+                    cache_dir=CACHE_DIR, cache_max_bytes=MAX_CACHE_BYTES):
+    """
+    Extract text from uploaded files in a process pool, streaming pages to disk.
+
+    Each file is spooled to a temporary directory and extracted by a worker process
+    into its own part file, page by page, so neither the uploads nor their text have
+    to sit in memory together. A file that fails to extract is reported and skipped
+    without holding up the others. The parts are then joined in upload order into
+    `output_path` (one `--- Extracted from: <name> ---` block per file) and into
+    `pages_path` (default: `output_path` with a `.jsonl` suffix) as one JSON record
+    per page with source, page number and text.
+
+    Extracted text is cached by content (see `utils.extract_cache.ExtractCache`), so
+    files seen before, under any name, are not parsed again.
+
+    Args:
+        files (Iterable[tuple]): `(name, data)` pairs, `data` being the file's bytes
+        output_path (str): Where to write the combined text
+        pages_path (str): Where to write the page-level JSONL
+        max_workers (int): Number of extraction processes
+        on_progress (callable): Called as `on_progress(files_done, files_total, name,
+            page, total_pages)` on every extracted page and finished file
+        cache_dir (str): Extraction cache directory (None to disable caching)
+        cache_max_bytes (int): Size limit of the extraction cache
+
+    Returns:
+        ExtractionReport: per-file page counts and errors
+    """
+    pages_path = pages_path or default_pages_path(output_path)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    cache = ExtractCache(cache_dir, cache_max_bytes) if cache_dir else None
+    report = ExtractionReport(cache=cache.stats if cache else None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs, part_paths, keys = [], [], {}
+        for i, (name, data) in enumerate(files):
+            result = FileResult(name)
+            report.files.append(result)
+            part_paths.append(os.path.join(tmp, f"{i}.jsonl"))
+            if cache:
+                keys[i] = ExtractCache.key(data, EXTRACTOR_VERSION)
+                cached_path = cache.get(keys[i])
+                if cached_path:
+                    shutil.copyfile(cached_path, part_paths[-1])
+                    result.pages, result.chars = _part_stats(part_paths[-1])
+                    result.cached = True
+                    continue
+            upload_path = os.path.join(tmp, f"{i}.upload")
+            with open(upload_path, "wb") as f:
+                f.write(data)
+            jobs.append((result, upload_path, part_paths[-1], keys.get(i)))
+
+        total, done = len(report.files), 0
+        for result in report.files:
+            if result.cached:
+                done += 1
+                if on_progress:
+                    on_progress(done, total, result.name, result.pages, result.pages)
+
+        def finished(job):
+            nonlocal done
+            result, _, part_path, key = job
+            if cache and not result.error:
+                cache.put(key, part_path)
+            done += 1
+            if on_progress:
+                on_progress(done, total, result.name, result.pages, result.pages)
+
+        def page_done(name, page, pages):
+            if on_progress:
+                on_progress(done, total, name, page, pages)
+
+        if jobs:
+            # Spawned workers only import this module and the document parsers.
+            context = multiprocessing.get_context("spawn")
+            with context.Manager() as manager:
+                progress = manager.Queue()
+                crashed = _run_pool(jobs, max_workers, context, progress, page_done, finished)
+                # A file that crashes its worker process (rather than raising) takes the
+                # whole pool down; retry the affected files one per pool to isolate it.
+                for job in crashed:
+                    _run_pool([job], 1, context, progress, page_done, finished, retry=False)
+
+        _merge_parts(report.files, part_paths, output_path, pages_path)
+
+    print(f"[INFO] Extraction: {report.summary()}")
+    return report
@@ -0,0 +1,53 @@
+# utils/document_sources.py
+
+import json
+import os
+
+from langchain_core.documents import Document
+
+
+def iter_jsonl_documents(path):
+    """
+    Lazily yield one Document per page of a JSONL page stream.
+
+    Reads both the crawler's page stream (`url`, `title`, `text`) and the
+    uploaded-file stream (`source`, `page`, `text`). Each Document carries where its
+    text came from in `metadata`: `source` (URL or file name), plus `title` or
+    `page` when known. Pages without text and repeated pages are skipped.
+    """
+    seen = set()
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # partially written line from an interrupted run
+            text = record.get("text")
+            source = record.get("url") or record.get("source")
+            if not text or not source:
+                continue
+            metadata = {"source": source}
+            if record.get("title"):
+                metadata["title"] = record["title"]
+            if record.get("page") is not None:
+                metadata["page"] = record["page"]
+            key = (source, metadata.get("page"))
+            if key in seen:
+                continue
+            seen.add(key)
+            yield Document(page_content=text, metadata=metadata)
+
+
+def iter_documents(*paths):
+    """Chain the Documents of several JSONL page streams, skipping missing files."""
+    for path in paths:
+        if path and os.path.exists(path):
+            yield from iter_jsonl_documents(path)
+
+
+def format_source(metadata):
+    """Human-readable origin of a chunk, e.g. "report.pdf, page 3" or a URL."""
+    source = metadata.get("source", "unknown source")
+    if metadata.get("page") is not None:
+        return f"{source}, page {metadata['page']}"
+    return source
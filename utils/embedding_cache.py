@@ -0,0 +1,204 @@
+# utils/embedding_cache.py
+
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+CACHE_DIR = "cache/embeddings"
+
+# --- Execution defaults ---
+BATCH_SIZE = 96             # Cohere's limit on texts per embed call
+MAX_CONCURRENCY = 4
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL);
+"""
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache: float32 vectors in one append-only file, plus an index.
+
+    Vectors are stored back to back in `vectors.f32` and read through a read-only
+    memory map, so lookups only touch the pages they need and several processes can
+    share the file through the OS page cache. A SQLite index maps each key to its row;
+    appends happen inside an exclusive SQLite transaction, so concurrent writers (other
+    processes building their own bots) never hand out the same row twice.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._map = None
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+
+    @staticmethod
+    def key(model, input_type, text):
+        return hashlib.sha256("\0".join((model, input_type, text)).encode("utf-8")).hexdigest()
+
+    def _rows(self, needed):
+        """Memory map covering at least `needed` rows (re-mapped as the file grows)."""
+        if self._map is None or len(self._map) < needed:
+            rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+            self._map = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._map
+
+    def get_many(self, keys):
+        """Return `{key: vector}` for the keys that are cached."""
+        if self.dim is None or not keys:
+            return {}
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):  # stay under SQLite's variable limit
+                batch = keys[start:start + 500]
+                found.update(self.conn.execute(
+                    f"SELECT key, row FROM vectors WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall())
+            if not found:
+                return {}
+            vectors = self._rows(max(found.values()) + 1)
+            return {key: np.array(vectors[row]) for key, row in found.items()}
+
+    def put_many(self, keys, vectors):
+        """Append vectors for new keys."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not keys:
+            return
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+            if row is None:
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(vectors.shape[1]),))
+            self.dim = int(row[0]) if row else vectors.shape[1]
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding size {vectors.shape[1]} does not match cache size {self.dim}")
+            row_bytes = 4 * self.dim
+            with open(self.vectors_path, "ab") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size % row_bytes:  # torn write from a crashed process
+                    f.truncate(size - size % row_bytes)
+                first_row = size // row_bytes
+                f.write(vectors.tobytes())
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO vectors (key, row) VALUES (?, ?)",
+                [(key, first_row + i) for i, key in enumerate(keys)],
+            )
+
+    def close(self):
+        self._map = None
+        self.conn.close()
+
+
+@dataclass
+class EmbeddingStats:
+    texts: int = 0
+    cache_hits: int = 0
+    api_calls: int = 0
+    retries: int = 0
+
+    def summary(self):
+        return (
+            f"{self.texts} texts: {self.cache_hits} cached, "
+            f"{self.api_calls} API calls ({self.retries} retries)"
+        )
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wrap an `Embeddings` model with a persistent cache and batched, concurrent calls.
+
+    Texts are keyed by (model, input type, text hash), so identical chunks are
+    embedded once across builds and across bots sharing the cache directory. Misses
+    are de-duplicated, split into batches of `batch_size` and sent with up to
+    `max_concurrency` requests in flight; failed batches (e.g. HTTP 429 rate limits)
+    are retried with exponential backoff.
+
+    Args:
+        embeddings (Embeddings): Model that computes the vectors, e.g. `CohereEmbeddings`
+            or `langchain_core.embeddings.DeterministicFakeEmbedding` for tests
+        model (str): Model name (part of the cache key and of the cache directory)
+        cache_dir (str): Root cache directory, or None to disable caching
+        batch_size (int): Texts per embedding request
+        max_concurrency (int): Concurrent embedding requests
+        max_retries (int): Retries per batch after the first attempt
+        backoff (float): Base delay in seconds, doubled on every retry
+    """
+
+    def __init__(self, embeddings, model, cache_dir=CACHE_DIR, batch_size=BATCH_SIZE,
+                 max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = None
+        if cache_dir:
+            self.cache = EmbeddingCache(os.path.join(cache_dir, re.sub(r"[^\w.-]+", "_", model)))
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats = EmbeddingStats()
+
+    def _call(self, fn, arg):
+        """Run one embedding request with retries; runs on a worker thread."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn(arg), attempt
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+                print(f"[WARN] Embedding call failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _embed(self, texts, input_type, fn):
+        self.stats.texts += len(texts)
+        keys = [self.cache.key(self.model, input_type, text) for text in texts] if self.cache else list(texts)
+        vectors = self.cache.get_many(keys) if self.cache else {}
+        self.stats.cache_hits += sum(key in vectors for key in keys)
+
+        missing = list(dict.fromkeys((key, text) for key, text in zip(keys, texts) if key not in vectors))
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        if len(batches) == 1:
+            self._store(batches[0], *self._call(fn, [text for _, text in batches[0]]), vectors)
+        elif batches:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                futures = [pool.submit(self._call, fn, [text for _, text in batch]) for batch in batches]
+                # Stored as they arrive, so a failing batch keeps the earlier ones cached.
+                for batch, future in zip(batches, futures):
+                    self._store(batch, *future.result(), vectors)
+        return [np.asarray(vectors[key], dtype=np.float32).tolist() for key in keys]
+
+    def _store(self, batch, embedded, retries, vectors):
+        self.stats.api_calls += 1
+        self.stats.retries += retries
+        batch_keys = [key for key, _ in batch]
+        if self.cache:
+            self.cache.put_many(batch_keys, embedded)
+        vectors.update(zip(batch_keys, embedded))
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts), "document", self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed([text], "query", lambda batch: [self.embeddings.embed_query(batch[0])])[0]
+
+    def close(self):
+        if self.cache:
+            self.cache.close()
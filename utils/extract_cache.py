@@ -0,0 +1,100 @@
+# utils/extract_cache.py
+
+import hashlib
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+
+CACHE_DIR = "cache/extracted"
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+ENTRY_SUFFIX = ".jsonl"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self):
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hit_ratio:.0%} hit ratio), "
+            f"{self.evictions} evicted"
+        )
+
+
+class ExtractCache:
+    """
+    Content-addressed on-disk cache of extracted document text.
+
+    Entries are page-level JSONL files named after a hash of the file's bytes and the
+    extractor version, so the same document uploaded again (under any name) is never
+    parsed twice, and bumping the version invalidates everything. The directory is
+    kept under `max_bytes` by evicting least recently used entries; a hit refreshes
+    the entry's mtime, which is what recency is measured by.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(data, version):
+        digest = hashlib.sha256(f"v{version}\0".encode("utf-8"))
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Path of the cached entry for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return path
+
+    def put(self, key, source_path):
+        """Store a copy of `source_path` under `key`, then evict down to the size limit."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, self._path(key))  # atomic, so readers never see half an entry
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits in `max_bytes`."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(ENTRY_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        keep_path = self._path(keep) if keep else None
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep_path:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:  # evicted by another session meanwhile
+                pass
+            total -= size
+            self.stats.evictions += 1
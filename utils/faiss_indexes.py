@@ -0,0 +1,215 @@
+# utils/faiss_indexes.py
+
+import math
+import tempfile
+from itertools import islice
+
+import faiss
+import numpy as np
+
+from utils.compact_store import CompactStoreWriter, CompactVectorStore
+
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivf-flat", "ivf-pq")
+
+# --- Automatic choice by corpus size ---
+FLAT_MAX_VECTORS = 20_000       # exact search is fast enough below this
+HNSW_MAX_VECTORS = 500_000      # graph index while full vectors still fit in RAM; IVF-PQ above
+
+# --- Index parameters ---
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 16
+IVF_MIN_POINTS_PER_LIST = 39    # FAISS warns when training with fewer
+IVF_TRAIN_SAMPLE = 100_000
+PQ_BYTES_PER_VECTOR = 64        # 1024-dim float32 (4 KB) -> 64-byte codes
+PQ_BITS = 8
+BUILD_BATCH_SIZE = 1024         # chunks embedded and added per step
+REBUILD_DELETED_RATIO = 0.2     # deleted records kept as tombstones until they exceed this share
+
+
+def choose_index_type(num_vectors):
+    """Index type for a corpus of `num_vectors` chunks."""
+    if num_vectors <= FLAT_MAX_VECTORS:
+        return "flat"
+    if num_vectors <= HNSW_MAX_VECTORS:
+        return "hnsw"
+    return "ivf-pq"
+
+
+def _nlist(num_vectors):
+    """Number of IVF lists: ~4*sqrt(n), with enough training points per list."""
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // IVF_MIN_POINTS_PER_LIST))
+
+
+def _pq_subquantizers(dim):
+    """Largest divisor of `dim` not above PQ_BYTES_PER_VECTOR (one byte per subquantizer)."""
+    return max(m for m in range(1, min(dim, PQ_BYTES_PER_VECTOR) + 1) if dim % m == 0)
+
+
+def make_index(index_type, dim, num_vectors):
+    """
+    Create an empty (untrained) L2 FAISS index of the given type.
+
+    Args:
+        index_type (str): One of INDEX_TYPES; "auto" picks by `num_vectors`
+        dim (int): Vector size
+        num_vectors (int): Expected corpus size (sizes the IVF lists)
+
+    Returns:
+        faiss.Index
+    """
+    if index_type == "auto":
+        index_type = choose_index_type(num_vectors)
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    if index_type in ("ivf-flat", "ivf-pq"):
+        nlist = _nlist(num_vectors)
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf-flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), PQ_BITS)
+        index.nprobe = min(IVF_NPROBE, nlist)
+        return index
+    raise ValueError(f"Unknown index type: {index_type} (expected one of {', '.join(INDEX_TYPES)})")
+
+
+def train_index(index, vectors, seed=0):
+    """Train an index that needs it (IVF) on a sample of `vectors`."""
+    if index.is_trained:
+        return
+    if len(vectors) > IVF_TRAIN_SAMPLE:
+        rng = np.random.default_rng(seed)
+        vectors = vectors[rng.choice(len(vectors), IVF_TRAIN_SAMPLE, replace=False)]
+    index.train(vectors)
+
+
+def index_type_of(index):
+    """Name of the INDEX_TYPES entry an index was built as."""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf-pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf-flat"
+    return "flat"
+
+
+def batched(iterable, size):
+    """Yield lists of up to `size` items."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def build_faiss_db(chunks, embeddings, directory, index_type="auto", batch_size=BUILD_BATCH_SIZE):
+    """
+    Embed chunks and index them in a compact store of the chosen index type.
+
+    Like `FAISS.from_documents`, but the vectors go into an HNSW, IVF-Flat or IVF-PQ
+    index (trained on the corpus first) instead of always an exact flat index, and
+    the store is written to `directory` (see `utils.compact_store`).
+
+    `chunks` may be a generator: it is embedded `batch_size` chunks at a time, each
+    chunk's record is written to disk as soon as it is embedded, and the float32
+    vectors are spooled to a temporary file, so only one batch of chunks and vectors
+    (plus the chunk IDs and record offsets) is in memory at a time. Once the corpus
+    size is known (it picks the "auto" index type and sizes IVF lists) the index is
+    trained on a sample and filled from the spool in batches.
+
+    Args:
+        chunks (Iterable[tuple[str, Document]]): (chunk ID, chunk) pairs; repeated IDs are skipped
+        embeddings (Embeddings): Embedding model
+        directory (str): Directory the store is written to
+        index_type (str): One of INDEX_TYPES
+        batch_size (int): Chunks per embedding call and index insertion
+
+    Returns:
+        CompactVectorStore, or None when there are no chunks
+    """
+    seen = set()
+    dim = None
+    writer = CompactStoreWriter(directory)
+    with tempfile.TemporaryFile() as spool:
+        for batch in batched(chunks, batch_size):
+            batch = [(doc_id, chunk) for doc_id, chunk in dict(batch).items() if doc_id not in seen]
+            if not batch:
+                continue
+            vectors = np.asarray(embeddings.embed_documents([chunk.page_content for _, chunk in batch]), dtype=np.float32)
+            spool.write(vectors.tobytes())
+            dim = vectors.shape[1]
+            for doc_id, chunk in batch:
+                seen.add(doc_id)
+                writer.append(doc_id, chunk)
+        if not seen:
+            writer.close()
+            return None
+        spool.flush()
+        vectors = np.memmap(spool, dtype=np.float32, mode="r", shape=(len(seen), dim))
+
+        index = make_index(index_type, dim, len(seen))
+        train_index(index, vectors)
+        for start in range(0, len(seen), batch_size):
+            index.add(np.ascontiguousarray(vectors[start:start + batch_size]))
+        del vectors
+    writer.finish(index)
+    print(f"[INFO] Built {index_type_of(index)} index for {len(seen)} chunks.")
+    return CompactVectorStore(directory, embeddings)
+
+
+def add_vectors(index, vectors, first_position):
+    """
+    Add vectors labelled with consecutive positions from `first_position`.
+
+    Flat and HNSW indexes label vectors by insertion order, which is the position as
+    they never lose vectors. IVF indexes may have gaps left by `remove_vectors`, so
+    their labels are given explicitly.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if isinstance(index, faiss.IndexIVF):
+        index.add_with_ids(vectors, np.arange(first_position, first_position + len(vectors), dtype=np.int64))
+    else:
+        index.add(vectors)
+
+
+def remove_vectors(index, positions):
+    """
+    Remove the vectors at `positions` from an index that can do so in place.
+
+    IVF indexes drop them from their lists and keep the other labels. Flat indexes
+    would renumber the vectors after them and HNSW graphs cannot remove vectors, so
+    those are left alone; their records are marked deleted and filtered out at
+    search time instead (see `utils.compact_store`).
+
+    Returns:
+        bool: True if the vectors were removed
+    """
+    if not isinstance(index, faiss.IndexIVF):
+        return False
+    index.remove_ids(np.asarray(positions, dtype=np.int64))
+    return True
+
+
+def rebuild_index(index, keep):
+    """
+    Copy of a trained index holding only the vectors at positions `keep`, in that order.
+
+    Used to compact a store once deleted records pile up (see REBUILD_DELETED_RATIO).
+    The copy is not retrained.
+    """
+    if isinstance(index, faiss.IndexIVF):
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)  # read vectors back by label, gaps allowed
+    rebuilt = faiss.clone_index(index)
+    rebuilt.reset()
+    if isinstance(rebuilt, faiss.IndexIVF):
+        rebuilt.set_direct_map_type(faiss.DirectMap.NoMap)
+    keep = np.asarray(keep, dtype=np.int64)
+    for start in range(0, len(keep), BUILD_BATCH_SIZE):
+        rebuilt.add(index.reconstruct_batch(keep[start:start + BUILD_BATCH_SIZE]))
+    return rebuilt
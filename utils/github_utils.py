@@ -60,7 +60,7 @@ def commit_and_push_changes(repo_url: str, repo_name="xalt-chatbot-repo"):
         "frontend.py", "requirements.txt", ".env", "rag_pipeline.py", "vector_database.py",
         "README.md", "deploy_streamlit_to_railway.py", "Dockerfile", "Procfile", "__init__.py"
     ]
-    folders_to_include = ["vectorstore", "agents", "utils", "txt", "templates", "static"]
+    folders_to_include = ["agents", "utils", "txt", "templates", "static"]
 
     # Copy files into the new repo folder
     for f in files_to_include:
@@ -73,6 +73,11 @@ def commit_and_push_changes(repo_url: str, repo_name="xalt-chatbot-repo"):
             dst_path = os.path.join(repo_name, d)
             shutil.copytree(d, dst_path, dirs_exist_ok=True)
 
+    # Copy only the published vectorstore snapshot, not older ones or a build in progress
+    if os.path.exists("vectorstore"):
+        from utils.snapshots import copy_current  # delayed import
+        copy_current("vectorstore", os.path.join(repo_name, "vectorstore"))
+
     # Change directory to the repo folder for git commands
     os.chdir(repo_name)
 
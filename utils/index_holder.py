@@ -0,0 +1,100 @@
+# utils/index_holder.py
+
+import os
+import threading
+import time
+
+CHECK_INTERVAL_SECONDS = 1.0
+
+
+def file_signature(*paths):
+    """(mtime, size) of each existing path; changes whenever one of them is rewritten."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class IndexHolder:
+    """
+    Process-wide holder of a loaded vector store, reloaded when it changes on disk.
+
+    The first `get()` loads the store; later calls return the loaded one. At most
+    every `check_interval` seconds, `get()` compares `signature()` with the one the
+    store was loaded under, and on a change starts a background thread that loads
+    the new store and swaps it in. Queries keep using the old store until then, and a
+    query that already holds the old store finishes on it (it is released once no
+    query uses it). A failed reload is logged and retried on a later check.
+
+    Args:
+        load (Callable[[], object]): Loads the store
+        signature (Callable[[], Hashable]): Cheap fingerprint of the store on disk
+        check_interval (float): Minimum seconds between two signature checks
+    """
+
+    def __init__(self, load, signature, check_interval=CHECK_INTERVAL_SECONDS):
+        self._load = load
+        self._signature = signature
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._current = None        # (store, signature it was loaded under)
+        self._checked_at = 0.0
+        self._reloading = False
+        self.loads = 0
+        self.last_load_seconds = 0.0
+
+    def _load_store(self):
+        signature = self._signature()
+        start = time.perf_counter()
+        store = self._load()
+        self.last_load_seconds = time.perf_counter() - start
+        self.loads += 1
+        return store, signature
+
+    def get(self):
+        """Return the current store, loading it on first use."""
+        return self.current()[0]
+
+    def current(self):
+        """Return `(store, signature)`: the current store and the on-disk version it was loaded from."""
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    self._current = self._load_store()
+                    self._checked_at = time.monotonic()
+                return self._current
+
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval and not self._reloading:
+            with self._lock:
+                if now - self._checked_at >= self.check_interval and not self._reloading:
+                    self._checked_at = now
+                    if self._signature() != current[1]:
+                        self._reloading = True
+                        threading.Thread(target=self._reload, name="index-reload", daemon=True).start()
+        return current
+
+    def _reload(self):
+        try:
+            store, signature = self._load_store()
+        except Exception as e:
+            print(f"[WARN] Vector store reload failed, still serving the previous one: {e}")
+        else:
+            with self._lock:
+                self._current = (store, signature)
+            print(f"[INFO] Vector store reloaded in {self.last_load_seconds:.2f}s.")
+        finally:
+            self._reloading = False
+
+    def wait_for_reload(self, timeout=None):
+        """Block until a background reload in progress has finished (for tests and benchmarks)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._reloading and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.01)
+        return not self._reloading
@@ -0,0 +1,202 @@
+# utils/query_cache.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# --- Query embedding cache ---
+EMBEDDING_CACHE_ENTRIES = 10_000
+EMBEDDING_CACHE_TTL_SECONDS = 24 * 3600
+
+# --- Semantic answer cache ---
+ANSWER_CACHE_ENTRIES = 1000
+ANSWER_CACHE_TTL_SECONDS = 6 * 3600
+ANSWER_CACHE_THRESHOLD = 0.95   # cosine similarity; paraphrases of one question score above
+
+
+class LRUCache:
+    """Thread-safe LRU cache whose entries also expire `ttl` seconds after being stored."""
+
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[0] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _hit_ratio(hits, misses):
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+class QueryEmbeddingCache(Embeddings):
+    """
+    Wrap an `Embeddings` model with an in-memory LRU/TTL cache of query embeddings.
+
+    Only `embed_query` is cached (keyed by the query with surrounding whitespace
+    removed); `embed_documents` goes straight to the model. Saved time is estimated
+    from the average duration of the calls that missed.
+    """
+
+    def __init__(self, embeddings, max_entries=EMBEDDING_CACHE_ENTRIES, ttl=EMBEDDING_CACHE_TTL_SECONDS):
+        self.embeddings = embeddings
+        self.cache = LRUCache(max_entries, ttl)
+        self._miss_seconds = 0.0
+
+    def embed_query(self, text):
+        key = text.strip()
+        vector = self.cache.get(key)
+        if vector is None:
+            start = time.perf_counter()
+            vector = self.embeddings.embed_query(text)
+            self._miss_seconds += time.perf_counter() - start
+            self.cache.put(key, vector)
+        return vector
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    @property
+    def saved_seconds(self):
+        return self.cache.hits * self._miss_seconds / max(self.cache.misses, 1)
+
+    def summary(self):
+        return (f"query embeddings {_hit_ratio(self.cache.hits, self.cache.misses):.0%} cached "
+                f"({self.cache.hits} hits, ~{self.saved_seconds:.1f}s saved)")
+
+
+def history_key(chat_history):
+    """Key of a chat history; an empty history always gets the same key."""
+    return hashlib.sha256(chat_history.strip().encode("utf-8")).hexdigest() if chat_history.strip() else ""
+
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers, looked up by query-embedding similarity.
+
+    An answer is reused for a new query whose embedding has a cosine similarity of at
+    least `threshold` with a cached query asked with the same chat history (in
+    practice mostly an empty one, i.e. the first question of a session), and only
+    while the vectorstore is the snapshot the answer was generated from: a lookup with
+    another `version` empties the cache, and answers stored under any version but the
+    current one are dropped. Entries are evicted least recently used and
+    expire after `ttl` seconds.
+
+    Saved time is estimated per hit as the average duration of the full answers
+    recorded with `record_miss` minus the duration of the cached response.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_ENTRIES,
+                 ttl=ANSWER_CACHE_TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = OrderedDict()   # id -> (created, history key, unit vector, value)
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._miss_seconds = 0.0
+        self._misses_timed = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def lookup(self, vector, version, chat_history=""):
+        """Cached value for the most similar cached query above the threshold, or None."""
+        key = history_key(chat_history)
+        unit = self._unit(vector)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            for entry_id in [i for i, entry in self._entries.items() if now - entry[0] >= self.ttl]:
+                del self._entries[entry_id]
+            candidates = [(entry_id, entry) for entry_id, entry in self._entries.items() if entry[1] == key]
+            if candidates:
+                scores = np.stack([entry[2] for _, entry in candidates]) @ unit
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry_id, entry = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return entry[3]
+            self.misses += 1
+            return None
+
+    def store(self, vector, version, value, chat_history=""):
+        """
+        Cache an answer generated from snapshot `version`.
+
+        An answer generated from another snapshot than the current one (e.g. a hot
+        reload happened while it was being generated) is dropped.
+        """
+        with self._lock:
+            if self._version is None:
+                self._version = version
+            if version != self._version:
+                return
+            self._entries[self._next_id] = (time.monotonic(), history_key(chat_history), self._unit(vector), value)
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_miss(self, seconds):
+        """Record how long an uncached answer took."""
+        with self._lock:
+            self._miss_seconds += seconds
+            self._misses_timed += 1
+
+    def record_hit(self, seconds):
+        """Record how long a cached answer took, crediting the time it saved."""
+        with self._lock:
+            if self._misses_timed:
+                self.saved_seconds += max(self._miss_seconds / self._misses_timed - seconds, 0.0)
+
+    def summary(self):
+        return (f"answers {_hit_ratio(self.hits, self.misses):.0%} cached "
+                f"({self.hits} hits, ~{self.saved_seconds:.1f}s saved, "
+                f"{self.invalidations} invalidations)")
@@ -0,0 +1,165 @@
+# utils/sharded_build.py
+
+import math
+import multiprocessing
+import os
+import tempfile
+from collections.abc import Sized
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import faiss
+import numpy as np
+
+from utils.compact_store import CompactStoreWriter, CompactVectorStore
+from itertools import chain, islice
+
+from utils.embedding_cache import CachedEmbeddings, EmbeddingStats
+from utils.faiss_indexes import IVF_TRAIN_SAMPLE, batched, build_faiss_db, index_type_of, make_index
+
+SHARD_SIZE = 1024           # chunks per shard when the corpus size is not known up front
+MIN_SHARD_SIZE = 256        # smaller shards cost more in process round trips than they gain
+SHARDS_PER_WORKER = 4       # enough shards to keep every worker busy until the end
+MAX_WORKERS = os.cpu_count() or 1
+
+_worker_embeddings = None   # per worker process, created on its first shard
+
+
+def _embed_shard(embedding_factory, texts, spool_path):
+    """
+    Embed one shard's texts and save the vectors as a `.npy` file.
+
+    Runs in a worker process, which creates its embedding model once with
+    `embedding_factory` (a picklable, module-level function).
+
+    Returns:
+        tuple: (vectors: int, dim: int, stats: EmbeddingStats or None)
+    """
+    global _worker_embeddings
+    if _worker_embeddings is None:
+        _worker_embeddings = embedding_factory()
+    stats = None
+    if isinstance(_worker_embeddings, CachedEmbeddings):
+        stats = _worker_embeddings.stats = EmbeddingStats()
+    vectors = np.asarray(_worker_embeddings.embed_documents(texts), dtype=np.float32)
+    np.save(spool_path, vectors)
+    return len(vectors), vectors.shape[1], stats
+
+
+def _index_shard(template, spool_path):
+    """Add one shard's vectors to a copy of the trained empty index; runs in a worker process."""
+    index = faiss.deserialize_index(template)
+    index.add(np.load(spool_path))
+    return faiss.serialize_index(index)
+
+
+def shard_size_for(num_chunks, max_workers):
+    """Shard size that splits `num_chunks` into about SHARDS_PER_WORKER shards per worker."""
+    return max(MIN_SHARD_SIZE, math.ceil(num_chunks / (SHARDS_PER_WORKER * max_workers)))
+
+
+def _training_sample(spool_paths, counts, seed=0):
+    """Random sample of up to IVF_TRAIN_SAMPLE vectors drawn across all shards."""
+    total = sum(counts)
+    rng = np.random.default_rng(seed)
+    picks = np.sort(rng.choice(total, min(total, IVF_TRAIN_SAMPLE), replace=False))
+    starts = np.cumsum([0] + counts[:-1])
+    parts = []
+    for path, start, count in zip(spool_paths, starts, counts):
+        rows = picks[(picks >= start) & (picks < start + count)] - start
+        if len(rows):
+            parts.append(np.load(path, mmap_mode="r")[rows])
+    return np.concatenate(parts)
+
+
+def build_sharded_faiss_db(chunks, embeddings, embedding_factory, directory, index_type="auto",
+                           shard_size=None, max_workers=MAX_WORKERS):
+    """
+    Build a compact store with shards embedded and indexed in worker processes.
+
+    The chunk stream is cut into shards of `shard_size` unique chunks, and each shard
+    is embedded in a worker process, with a few shards queued per worker. The parent
+    writes each chunk's record to `directory` as its shard is handed out and keeps
+    only the chunk IDs and record offsets. Once the corpus size is known the index
+    is created (the "auto" type is picked by size) and, for IVF, trained on a sample
+    drawn across all shards. Flat and IVF shards are then filled in the workers from
+    copies of that one trained index and merged in shard order with `merge_from`, so
+    index positions follow the chunk stream. HNSW graphs
+    cannot be merged; their vectors are added in the parent, where FAISS parallelizes
+    insertion itself.
+
+    Shards are sized with `shard_size_for` when `chunks` has a length, and are
+    SHARD_SIZE chunks otherwise. A corpus that fits in a single shard gains nothing
+    from workers and is built in-process with `utils.faiss_indexes.build_faiss_db`.
+
+    Args:
+        chunks (Iterable[tuple[str, Document]]): (chunk ID, chunk) pairs; repeated IDs are skipped
+        embeddings (Embeddings): Model stored on the returned store for queries
+        embedding_factory (Callable[[], Embeddings]): Module-level function creating the
+            embedding model in each worker; use a deterministic one (e.g. the fake
+            backend) to compare against a serial build
+        directory (str): Directory the store is written to
+        index_type (str): One of `utils.faiss_indexes.INDEX_TYPES`
+        shard_size (int): Chunks per shard (default: see above)
+        max_workers (int): Worker processes
+
+    Returns:
+        tuple: (CompactVectorStore or None when there are no chunks, EmbeddingStats summed
+        over the shards; empty for an in-process build)
+    """
+    if shard_size is None:
+        shard_size = shard_size_for(len(chunks), max_workers) if isinstance(chunks, Sized) else SHARD_SIZE
+    chunks = iter(chunks)
+    head = list(islice(chunks, shard_size + 1))
+    if len(head) <= shard_size:
+        return build_faiss_db(head, embeddings, directory, index_type), EmbeddingStats()
+    chunks = chain(head, chunks)
+
+    seen = set()
+    writer = CompactStoreWriter(directory)
+    stats = EmbeddingStats()
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as spool_dir, \
+            ProcessPoolExecutor(max_workers, mp_context=context) as pool:
+        spool_paths, pending = [], []
+        for batch in batched(chunks, shard_size):
+            batch = [(doc_id, chunk) for doc_id, chunk in dict(batch).items() if doc_id not in seen]
+            if not batch:
+                continue
+            for doc_id, chunk in batch:
+                seen.add(doc_id)
+                writer.append(doc_id, chunk)
+            spool_paths.append(os.path.join(spool_dir, f"shard-{len(spool_paths):05d}.npy"))
+            pending.append(pool.submit(_embed_shard, embedding_factory,
+                                       [chunk.page_content for _, chunk in batch], spool_paths[-1]))
+            if sum(not future.done() for future in pending) >= 2 * max_workers:
+                wait([future for future in pending if not future.done()], return_when=FIRST_COMPLETED)
+        if not seen:
+            writer.close()
+            return None, stats
+
+        counts = []
+        for future in pending:
+            count, dim, shard_stats = future.result()
+            counts.append(count)
+            if shard_stats:
+                stats.texts += shard_stats.texts
+                stats.cache_hits += shard_stats.cache_hits
+                stats.api_calls += shard_stats.api_calls
+                stats.retries += shard_stats.retries
+
+        index = make_index(index_type, dim, len(seen))
+        if not index.is_trained:
+            index.train(_training_sample(spool_paths, counts))
+        if isinstance(index, faiss.IndexHNSW):
+            for path in spool_paths:
+                index.add(np.load(path))
+        else:
+            template = faiss.serialize_index(index)
+            shards = pool.map(_index_shard, [template] * len(spool_paths), spool_paths)
+            index = faiss.deserialize_index(next(shards))
+            for shard in shards:
+                # IVF labels are stored in the lists, so shift them to follow the earlier shards.
+                index.merge_from(faiss.deserialize_index(shard), index.ntotal if isinstance(index, faiss.IndexIVF) else 0)
+    writer.finish(index)
+    print(f"[INFO] Built {index_type_of(index)} index for {len(seen)} chunks from {len(spool_paths)} shards.")
+    return CompactVectorStore(directory, embeddings), stats
@@ -0,0 +1,209 @@
+# utils/snapshots.py
+
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+from utils.compact_store import FORMAT_VERSION, CompactVectorStore
+from utils.faiss_indexes import index_type_of
+
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+KEEP_SNAPSHOTS = 3              # newest snapshots kept, the current one included
+MIN_KEEP_SNAPSHOTS = 2          # never fewer: readers may still be on the previous one
+STALE_TMP_SECONDS = 3600        # unfinished snapshot dirs untouched for this long are removed
+LEGACY_FILES = ("index.faiss", "index.pkl", "docstore.json", "docstore.bin", "docstore.offsets.npy")
+
+
+def current_version(root):
+    """Version named by `root/CURRENT`, or None for an unversioned vectorstore."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_dir(root, version):
+    return os.path.join(root, SNAPSHOTS_DIR, version)
+
+
+def current_dir(root):
+    """Directory holding the vectorstore readers should use (`root` itself before snapshots)."""
+    version = current_version(root)
+    return snapshot_dir(root, version) if version else root
+
+
+def read_manifest(root, version=None):
+    """Manifest of a snapshot (the current one by default), or None."""
+    version = version or current_version(root)
+    if not version:
+        return None
+    with open(os.path.join(snapshot_dir(root, version), MANIFEST_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_versions(root):
+    """Published snapshot versions, oldest first (versions sort by creation time)."""
+    directory = os.path.join(root, SNAPSHOTS_DIR)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if not name.startswith("."))
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _fsync_entries(directory):
+    """Sync a directory's entries (creations, renames) to disk; files need their own fsync."""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(directory):
+    """Sync the files of a directory and then the directory itself."""
+    for name in os.listdir(directory):
+        with open(os.path.join(directory, name), "rb") as f:
+            os.fsync(f.fileno())
+    _fsync_entries(directory)
+
+
+def _last_modified(directory):
+    """Latest mtime of a directory and its files; a build in progress keeps writing to them."""
+    mtimes = [os.path.getmtime(directory)]
+    for name in os.listdir(directory):
+        try:
+            mtimes.append(os.path.getmtime(os.path.join(directory, name)))
+        except FileNotFoundError:
+            pass
+    return max(mtimes)
+
+
+def _tmp_dir(root, version):
+    return os.path.join(root, SNAPSHOTS_DIR, f".{version}.tmp")
+
+
+def prepare_snapshot(root):
+    """
+    Create the hidden directory a new snapshot is written into.
+
+    Write the store there (e.g. `utils.faiss_indexes.build_faiss_db` with that
+    directory), then `publish_snapshot` the version, or `discard_snapshot` it.
+
+    Returns:
+        tuple: (version: str, directory: str)
+    """
+    os.makedirs(os.path.join(root, SNAPSHOTS_DIR), exist_ok=True)
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    while os.path.exists(snapshot_dir(root, version)) or os.path.exists(_tmp_dir(root, version)):
+        version += "-1"  # two snapshots within a microsecond
+    os.makedirs(_tmp_dir(root, version))
+    return version, _tmp_dir(root, version)
+
+
+def discard_snapshot(root, version):
+    """Remove a prepared snapshot that will not be published."""
+    shutil.rmtree(_tmp_dir(root, version), ignore_errors=True)
+
+
+def publish_snapshot(root, version, keep=KEEP_SNAPSHOTS, **manifest):
+    """
+    Publish a snapshot written into its `prepare_snapshot` directory as the current one.
+
+    A `manifest.json` is added and the directory is synced and renamed to its version,
+    and the rename itself is synced. Only then is `root/CURRENT` atomically replaced
+    with the new version, so a reader sees either the previous snapshot or the
+    complete new one, never a partial write; `root` is synced again so the new
+    CURRENT survives a crash.
+    Older snapshots beyond `keep` are removed afterwards (see `gc_snapshots`), as are
+    files of a pre-snapshot vectorstore in `root`.
+
+    Args:
+        root (str): Vectorstore directory
+        version (str): Version returned by `prepare_snapshot`
+        keep (int): Snapshots to retain, at least MIN_KEEP_SNAPSHOTS
+        **manifest: Extra manifest fields (e.g. the embedding model)
+
+    Returns:
+        str: The new version
+    """
+    tmp_dir = _tmp_dir(root, version)
+    store = CompactVectorStore(tmp_dir, None)
+    try:
+        chunks, index_type = len(store), index_type_of(store.index)
+    finally:
+        store.close()
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": version,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "previous": current_version(root),
+            "format": FORMAT_VERSION,
+            "chunks": chunks,
+            "index_type": index_type,
+            **manifest,
+        }, f, indent=2)
+    _fsync_dir(tmp_dir)
+    os.replace(tmp_dir, snapshot_dir(root, version))
+    _fsync_entries(os.path.join(root, SNAPSHOTS_DIR))  # the rename, before CURRENT can name it
+    _fsync_entries(root)
+    _write_atomic(os.path.join(root, CURRENT_FILE), version + "\n")
+    _fsync_entries(root)
+    print(f"[INFO] Published vectorstore snapshot {version}.")
+
+    for name in LEGACY_FILES:
+        legacy = os.path.join(root, name)
+        if os.path.exists(legacy):
+            os.remove(legacy)  # readers now follow CURRENT
+    gc_snapshots(root, keep)
+    return version
+
+
+def gc_snapshots(root, keep=KEEP_SNAPSHOTS):
+    """
+    Remove all but the newest `keep` snapshots, never the current one.
+
+    Also removes unfinished snapshot directories left by a crashed build. Readers that
+    still have a removed snapshot's files open keep working: the data stays alive
+    until they close it.
+
+    Returns:
+        list[str]: Removed versions
+    """
+    keep = max(keep, MIN_KEEP_SNAPSHOTS)
+    current = current_version(root)
+    versions = list_versions(root)
+    removed = [version for version in versions[:-keep] if version != current]
+    for version in removed:
+        shutil.rmtree(snapshot_dir(root, version), ignore_errors=True)
+
+    snapshots = os.path.join(root, SNAPSHOTS_DIR)
+    for name in os.listdir(snapshots):
+        path = os.path.join(snapshots, name)
+        if name.endswith(".tmp") and time.time() - _last_modified(path) > STALE_TMP_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+    if removed:
+        print(f"[INFO] Removed {len(removed)} old vectorstore snapshot(s).")
+    return removed
+
+
+def copy_current(root, destination):
+    """Copy only the current snapshot (and its CURRENT pointer) to another vectorstore directory."""
+    version = current_version(root)
+    if version is None:
+        shutil.copytree(root, destination, dirs_exist_ok=True)
+        return
+    shutil.copytree(snapshot_dir(root, version), snapshot_dir(destination, version), dirs_exist_ok=True)
+    shutil.copy(os.path.join(root, CURRENT_FILE), os.path.join(destination, CURRENT_FILE))
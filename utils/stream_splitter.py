@@ -0,0 +1,86 @@
+# utils/stream_splitter.py
+
+from itertools import groupby
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+READ_BLOCK_CHARS = 1 << 20
+
+
+def read_blocks(path, block_chars=READ_BLOCK_CHARS):
+    """Yield a text file in blocks of `block_chars` characters."""
+    with open(path, "r", encoding="utf-8") as f:
+        while block := f.read(block_chars):
+            yield block
+
+
+class StreamingTextSplitter(RecursiveCharacterTextSplitter):
+    """
+    `RecursiveCharacterTextSplitter` that can split a text arriving in blocks.
+
+    `split_stream` yields exactly the chunks `split_text` would return for the joined
+    blocks (with the default separators and `keep_separator=True`), but only holds one
+    paragraph and the chunk being merged in memory. The text is cut at "\\n\\n" as it
+    arrives; paragraphs are merged greedily with the same overlap rule as
+    `_merge_splits`, and a paragraph of `chunk_size` or more is handed to
+    `_split_text` on its own, as the base class does. A text with no blank line at
+    all is one paragraph and is only split once fully read.
+    """
+
+    def _iter_paragraphs(self, blocks):
+        """Cut the stream before each "\\n\\n", like `_split_text_with_regex` on the whole text."""
+        separator = self._separators[0]
+        keep = len(separator) - 1   # trailing chars that may start a separator cut by the block end
+        parts = []                  # searched text of the paragraph being read
+        pending = ""                # text not yet searched
+        for block in blocks:
+            pending += block
+            position = 0
+            while (found := pending.find(separator, position)) != -1:
+                parts.append(pending[position:found])
+                if paragraph := "".join(parts):
+                    yield paragraph
+                parts = [separator]
+                position = found + len(separator)
+            cut = max(position, len(pending) - keep)
+            parts.append(pending[position:cut])
+            pending = pending[cut:]
+        parts.append(pending)
+        if paragraph := "".join(parts):
+            yield paragraph
+
+    def _iter_merged(self, splits, separator):
+        """Generator version of `_merge_splits`."""
+        separator_len = self._length_function(separator)
+        current_doc = []
+        total = 0
+        for d in splits:
+            len_ = self._length_function(d)
+            if total + len_ + (separator_len if current_doc else 0) > self._chunk_size:
+                if current_doc:
+                    doc = self._join_docs(current_doc, separator)
+                    if doc is not None:
+                        yield doc
+                    while total > self._chunk_overlap or (
+                        total + len_ + (separator_len if current_doc else 0) > self._chunk_size and total > 0
+                    ):
+                        total -= self._length_function(current_doc[0]) + (separator_len if len(current_doc) > 1 else 0)
+                        current_doc = current_doc[1:]
+            current_doc.append(d)
+            total += len_ + (separator_len if len(current_doc) > 1 else 0)
+        doc = self._join_docs(current_doc, separator)
+        if doc is not None:
+            yield doc
+
+    def split_stream(self, blocks):
+        """Lazily split text given as an iterable of string blocks."""
+        if len(self._separators) < 2 or self._is_separator_regex or self._keep_separator is not True:
+            yield from self.split_text("".join(blocks))  # no streaming for custom settings
+            return
+        paragraphs = self._iter_paragraphs(blocks)
+        for small, group in groupby(paragraphs, key=lambda s: self._length_function(s) < self._chunk_size):
+            if small:
+                yield from self._iter_merged(group, "")
+            else:
+                for paragraph in group:
+                    yield from self._split_text(paragraph, self._separators[1:])
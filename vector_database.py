@@ -1,11 +1,27 @@
 import os
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
 from dotenv import load_dotenv
-from langchain_community.document_loaders import TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from itertools import chain
 from langchain_cohere import CohereEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.documents import Document
+import numpy as np
 import streamlit as st
 
+from utils.compact_store import INDEX_FILE, CompactStoreWriter, CompactVectorStore, has_compact_store, save_compact
+from utils.embedding_cache import BATCH_SIZE, MAX_CONCURRENCY, CachedEmbeddings
+from utils.faiss_indexes import (
+    BUILD_BATCH_SIZE, REBUILD_DELETED_RATIO, add_vectors, batched, build_faiss_db, index_type_of, rebuild_index,
+    remove_vectors,
+)
+from utils.sharded_build import build_sharded_faiss_db
+from utils.snapshots import KEEP_SNAPSHOTS, current_dir, discard_snapshot, prepare_snapshot, publish_snapshot
+from utils.stream_splitter import StreamingTextSplitter, read_blocks
+
 # Load environment variables
 load_dotenv()
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
@@ -13,61 +29,269 @@ COHERE_API_KEY = os.getenv("COHERE_API_KEY")
 # Constants
 TXT_DIRECTORY = "txt/"
 FAISS_DB_PATH = "vectorstore"
-INDEX_FILE = os.path.join(FAISS_DB_PATH, "index.faiss")
+# Snapshots of the vector DB kept on disk (see `utils.snapshots`).
+KEEP_VECTORSTORE_SNAPSHOTS = int(os.getenv("VECTORSTORE_KEEP_SNAPSHOTS", str(KEEP_SNAPSHOTS)))
+EMBED_MODEL = "embed-english-v3.0"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+# "fake" swaps Cohere for a deterministic local embedding (tests, benchmarks, offline runs).
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "cohere")
+FAKE_EMBEDDING_SIZE = 1024
+# FAISS index for new vector DBs: "auto" (by corpus size), "flat", "hnsw", "ivf-flat" or "ivf-pq".
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "auto")
+# Worker processes for building a new vector DB; above 1 the corpus is embedded and indexed in shards.
+BUILD_WORKERS = int(os.getenv("VECTOR_DB_BUILD_WORKERS", "1"))
+# Texts per embedding request and requests in flight; lower them for rate-limited API keys.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", str(BATCH_SIZE)))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", str(MAX_CONCURRENCY)))
+
+_embedding_model = None
 
-def load_txt(file_path):
-    """Load documents from a text file."""
-    if not os.path.exists(file_path):
-        st.error(f"❌ File not found at path: {file_path}")
-        return []
-    loader = TextLoader(file_path, encoding="utf-8")
-    return loader.load()
+def iter_txt_chunks(file_path):
+    """Lazily split a text file into chunks, reading it block by block."""
+    splitter = StreamingTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    for text in splitter.split_stream(read_blocks(file_path)):
+        yield Document(page_content=text, metadata={"source": file_path})
+
+def iter_chunks(documents):
+    """Lazily split documents into smaller chunks, keeping each document's metadata."""
+    splitter = StreamingTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    for document in documents:
+        yield from splitter.split_documents([document])
 
 def create_chunks(documents):
-    """Split documents into smaller chunks."""
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    return splitter.split_documents(documents)
+    """Split documents into smaller chunks, keeping each document's metadata."""
+    return list(iter_chunks(documents))
 
-def get_embedding_model():
-    """Initialize Cohere embedding model."""
-    if not COHERE_API_KEY:
-        st.error("❌ COHERE_API_KEY is missing. Please check your .env file.")
+def create_embedding_model():
+    """
+    New embedding model for this process, or None when the Cohere key is missing.
+
+    Wraps Cohere (or the fake backend) in `CachedEmbeddings`, so chunks embedded by
+    an earlier build, or by another bot with the same content, are read from the
+    on-disk cache instead of being sent again. Missing texts are sent in batches of
+    EMBED_BATCH_SIZE with up to EMBED_CONCURRENCY requests in flight (set from the
+    environment variables of the same names). Module-level so that sharded build
+    workers can create their own model with it.
+    """
+    if EMBEDDING_BACKEND == "fake":
+        embeddings, model = DeterministicFakeEmbedding(size=FAKE_EMBEDDING_SIZE), "fake"
+    elif COHERE_API_KEY:
+        embeddings, model = CohereEmbeddings(model=EMBED_MODEL, cohere_api_key=COHERE_API_KEY), EMBED_MODEL
+    else:
         return None
-    return CohereEmbeddings(model="embed-english-v3.0", cohere_api_key=COHERE_API_KEY)
+    return CachedEmbeddings(embeddings, model, batch_size=EMBED_BATCH_SIZE, max_concurrency=EMBED_CONCURRENCY)
+
+def get_embedding_model():
+    """Shared embedding model (see `create_embedding_model`), created once per process."""
+    global _embedding_model
+    if _embedding_model is None:
+        _embedding_model = create_embedding_model()
+        if _embedding_model is None:
+            st.error("❌ COHERE_API_KEY is missing. Please check your .env file.")
+    return _embedding_model
+
+def chunk_id(chunk):
+    """Stable ID of a chunk: a hash of its source, page and text."""
+    key = "\0".join((
+        str(chunk.metadata.get("source", "")),
+        str(chunk.metadata.get("page", "")),
+        chunk.page_content,
+    ))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+@dataclass
+class IndexUpdate:
+    """How many chunks an update embedded, deleted and left untouched, and whether the index was rebuilt."""
+    added: int = 0
+    removed: int = 0
+    kept: int = 0
+    rebuilt: bool = False
+
+    def summary(self):
+        summary = f"{self.added} chunks added, {self.removed} removed, {self.kept} kept"
+        return summary + " (index rebuilt)" if self.rebuilt else summary
+
+def has_vector_db():
+    return os.path.exists(os.path.join(current_dir(FAISS_DB_PATH), INDEX_FILE))
+
+@contextmanager
+def current_store_dir(embeddings):
+    """
+    Directory of the current vector DB snapshot in the compact format.
+
+    A legacy pickled vector DB is converted into a temporary directory first (this
+    one-off migration loads it whole, as LangChain's pickle format requires).
+    """
+    directory = current_dir(FAISS_DB_PATH)
+    if has_compact_store(directory):
+        yield directory
+        return
+    print("[INFO] Loading legacy pickled vector DB; it will be re-saved as a snapshot.")
+    with tempfile.TemporaryDirectory() as converted:
+        save_compact(FAISS.load_local(directory, embeddings, allow_dangerous_deserialization=True), converted)
+        yield converted
+
+def update_index(base_dir, directory, chunks, embeddings, remove_missing_sources=True, removed_sources=(),
+                 batch_size=BUILD_BATCH_SIZE):
+    """
+    Write an updated copy of the compact store in `base_dir` to `directory`, embedding only what is new.
 
-def build_or_update_vector_db(txt_path=None):
-    """Build or update FAISS vector DB from text documents."""
+    Chunks are identified by `chunk_id`, so a chunk whose text is already indexed is
+    left alone. An indexed chunk is deleted when its source is among those being
+    updated (it no longer appears in that source's chunks), when its source is listed
+    in `removed_sources`, or, with `remove_missing_sources`, when its source is not
+    part of this update at all (i.e. `chunks` describe the whole corpus).
+
+    `chunks` may be a generator; new chunks are embedded and added `batch_size` at a
+    time as they arrive, their records appended to the copied records file, and
+    deletions are applied once it is exhausted. Only the chunk IDs, sources and
+    record offsets are kept in memory, never the chunk texts.
+
+    Deleting rewrites nothing: the chunks' records are marked deleted, and IVF
+    indexes also drop their vectors in place (`remove_vectors`). Only once deleted
+    records exceed REBUILD_DELETED_RATIO of the store are they dropped and the index
+    rebuilt without them (`rebuild_index`).
+
+    Returns:
+        tuple: (CompactVectorStore, IndexUpdate: counts of added, removed and kept chunks)
+    """
+    base = CompactVectorStore(base_dir, embeddings, mmap_index=False)
+    try:
+        sources = {}
+        indexed = {}
+        for position, doc_id, metadata in base.iter_keys():
+            source = metadata.get("source")
+            indexed[doc_id] = (position, sources.setdefault(source, source))
+        index = base.index
+    finally:
+        base.close()
+
+    writer = CompactStoreWriter.copy_of(base_dir, directory)
+    try:
+        seen = set()
+        updated_sources = set()
+        added = 0
+        for batch in batched(chunks, batch_size):
+            new = {}
+            for chunk in batch:
+                doc_id = chunk_id(chunk)
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                updated_sources.add(chunk.metadata.get("source"))
+                if doc_id not in indexed:
+                    new[doc_id] = chunk
+            if new:
+                vectors = embeddings.embed_documents([chunk.page_content for chunk in new.values()])
+                add_vectors(index, vectors, len(writer))
+                for doc_id, chunk in new.items():
+                    writer.append(doc_id, chunk)
+                added += len(new)
+
+        removed_sources = set(removed_sources)
+        stale = [
+            position for doc_id, (position, source) in indexed.items()
+            if doc_id not in seen
+            and (remove_missing_sources or source in updated_sources or source in removed_sources)
+        ]
+        rebuilt = False
+        if stale:
+            remove_vectors(index, stale)
+            writer.delete(stale)
+            if len(writer.deleted) > REBUILD_DELETED_RATIO * len(writer):
+                index = rebuild_index(index, np.setdiff1d(np.arange(len(writer)), sorted(writer.deleted)))
+                writer.compact()
+                rebuilt = True
+        writer.finish(index)
+    except BaseException:
+        writer.close()
+        raise
+    update = IndexUpdate(added=added, removed=len(stale), kept=len(indexed) - len(stale), rebuilt=rebuilt)
+    return CompactVectorStore(directory, embeddings), update
+
+def build_or_update_vector_db(txt_path=None, documents=None, remove_missing_sources=True, removed_sources=(),
+                              index_type=FAISS_INDEX_TYPE, workers=BUILD_WORKERS):
+    """
+    Build or update FAISS vector DB from documents.
+
+    Updates are incremental (see `update_index`): only chunks not already in the
+    index are embedded, and chunks of changed or removed sources are deleted.
+    Documents are read, split, embedded and indexed in batches as a stream, and chunk
+    records are written to the new snapshot's directory as they are embedded, so memory
+    does not grow with the size of the input beyond the chunk IDs. The result is
+    published as a new snapshot (see `utils.snapshots`); the chatbot keeps serving the
+    previous one until it is complete.
+
+    Args:
+        txt_path (str): Text file indexed as a single document (legacy input)
+        documents (Iterable[Document]): Documents to index, e.g. from
+            `utils.document_sources.iter_documents`; their metadata (source URL or
+            file name, page) is kept on every chunk
+        remove_missing_sources (bool): Treat `documents` as the whole corpus and delete
+            chunks of sources not among them; pass False when indexing only a delta
+        removed_sources (Iterable[str]): Sources whose chunks should be deleted
+        index_type (str): FAISS index for a new vector DB (see `utils.faiss_indexes`);
+            an existing vector DB keeps the index type it was built with
+        workers (int): Worker processes for building a new vector DB (see
+            `utils.sharded_build`); updates only embed new chunks and stay in-process
+
+    Returns:
+        bool: True once the new snapshot is published, False if nothing was indexed
+    """
     try:
-        if txt_path is None or not os.path.exists(txt_path):
-            st.error("❌ Valid `txt_path` is required for vector DB generation.")
+        if documents is None and (txt_path is None or not os.path.exists(txt_path)):
+            st.error("❌ Valid `txt_path` or `documents` is required for vector DB generation.")
             return False
 
-        with st.spinner("📄 Loading and splitting documents..."):
-            documents = load_txt(txt_path)
-            if not documents:
-                st.error("❌ No documents loaded.")
-                return False
-            chunks = create_chunks(documents)
+        chunks = iter_txt_chunks(txt_path) if documents is None else iter_chunks(documents)
+        first = next(chunks, None)
+        if first is None and not removed_sources:
+            st.error("❌ No documents loaded.")
+            return False
+        if first is not None:
+            chunks = chain([first], chunks)
 
-        with st.spinner("🧠 Generating embeddings using Cohere..."):
+        with st.spinner("🧠 Splitting documents and generating embeddings using Cohere..."):
             embeddings = get_embedding_model()
             if embeddings is None:
                 st.error("❌ Cohere embedding model not loaded.")
                 return False
 
-            os.makedirs(FAISS_DB_PATH, exist_ok=True)
-            if os.path.exists(INDEX_FILE):
-                faiss_db = FAISS.load_local(
-                    FAISS_DB_PATH, embeddings, allow_dangerous_deserialization=True
-                )
-                faiss_db.add_documents(chunks)
-                st.success("🔄 Vector DB updated!")
-            else:
-                faiss_db = FAISS.from_documents(chunks, embeddings)
-                st.success("🆕 Vector DB created!")
-
-            faiss_db.save_local(FAISS_DB_PATH)
-            st.success(f"📦 Vector DB saved to `{FAISS_DB_PATH}`")
+            version, directory = prepare_snapshot(FAISS_DB_PATH)
+            published = False
+            try:
+                if has_vector_db():
+                    with current_store_dir(embeddings) as base_dir:
+                        faiss_db, update = update_index(base_dir, directory, chunks, embeddings,
+                                                        remove_missing_sources, removed_sources)
+                    print(f"[INFO] Vector DB update ({index_type_of(faiss_db.index)} index): {update.summary()}")
+                    st.success(f"🔄 Vector DB updated: {update.summary()}")
+                else:
+                    pairs = ((chunk_id(chunk), chunk) for chunk in chunks)
+                    if workers > 1:
+                        faiss_db, shard_stats = build_sharded_faiss_db(
+                            pairs, embeddings, create_embedding_model, directory, index_type, max_workers=workers
+                        )
+                        if shard_stats.texts:
+                            print(f"[INFO] Embeddings in build workers: {shard_stats.summary()}")
+                    else:
+                        faiss_db = build_faiss_db(pairs, embeddings, directory, index_type)
+                    if faiss_db is None:
+                        st.error("❌ No documents loaded.")
+                        return False
+                    st.success(f"🆕 Vector DB created with {len(faiss_db)} chunks!")
+                faiss_db.close()
+
+                publish_snapshot(FAISS_DB_PATH, version, keep=KEEP_VECTORSTORE_SNAPSHOTS,
+                                 embedding_model=getattr(embeddings, "model", EMBED_MODEL))
+                published = True
+            finally:
+                if not published:
+                    discard_snapshot(FAISS_DB_PATH, version)
+            if isinstance(embeddings, CachedEmbeddings) and embeddings.stats.texts:
+                print(f"[INFO] Embeddings: {embeddings.stats.summary()}")
+            st.success(f"📦 Vector DB snapshot `{version}` published to `{FAISS_DB_PATH}`")
 
         return True
 